@@ -1,15 +1,37 @@
 import os
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import Histogram
 
-from routers import bigquery, settings
+from routers import bigquery, dashboard, settings
+from services.metrics import CONTENT_TYPE, REGISTRY, render
 
 load_dotenv(Path(__file__).resolve().parent / ".env")
 
-app = FastAPI(title="Ad Performance Tracker API", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """Open the settings database and start background maintenance tasks."""
+    settings.open_settings_db()
+    bigquery.start_cache_sweeper()
+    bigquery.start_rollup_sync()
+    bigquery.start_cache_warming()
+    try:
+        yield
+    finally:
+        await bigquery.stop_cache_warming()
+        await bigquery.stop_rollup_sync()
+        bigquery.stop_cache_sweeper()
+        settings.close_settings_db()
+
+
+app = FastAPI(title="Ad Performance Tracker API", version="0.1.0", lifespan=lifespan)
 _cors_origins = ["http://localhost:3000", "http://127.0.0.1:3000"]
 if extra := os.environ.get("CORS_ORIGINS", "").strip():
     _cors_origins.extend(o.strip() for o in extra.split(",") if o.strip())
@@ -19,9 +41,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Age", "ETag", "X-Stale", "X-Total-Count"],
 )
 app.include_router(bigquery.router, prefix="/api")
 app.include_router(settings.router, prefix="/api")
+app.include_router(dashboard.router, prefix="/api")
+
+_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by endpoint, method and status.",
+    ("endpoint", "method", "status"),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+    registry=REGISTRY,
+)
+
+
+@app.middleware("http")
+async def record_request_duration(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Observe each request's latency, labelled by the matched endpoint."""
+    started = time.monotonic()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by endpoint name (e.g. get_performance), not the raw path, to
+        # keep the label set bounded; unmatched paths share one label.
+        route = request.scope.get("route")
+        _request_duration.labels(
+            endpoint=getattr(route, "name", "unmatched"),
+            method=request.method,
+            status=str(status),
+        ).observe(time.monotonic() - started)
 
 
 @app.get("/health")
@@ -30,6 +84,12 @@ def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """Prometheus scrape endpoint (cache, BigQuery job and latency metrics)."""
+    return Response(render(), media_type=CONTENT_TYPE)
+
+
 @app.get("/")
 def root() -> dict[str, str]:
     """Root endpoint."""
@@ -1,21 +1,146 @@
 """BigQuery sample and performance data API."""
 
+import asyncio
 import json
+import logging
+import math
 import os
 import threading
-import time as _time
-from datetime import date, datetime, time
-from decimal import Decimal
-from typing import Any
+import time
+from collections.abc import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    Mapping,
+)
+from dataclasses import dataclass, replace
+from datetime import date, timedelta
+from functools import partial
+from pathlib import Path
+from typing import Annotated, Any, Literal, TypeVar
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
 from google.cloud import bigquery
 from google.oauth2 import service_account
+from prometheus_client import Gauge
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from pydantic import BaseModel, Field, StringConstraints
+
+from routers.settings import load_settings
+from services.ad_names import P1_TOKEN, TOKEN_SEPARATOR, normalize_token
+from services.cache import CacheHit, CacheSweeper, SharedTTLCache, TTLCache
+from services.cache_backends import create_backend
+from services.cache_warmer import CacheWarmer, WarmStep, parse_times
+from services.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpen,
+)
+from services.cost_governor import (
+    CostGovernor,
+    QueryBudgetExhausted,
+    QueryTooExpensive,
+)
+from services.metrics import REGISTRY
+from services.query_runner import QueryRunner
+from services.rollup_store import RollupStore
+from services.serialization import (
+    Encoded,
+    column_converter,
+    dumps,
+    encoded_response,
+    encoded_size,
+    json_ready,
+    loads,
+    rows_to_records,
+)
+from services.singleflight import SingleFlight
 
 router = APIRouter(prefix="/bigquery", tags=["bigquery"])
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
 
 SAMPLE_LIMIT = 5
+SUMMARY_BATCH_MAX_ACRONYMS = 200
 PERFORMANCE_CACHE_TTL_SECONDS = int(os.environ.get("PERFORMANCE_CACHE_TTL", "300"))
+PERFORMANCE_CACHE_HARD_TTL_SECONDS = max(
+    PERFORMANCE_CACHE_TTL_SECONDS,
+    int(os.environ.get("PERFORMANCE_CACHE_HARD_TTL", "3600")),
+)
+PERFORMANCE_CACHE_MAX_ENTRIES = int(
+    os.environ.get("PERFORMANCE_CACHE_MAX_ENTRIES", "1000")
+)
+PERFORMANCE_CACHE_MAX_BYTES = int(
+    os.environ.get("PERFORMANCE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+)
+PERFORMANCE_CACHE_SWEEP_INTERVAL_SECONDS = int(
+    os.environ.get("PERFORMANCE_CACHE_SWEEP_INTERVAL", "60")
+)
+PERFORMANCE_DAILY_CACHE_MAX_ENTRIES = int(
+    os.environ.get("PERFORMANCE_DAILY_CACHE_MAX_ENTRIES", "50000")
+)
+DAILY_BUCKET_MAX_DAYS = 731
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_LOAD_LOCK_SECONDS = int(os.environ.get("CACHE_LOAD_LOCK_SECONDS", "60"))
+CACHE_WARM_LOCK_SECONDS = int(os.environ.get("CACHE_WARM_LOCK_SECONDS", "1800"))
+SHARED_CACHE_POLL_SECONDS = 0.1
+BIGQUERY_MAX_CONCURRENT_QUERIES = int(
+    os.environ.get("BIGQUERY_MAX_CONCURRENT_QUERIES", "10")
+)
+# Jobs still running this long after submission are cancelled (0: no limit).
+BIGQUERY_QUERY_TIMEOUT_SECONDS = float(
+    os.environ.get("BIGQUERY_QUERY_TIMEOUT_SECONDS", "120")
+)
+DISCONNECT_POLL_SECONDS = 0.25
+# Consecutive failed (or slower than BIGQUERY_CIRCUIT_SLOW_SECONDS) queries
+# that open the circuit; while open, cached data is served however old.
+BIGQUERY_CIRCUIT_FAILURES = int(os.environ.get("BIGQUERY_CIRCUIT_FAILURES", "5"))
+BIGQUERY_CIRCUIT_SLOW_SECONDS = float(
+    os.environ.get("BIGQUERY_CIRCUIT_SLOW_SECONDS", "30")
+)
+BIGQUERY_CIRCUIT_OPEN_SECONDS = float(
+    os.environ.get("BIGQUERY_CIRCUIT_OPEN_SECONDS", "30")
+)
+# Failures (and the spent hourly byte budget) after which the last good
+# cached data is served instead.
+STALE_FALLBACK_STATUSES = frozenset({429, 502, 503, 504})
+# "optional": short queries (summary, sample) use query_and_wait and BigQuery
+# may skip creating a job; "required": query_and_wait but always with a job;
+# "off": every query inserts a job and polls it.
+BIGQUERY_SHORT_QUERY_MODE = (
+    os.environ.get("BIGQUERY_SHORT_QUERY_MODE", "optional").strip().lower()
+)
+PERFORMANCE_ARROW_MIN_ROWS = int(os.environ.get("PERFORMANCE_ARROW_MIN_ROWS", "5000"))
+PERFORMANCE_STREAM_PAGE_SIZE = int(
+    os.environ.get("PERFORMANCE_STREAM_PAGE_SIZE", "1000")
+)
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+RESPONSE_COMPRESS_MIN_BYTES = int(os.environ.get("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+PERFORMANCE_MAX_PAGE_SIZE = 10_000
+PERFORMANCE_FIELDS = ("ad_name", "spend", "revenue", "croas")
+_INT64_MAX = 2**63 - 1
+BIGQUERY_MAX_BYTES_BILLED = int(os.environ.get("BIGQUERY_MAX_BYTES_BILLED", "0"))
+BIGQUERY_HOURLY_BYTES_BUDGET = int(os.environ.get("BIGQUERY_HOURLY_BYTES_BUDGET", "0"))
+
+LOCAL_ROLLUP_SYNC_INTERVAL_SECONDS = int(
+    os.environ.get("LOCAL_ROLLUP_SYNC_INTERVAL", "3600")
+)
+LOCAL_ROLLUP_LOOKBACK_DAYS = int(os.environ.get("LOCAL_ROLLUP_LOOKBACK_DAYS", "3"))
 
 COL_AD_NAME = "ad_name"
 COL_SPEND = "spend_sum"
@@ -31,6 +156,13 @@ def _get_date_column() -> str:
     return os.environ.get("BIGQUERY_DATE_COLUMN", "date")
 
 
+def _query_timeout() -> float | None:
+    """Return the per-query deadline in seconds, or None for no limit."""
+    return (
+        BIGQUERY_QUERY_TIMEOUT_SECONDS if BIGQUERY_QUERY_TIMEOUT_SECONDS > 0 else None
+    )
+
+
 def _get_bigquery_credentials():
     """
     Resolve credentials for BigQuery.
@@ -45,23 +177,6 @@ def _get_bigquery_credentials():
     return None
 
 
-def _json_serial(value: Any) -> Any:
-    """Convert a value to a JSON-serializable form."""
-    if value is None:
-        return None
-    if isinstance(value, (datetime, date, time)):
-        return value.isoformat()
-    if isinstance(value, Decimal):
-        return float(value)
-    if isinstance(value, bytes):
-        return value.hex()
-    if isinstance(value, dict):
-        return {k: _json_serial(v) for k, v in value.items()}
-    if isinstance(value, (list, tuple)):
-        return [_json_serial(v) for v in value]
-    return value
-
-
 _bq_client: bigquery.Client | None = None
 _bq_client_lock = threading.Lock()
 
@@ -80,12 +195,14 @@ def get_bigquery_client() -> bigquery.Client:
                 status_code=503,
                 detail="GCP_PROJECT is not set; BigQuery is not configured",
             )
+        options: dict[str, Any] = {"project": project}
         credentials = _get_bigquery_credentials()
+        if credentials:
+            options["credentials"] = credentials
+        if BIGQUERY_SHORT_QUERY_MODE == "optional":
+            options["default_job_creation_mode"] = "JOB_CREATION_OPTIONAL"
         try:
-            if credentials:
-                _bq_client = bigquery.Client(project=project, credentials=credentials)
-            else:
-                _bq_client = bigquery.Client(project=project)
+            _bq_client = bigquery.Client(**options)
         except Exception as e:
             raise HTTPException(
                 status_code=503,
@@ -94,38 +211,691 @@ def get_bigquery_client() -> bigquery.Client:
         return _bq_client
 
 
-_performance_cache: dict[str, tuple[float, list[dict[str, Any]]]] = {}
-_cache_lock = threading.Lock()
+_bqstorage_client: Any = None
+_bqstorage_unavailable = False
+_bqstorage_client_lock = threading.Lock()
+
+
+def _get_bqstorage_client() -> Any:
+    """Return a shared BigQuery Storage Read API client, or None.
+
+    Needs the google-cloud-bigquery-storage and pyarrow packages. If they are
+    missing or the client cannot be created, None is returned (once logged)
+    and large results are read over REST like small ones.
+    """
+    global _bqstorage_client, _bqstorage_unavailable
+    if _bqstorage_client is not None or _bqstorage_unavailable:
+        return _bqstorage_client
+    with _bqstorage_client_lock:
+        if _bqstorage_client is not None or _bqstorage_unavailable:
+            return _bqstorage_client
+        try:
+            import pyarrow  # noqa: F401
+            from google.cloud import bigquery_storage
+
+            _bqstorage_client = bigquery_storage.BigQueryReadClient(
+                credentials=_get_bigquery_credentials()
+            )
+        except Exception:
+            logger.warning(
+                "BigQuery Storage Read API unavailable; reading results over REST",
+                exc_info=True,
+            )
+            _bqstorage_unavailable = True
+        return _bqstorage_client
+
+
+def _arrow_table_to_rows(table: Any) -> list[dict[str, Any]]:
+    """Convert a ``pyarrow.Table`` to JSON-ready row dicts, column by column.
+
+    NUMERIC columns are cast to float64 inside Arrow and any other
+    non-primitive column goes through :func:`json_ready`, so there are no
+    per-row ``Row`` objects.
+    """
+    import pyarrow as pa
+
+    columns: dict[str, list[Any]] = {}
+    for name, column in zip(table.column_names, table.columns, strict=True):
+        if pa.types.is_decimal(column.type):
+            column = column.cast(pa.float64())
+        values = column.to_pylist()
+        if not (
+            pa.types.is_string(column.type)
+            or pa.types.is_floating(column.type)
+            or pa.types.is_integer(column.type)
+            or pa.types.is_boolean(column.type)
+            or pa.types.is_null(column.type)
+        ):
+            values = [json_ready(v) for v in values]
+        columns[name] = values
+    names = list(columns)
+    return [dict(zip(names, values, strict=True)) for values in zip(*columns.values())]
+
+
+def _fetch_rows(
+    job: bigquery.QueryJob, max_results: int | None = None
+) -> list[dict[str, Any]]:
+    """Read a finished job's rows as JSON-ready dicts.
+
+    Results of at least ``PERFORMANCE_ARROW_MIN_ROWS`` rows are downloaded
+    as Arrow record batches through the Storage Read API and kept columnar
+    until the dicts are built. Smaller results, which fit in the first REST
+    page anyway, are converted column by column using the result schema.
+    """
+    result = job.result(max_results=max_results, timeout=_query_timeout())
+    total_rows = getattr(result, "total_rows", None)
+    if (
+        PERFORMANCE_ARROW_MIN_ROWS
+        and max_results is None
+        and isinstance(total_rows, int)
+        and total_rows >= PERFORMANCE_ARROW_MIN_ROWS
+    ):
+        bqstorage_client = _get_bqstorage_client()
+        if bqstorage_client is not None:
+            table = result.to_arrow(bqstorage_client=bqstorage_client)
+            return _arrow_table_to_rows(table)
+    return _rows_to_dicts(getattr(result, "schema", None), result)
+
+
+def _rows_to_dicts(schema: Any, rows: Iterable[Any]) -> list[dict[str, Any]]:
+    """Convert BigQuery ``Row`` objects to JSON-ready dicts.
+
+    With a result *schema* the values are converted column by column, each
+    with the converter for its type; without one each row is walked.
+    """
+    if not isinstance(schema, list) or not schema:
+        return [json_ready(dict(row)) for row in rows]
+    values = [row.values() for row in rows]
+    if not values:
+        return []
+    return rows_to_records(
+        [field.name for field in schema],
+        [column_converter(field.field_type, field.mode) for field in schema],
+        values,
+    )
+
+
+def _get_cache_path() -> Path:
+    path = os.environ.get("CACHE_SQLITE_PATH")
+    if path:
+        return Path(path)
+    return Path(__file__).resolve().parent.parent / "data" / "cache.db"
+
+
+def _decode_entry(body: bytes) -> Encoded[Any]:
+    """Rebuild a cache entry from the JSON body stored in the shared backend."""
+    return Encoded.from_body(
+        loads(body), body, compress_min_bytes=RESPONSE_COMPRESS_MIN_BYTES
+    )
+
+
+# Shared by worker processes when CACHE_BACKEND is sqlite or redis; None
+# keeps the caches per-process.
+_cache_backend = create_backend(
+    CACHE_BACKEND, sqlite_path=_get_cache_path(), redis_url=CACHE_REDIS_URL
+)
+
+
+def _response_cache(namespace: str) -> TTLCache[Encoded[Any]]:
+    """Create a cache of encoded responses, shared via ``_cache_backend`` if set.
+
+    Values are kept with their JSON encoding so hits are sent as-is; the
+    shared backend stores just that encoding.
+    """
+    options: dict[str, Any] = {
+        "ttl_seconds": PERFORMANCE_CACHE_TTL_SECONDS,
+        "max_entries": PERFORMANCE_CACHE_MAX_ENTRIES,
+        "max_bytes": PERFORMANCE_CACHE_MAX_BYTES,
+        "sizeof": encoded_size,
+        "stale_seconds": (
+            PERFORMANCE_CACHE_HARD_TTL_SECONDS - PERFORMANCE_CACHE_TTL_SECONDS
+        ),
+    }
+    if _cache_backend is None:
+        return TTLCache(**options)
+    return SharedTTLCache(
+        _cache_backend,
+        namespace=namespace,
+        encode=lambda entry: entry.body,
+        decode=_decode_entry,
+        lock_seconds=CACHE_LOAD_LOCK_SECONDS,
+        **options,
+    )
+
+
+_performance_cache: TTLCache[Encoded[list[dict[str, Any]]]] = _response_cache(
+    "performance"
+)
+_performance_flight: SingleFlight[Encoded[list[dict[str, Any]]]] = SingleFlight()
+_summary_cache: TTLCache[Encoded[dict[str, Any]]] = _response_cache("summary")
+_summary_flight: SingleFlight[Encoded[dict[str, Any]]] = SingleFlight()
+# Per-(acronym, day) partial sums for date-range requests: ad_name ->
+# (spend, revenue). Ranges are assembled from these, so overlapping or
+# extended ranges only query BigQuery for the days not cached yet.
+_daily_cache: TTLCache[dict[str, tuple[float, float]]] = TTLCache(
+    ttl_seconds=PERFORMANCE_CACHE_TTL_SECONDS,
+    max_entries=PERFORMANCE_DAILY_CACHE_MAX_ENTRIES,
+    max_bytes=PERFORMANCE_CACHE_MAX_BYTES,
+)
+_CACHE_COUNTERS = ("hits", "stale_hits", "misses", "evictions", "expirations")
+
+
+class _CacheMetrics:
+    """Expose the caches' counters and sizes (read from ``stats()``) at scrape."""
+
+    def collect(self) -> Iterator[Metric]:
+        caches = {
+            "performance": _performance_cache.stats(),
+            "summary": _summary_cache.stats(),
+            "daily": _daily_cache.stats(),
+        }
+        for counter in _CACHE_COUNTERS:
+            family = CounterMetricFamily(
+                f"performance_cache_{counter}",
+                f"Performance cache {counter.replace('_', ' ')}.",
+                labels=("cache",),
+            )
+            for name, stats in caches.items():
+                family.add_metric((name,), stats[counter])
+            yield family
+        entries = GaugeMetricFamily(
+            "performance_cache_entries", "Entries currently cached.", labels=("cache",)
+        )
+        size = GaugeMetricFamily(
+            "performance_cache_bytes",
+            "Approximate memory held by cached values.",
+            labels=("cache",),
+        )
+        for name, stats in caches.items():
+            entries.add_metric((name,), stats["entries"])
+            size.add_metric((name,), stats["bytes"])
+        yield entries
+        yield size
+        coalesced = CounterMetricFamily(
+            "performance_cache_coalesced",
+            "Cache misses that waited on an identical in-flight query.",
+            labels=("cache",),
+        )
+        flights = {"performance": _performance_flight, "summary": _summary_flight}
+        for name, flight in flights.items():
+            coalesced.add_metric((name,), flight.stats()["coalesced"])
+        yield coalesced
+
+
+REGISTRY.register(_CacheMetrics())
+
+_cache_sweeper = CacheSweeper(
+    [_performance_cache, _summary_cache, _daily_cache],
+    interval_seconds=PERFORMANCE_CACHE_SWEEP_INTERVAL_SECONDS,
+)
+
+
+_refreshing: set[tuple[str, str]] = set()
+_background_tasks: set[asyncio.Task[None]] = set()
+
+
+def _schedule_refresh(
+    name: str,
+    flight: SingleFlight[V],
+    cache_key: str,
+    load: Callable[[], Awaitable[V]],
+) -> None:
+    """Reload a stale cache entry in the background, at most once per key."""
+    token = (name, cache_key)
+    if token in _refreshing or _circuit_breaker.state == OPEN:
+        return
+    _refreshing.add(token)
+
+    async def refresh() -> None:
+        try:
+            await flight.do(cache_key, load)
+        except Exception:
+            logger.warning(
+                "Background refresh of %s cache key %r failed",
+                name,
+                cache_key,
+                exc_info=True,
+            )
+        finally:
+            _refreshing.discard(token)
 
+    task = asyncio.create_task(refresh())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
 
-def _get_cached_performance(
+
+async def _cached_or_load(
+    name: str,
+    cache: TTLCache[V],
+    flight: SingleFlight[V],
     cache_key: str,
+    load: Callable[[], Awaitable[V]],
+    response: Response,
+) -> V:
+    """Return cached data for *cache_key*, or load it through *flight*.
+
+    Fresh entries are returned as-is. Stale entries (past the soft TTL but
+    within the hard TTL) are returned immediately while one background
+    refresh reloads them. Only a missing or hard-expired entry makes the
+    caller wait for BigQuery; if BigQuery then fails, the last good entry
+    is served however old (see :func:`_last_good`). Sets the ``Age``
+    header on *response*, and ``X-Stale`` when falling back.
+    """
+    hit = await cache.alookup(cache_key)
+    if hit is not None:
+        if hit.stale:
+            _schedule_refresh(name, flight, cache_key, load)
+        response.headers["Age"] = str(int(hit.age))
+        return hit.value
+    try:
+        value = await flight.do(cache_key, load)
+    except HTTPException as e:
+        hit = await _last_good(cache, cache_key, e)
+        if hit is None:
+            raise
+        response.headers["Age"] = str(int(hit.age))
+        response.headers["X-Stale"] = "1"
+        return hit.value
+    response.headers["Age"] = "0"
+    return value
+
+
+async def _last_good(
+    cache: TTLCache[V], cache_key: str, error: HTTPException
+) -> CacheHit[V] | None:
+    """Return the entry to serve instead of *error*, if there is one.
+
+    BigQuery failures, timeouts, the open circuit and the spent hourly byte
+    budget fall back to the newest cached value, which is kept past its
+    hard TTL while the circuit is open; other errors (bad input, a query
+    over the per-query byte limit) are not hidden.
+    """
+    if error.status_code not in STALE_FALLBACK_STATUSES:
+        return None
+    hit = await cache.alast_good(cache_key)
+    if hit is not None:
+        logger.warning(
+            "Serving %.0fs old data for %r: %s", hit.age, cache_key, error.detail
+        )
+    return hit
+
+
+def _one_worker_at_a_time(
+    cache: TTLCache[V], cache_key: str
+) -> Callable[[Callable[[], Awaitable[V]]], Callable[[], Awaitable[V]]]:
+    """Decorate a loader so only one worker process runs it per key.
+
+    With a shared cache the first worker to miss takes the key's load lock;
+    the others poll the shared cache for its result (for up to the lock's
+    lifetime) instead of querying BigQuery too, so adding workers does not
+    multiply queries. Per-process caches are left undecorated: there
+    :class:`SingleFlight` already coalesces concurrent loads.
+    """
+
+    def decorate(load: Callable[[], Awaitable[V]]) -> Callable[[], Awaitable[V]]:
+        if not isinstance(cache, SharedTTLCache):
+            return load
+        shared: SharedTTLCache[V] = cache
+
+        async def coordinated() -> V:
+            if await shared.atry_lock(cache_key):
+                try:
+                    return await load()
+                finally:
+                    await shared.aunlock(cache_key)
+            deadline = time.monotonic() + shared.lock_seconds
+            while time.monotonic() < deadline:
+                await asyncio.sleep(SHARED_CACHE_POLL_SECONDS)
+                value = await shared.aget(cache_key)
+                if value is not None:
+                    return value
+            return await load()
+
+        return coordinated
+
+    return decorate
+
+
+def _encode(value: V) -> Encoded[V]:
+    """Encode *value* for caching, compressed if over the size threshold.
+
+    Runs on the caller's thread, so only for small values such as summaries;
+    row lists go through :func:`_encode_off_loop`.
+    """
+    return Encoded.of(value, compress_min_bytes=RESPONSE_COMPRESS_MIN_BYTES)
+
+
+async def _encode_off_loop(value: V) -> Encoded[V]:
+    """Encode *value* in a worker thread.
+
+    Serializing, hashing and compressing a multi-megabyte row list takes long
+    enough to stall every other request if done on the event loop.
+    """
+    return await asyncio.to_thread(_encode, value)
+
+
+def _encoded_response(
+    entry: Encoded[Any], request: Request, response: Response
+) -> Response:
+    """Send *entry*'s pre-encoded body with the headers set on *response*.
+
+    Returning a response skips FastAPI's response-model validation and
+    re-encoding; the ``response_model`` on the route only documents the shape.
+    ``If-None-Match`` and ``Accept-Encoding`` are honoured (see
+    :func:`encoded_response`), so revalidating unchanged data costs a 304.
+    """
+    headers = {
+        name: value
+        for name, value in response.headers.items()
+        if name != "content-length"
+    }
+    return encoded_response(entry, request.headers, headers)
+
+
+def _on_circuit_change(state: str) -> None:
+    """Keep expired cache entries as fallbacks while the circuit is not closed."""
+    for cache in (_performance_cache, _summary_cache):
+        cache.keep_expired = state != CLOSED
+    if state == OPEN:
+        logger.warning("BigQuery circuit opened; serving cached data")
+    else:
+        logger.info("BigQuery circuit %s", state)
+
+
+_circuit_breaker = CircuitBreaker(
+    failure_threshold=BIGQUERY_CIRCUIT_FAILURES,
+    slow_call_seconds=BIGQUERY_CIRCUIT_SLOW_SECONDS,
+    open_seconds=BIGQUERY_CIRCUIT_OPEN_SECONDS,
+    on_state_change=_on_circuit_change,
+)
+_CIRCUIT_STATES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+Gauge(
+    "bigquery_circuit_state",
+    "BigQuery circuit breaker state (0 closed, 1 half-open, 2 open).",
+    registry=REGISTRY,
+).set_function(lambda: _CIRCUIT_STATES[_circuit_breaker.state])
+
+_query_runner = QueryRunner(
+    max_concurrency=BIGQUERY_MAX_CONCURRENT_QUERIES,
+    governor=CostGovernor(
+        max_bytes_billed=BIGQUERY_MAX_BYTES_BILLED,
+        window_budget_bytes=BIGQUERY_HOURLY_BYTES_BUDGET,
+        window_seconds=3600,
+    ),
+    timeout_seconds=_query_timeout(),
+    breaker=_circuit_breaker,
+)
+
+
+async def _run_query_rows(
+    client: bigquery.Client,
+    query: str,
+    job_config: bigquery.QueryJobConfig | None = None,
+    *,
+    label: str,
+    max_results: int | None = None,
+    background: bool = False,
+    short: bool = False,
+) -> list[dict[str, Any]]:
+    """Run a BigQuery query and return JSON-ready dicts (see :func:`_fetch_rows`).
+
+    With *short* (queries returning at most *max_results* rows, e.g. the
+    one-row summary) the query goes through ``query_and_wait`` instead of
+    a polled job, unless ``BIGQUERY_SHORT_QUERY_MODE`` is ``off``.
+    """
+    if short and max_results is not None and BIGQUERY_SHORT_QUERY_MODE != "off":
+        return await _mapping_errors(
+            _query_runner.run_and_wait(
+                client,
+                query,
+                job_config,
+                label=label,
+                max_results=max_results,
+                fetch=lambda rows: _rows_to_dicts(rows.schema, rows),
+                background=background,
+            )
+        )
+    return await _run_job(
+        client,
+        query,
+        job_config,
+        label=label,
+        fetch=partial(_fetch_rows, max_results=max_results),
+        background=background,
+    )
+
+
+async def _run_job(
+    client: bigquery.Client,
+    query: str,
+    job_config: bigquery.QueryJobConfig | None,
+    *,
+    label: str,
+    fetch: Callable[[bigquery.QueryJob], V],
+    background: bool = False,
+) -> V:
+    """Run a BigQuery query without blocking the event loop; 502 on failure.
+
+    *label* names the kind of query in the ``bigquery_*`` metrics;
+    *background* queues it behind user queries (cache warming). Errors are
+    mapped by :func:`_mapping_errors`.
+    """
+    return await _mapping_errors(
+        _query_runner.run_fetch(
+            client, query, job_config, label=label, fetch=fetch, background=background
+        )
+    )
+
+
+async def _mapping_errors(call: Awaitable[V]) -> V:
+    """Await a query, turning its failures into HTTP errors.
+
+    Queries refused by the cost governor are 400 (too large on their own)
+    or 429 (hourly budget used up); stale cache entries keep being served
+    while their background refresh is refused. Queries past the deadline
+    are 504, queries refused while the circuit is open 503; other failures
+    are 502.
+    """
+    try:
+        return await call
+    except CircuitOpen as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        ) from e
+    except QueryTooExpensive as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    except QueryBudgetExhausted as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        ) from e
+    except TimeoutError as e:
+        raise HTTPException(
+            status_code=504, detail=str(e) or "BigQuery query timed out"
+        ) from e
+    except Exception as e:
+        raise HTTPException(
+            status_code=502, detail=f"BigQuery request failed: {e!s}"
+        ) from e
+
+
+async def _while_connected(request: Request, call: Awaitable[V]) -> V:
+    """Await *call*, cancelling it if the client disconnects first.
+
+    The cancellation reaches the BigQuery job: the runner cancels it, and a
+    load shared through :class:`SingleFlight` is cancelled once no other
+    request waits for it. Raises 499 (client closed request), which only
+    shows in logs and metrics since nobody receives it.
+    """
+    task = asyncio.ensure_future(call)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def start_cache_sweeper() -> None:
+    """Start the background sweep of expired performance cache entries."""
+    _cache_sweeper.start()
+
+
+def stop_cache_sweeper() -> None:
+    """Stop the background cache sweep (called on app shutdown)."""
+    _cache_sweeper.stop()
+
+
+def _use_local_store() -> bool:
+    """Return True when PERFORMANCE_QUERY_MODE selects the local rollup store.
+
+    ``live`` (default) answers every cache miss from BigQuery; ``local``
+    answers from the SQLite rollup store once it has been synced.
+    """
+    return os.environ.get("PERFORMANCE_QUERY_MODE", "live").strip().lower() == "local"
+
+
+def _get_rollup_store_path() -> Path:
+    path = os.environ.get("LOCAL_ROLLUP_PATH")
+    if path:
+        return Path(path)
+    return Path(__file__).resolve().parent.parent / "data" / "rollups.db"
+
+
+_rollup_store: RollupStore | None = None
+_rollup_sync_flight: SingleFlight[dict[str, Any]] = SingleFlight()
+_rollup_sync_task: asyncio.Task[None] | None = None
+
+
+def _get_rollup_store() -> RollupStore:
+    """Return the rollup store for the configured path, creating it on first use."""
+    global _rollup_store
+    path = _get_rollup_store_path()
+    if _rollup_store is None or _rollup_store.path != path:
+        _rollup_store = RollupStore(path)
+    return _rollup_store
+
+
+async def _query_local_performance(
+    employee_acronym: str,
+    p1_only: bool,
+    start_date: str | None,
+    end_date: str | None,
 ) -> list[dict[str, Any]] | None:
-    """Return cached result if present and not expired, else None."""
-    with _cache_lock:
-        entry = _performance_cache.get(cache_key)
-        if entry is None:
-            return None
-        cached_at, data = entry
-        if _time.monotonic() - cached_at > PERFORMANCE_CACHE_TTL_SECONDS:
-            del _performance_cache[cache_key]
+    """Return per-ad rows from the local store in local mode.
+
+    Returns None in live mode, or while the store has never been synced, so
+    callers fall back to BigQuery.
+    """
+    if not _use_local_store():
+        return None
+    store = _get_rollup_store()
+    has_date_filter = not p1_only and bool(start_date) and bool(end_date)
+
+    def query() -> list[dict[str, Any]] | None:
+        if store.last_synced_day() is None:
             return None
-        return data
+        return store.query_performance(
+            employee_acronym,
+            p1_only=p1_only,
+            start_date=start_date if has_date_filter else None,
+            end_date=end_date if has_date_filter else None,
+        )
 
+    return await asyncio.to_thread(query)
 
-def _set_cached_performance(cache_key: str, data: list[dict[str, Any]]) -> None:
-    with _cache_lock:
-        _performance_cache[cache_key] = (_time.monotonic(), data)
 
+def _build_rollup_sync_query(full_table: str, *, incremental: bool) -> str:
+    """Build SQL returning spend/revenue sums per (ad_name, day).
 
-@router.get("/sample", response_model=list[dict[str, Any]])
-def get_sample_rows(
-    client: bigquery.Client = Depends(get_bigquery_client),
-) -> list[dict[str, Any]]:
+    When *incremental* is True only days on or after ``@since`` are read.
     """
-    Return up to 5 rows from the configured BigQuery table.
-    Requires GCP_PROJECT, BIGQUERY_DATASET, and BIGQUERY_TABLE to be set.
+    date_col = _get_date_column()
+    where = f"\n    WHERE DATE({date_col}) >= @since" if incremental else ""
+    return f"""
+    SELECT
+        {COL_AD_NAME} AS ad_name,
+        DATE({date_col}) AS day,
+        SUM({COL_SPEND}) AS spend,
+        SUM({COL_REVENUE}) AS revenue
+    FROM {full_table}{where}
+    GROUP BY ad_name, day
+    """
+
+
+async def sync_rollups(client: bigquery.Client) -> dict[str, Any]:
+    """Pull new per-(ad_name, day) sums from BigQuery into the local store.
+
+    Incremental: the last ``LOCAL_ROLLUP_LOOKBACK_DAYS`` already synced days
+    are re-read (to pick up late or restated upstream rows) along with any
+    newer days; an empty store is filled from the whole table. Concurrent
+    calls share one sync.
     """
+
+    async def run() -> dict[str, Any]:
+        store = _get_rollup_store()
+        full_table = _get_full_table()
+        last_day = await asyncio.to_thread(store.last_synced_day)
+        since = (
+            last_day - timedelta(days=LOCAL_ROLLUP_LOOKBACK_DAYS) if last_day else None
+        )
+        query = _build_rollup_sync_query(full_table, incremental=since is not None)
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=(
+                [bigquery.ScalarQueryParameter("since", "DATE", since)] if since else []
+            ),
+        )
+        rows = await _run_query_rows(client, query, job_config, label="rollup_sync")
+        written = await asyncio.to_thread(store.replace_days, since, rows)
+        if _use_local_store():
+            # Shared caches clear their backend too, so off the loop.
+            await asyncio.to_thread(_performance_cache.invalidate)
+            await asyncio.to_thread(_summary_cache.invalidate)
+            _daily_cache.invalidate()
+        return {"since": since.isoformat() if since else None, "rows_written": written}
+
+    return await _rollup_sync_flight.do("sync", run)
+
+
+async def _rollup_sync_loop() -> None:
+    while True:
+        try:
+            client = await asyncio.to_thread(get_bigquery_client)
+            await sync_rollups(client)
+        except Exception:
+            logger.warning("Local rollup sync failed", exc_info=True)
+        await asyncio.sleep(LOCAL_ROLLUP_SYNC_INTERVAL_SECONDS)
+
+
+def start_rollup_sync() -> None:
+    """In local mode, start syncing the rollup store on a schedule."""
+    global _rollup_sync_task
+    if not _use_local_store() or _rollup_sync_task is not None:
+        return
+    _rollup_sync_task = asyncio.create_task(_rollup_sync_loop())
+
+
+async def stop_rollup_sync() -> None:
+    """Cancel the scheduled rollup sync (called on app shutdown)."""
+    global _rollup_sync_task
+    task, _rollup_sync_task = _rollup_sync_task, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+def _get_full_table() -> str:
+    """Return the fully-qualified BigQuery table, or raise 503 if unset."""
     project = os.environ.get("GCP_PROJECT")
     dataset = os.environ.get("BIGQUERY_DATASET")
     table = os.environ.get("BIGQUERY_TABLE")
@@ -137,29 +907,84 @@ def get_sample_rows(
                 "BIGQUERY_DATASET, BIGQUERY_TABLE"
             ),
         )
-    full_table = f"`{project}`.`{dataset}`.`{table}`"
+    return f"`{project}`.`{dataset}`.`{table}`"
+
+
+@router.get("/sample", response_model=list[dict[str, Any]])
+async def get_sample_rows(
+    client: bigquery.Client = Depends(get_bigquery_client),
+) -> list[dict[str, Any]]:
+    """
+    Return up to 5 rows from the configured BigQuery table.
+    Requires GCP_PROJECT, BIGQUERY_DATASET, and BIGQUERY_TABLE to be set.
+    """
+    full_table = _get_full_table()
     query = f"SELECT * FROM {full_table} LIMIT {SAMPLE_LIMIT}"
-    try:
-        query_job = client.query(query)
-        rows = list(query_job.result(max_results=SAMPLE_LIMIT))
-    except Exception as e:
-        raise HTTPException(
-            status_code=502, detail=f"BigQuery request failed: {e!s}"
-        ) from e
-    out: list[dict[str, Any]] = []
-    for row in rows:
-        raw = dict(row)
-        out.append({k: _json_serial(v) for k, v in raw.items()})
-    return out
+    return await _run_query_rows(
+        client, query, label="sample", max_results=SAMPLE_LIMIT, short=True
+    )
+
+
+def _tokenized_table(full_table: str) -> str:
+    """Return *full_table* plus its ``name_tokens``, as a derived table.
+
+    ``name_tokens`` is the array of ``__XX__`` tokens in ad_name, computed
+    once per row here so the filters on it (and the batch query's unnest)
+    do not tokenize again. If BIGQUERY_NAME_TOKENS_COLUMN is set it names a
+    precomputed ``ARRAY<STRING>`` column (e.g. in a view or derived table)
+    holding these tokens, so they are not parsed per query at all.
+    Otherwise they are derived from ad_name like
+    :func:`services.ad_names.ad_name_tokens`: lowercased parts between
+    ``__`` delimiters, without the leading and trailing parts.
+    """
+    column = os.environ.get("BIGQUERY_NAME_TOKENS_COLUMN", "").strip()
+    if column == "name_tokens":
+        return f"{full_table} AS tokenized"
+    if column:
+        return f"(SELECT *, {column} AS name_tokens FROM {full_table}) AS tokenized"
+    return f"""(
+            SELECT
+                *,
+                ARRAY(
+                    SELECT part FROM UNNEST(name_parts) AS part WITH OFFSET pos
+                    WHERE pos > 0 AND pos < ARRAY_LENGTH(name_parts) - 1
+                ) AS name_tokens
+            FROM (
+                SELECT *, SPLIT(LOWER({COL_AD_NAME}), '{TOKEN_SEPARATOR}') AS name_parts
+                FROM {full_table}
+            )
+        ) AS tokenized"""
+
+
+def _token_clauses(acronym_sql: str | None, *, p1_only: bool) -> list[str]:
+    """Return WHERE clauses on ``name_tokens`` (see :func:`_tokenized_table`).
 
+    *acronym_sql* is the SQL value (a parameter) holding the lowercased
+    acronym, matched by exact token equality (None: no acronym clause); with
+    *p1_only* the ``p1`` token is required too.
+    """
+    clauses = []
+    if acronym_sql is not None:
+        clauses.append(f"{acronym_sql} IN UNNEST(name_tokens)")
+    if p1_only:
+        clauses.append(f"'{P1_TOKEN}' IN UNNEST(name_tokens)")
+    return clauses
 
-def _acronym_substring(acronym: str) -> str:
-    """Build underscore-delimited pattern for acronym in ad_name.
 
-    Ad names encode the employee acronym as ``__XX__`` (double underscores).
-    Returns the lowercased pattern ready for a case-insensitive LIKE / CONTAINS.
+@dataclass(frozen=True)
+class PerformancePage:
+    """Which per-ad rows to return: filter, order, window and columns.
+
+    Rows are ordered by *sort* (NULLs first ascending, last descending), then
+    by ``ad_name`` so pages are stable.
     """
-    return f"__{acronym.strip().lower()}__"
+
+    sort: str = "spend"
+    descending: bool = True
+    limit: int | None = None
+    offset: int = 0
+    min_spend: float | None = None
+    fields: tuple[str, ...] = PERFORMANCE_FIELDS
 
 
 def _build_performance_query(
@@ -167,31 +992,86 @@ def _build_performance_query(
     *,
     p1_only: bool = True,
     has_date_filter: bool = False,
+    with_total: bool = False,
+    page: PerformancePage | None = None,
 ) -> str:
     """Build SQL for employee_acronym filter, dedup by ad_name only.
 
-    When *p1_only* is True the query includes a ``__P1__`` substring filter
-    on ad_name.  When *has_date_filter* is True the query includes a BETWEEN
-    predicate on the configured date column.
+    Ads match when ``@acronym`` is one of their ad-name tokens; when
+    *p1_only* is True the ``P1`` token is required too.  When
+    *has_date_filter* is True the query includes a BETWEEN predicate on the
+    configured date column.  When *with_total* is True the grouping is
+    ``ROLLUP(ad_name)``: one extra row with ``is_total = 1`` carries the
+    blended totals, so a single job yields both the per-ad rows and the
+    summary.  When *page* is given the query returns only that page (see
+    :func:`_build_performance_page_query`) and *with_total* is ignored.
     """
-    acronym_clause = f"LOWER({COL_AD_NAME}) LIKE @acronym_pattern"
-    where_clauses = [acronym_clause]
-    if p1_only:
-        where_clauses.append(f"LOWER({COL_AD_NAME}) LIKE '%__p1__%'")
+    where_clauses = _token_clauses("@acronym", p1_only=p1_only)
     if has_date_filter:
         date_col = _get_date_column()
         where_clauses.append(f"DATE({date_col}) BETWEEN @start_date AND @end_date")
     where = "\n      AND ".join(where_clauses)
+    if page is not None:
+        return _build_performance_page_query(full_table, where, page)
+    if with_total:
+        total_column = f",\n        GROUPING({COL_AD_NAME}) AS is_total"
+        group_by = f"ROLLUP({COL_AD_NAME})"
+        order_by = "is_total DESC, spend DESC"
+    else:
+        total_column = ""
+        group_by = COL_AD_NAME
+        order_by = "spend DESC"
 
     return f"""
     SELECT
         {COL_AD_NAME} AS ad_name,
         SUM({COL_SPEND}) AS spend,
-        SAFE_DIVIDE(SUM({COL_REVENUE}), SUM({COL_SPEND})) AS croas
-    FROM {full_table}
+        SUM({COL_REVENUE}) AS revenue,
+        SAFE_DIVIDE(SUM({COL_REVENUE}), SUM({COL_SPEND})) AS croas{total_column}
+    FROM {_tokenized_table(full_table)}
     WHERE {where}
-    GROUP BY {COL_AD_NAME}
-    ORDER BY spend DESC
+    GROUP BY {group_by}
+    ORDER BY {order_by}
+    """
+
+
+def _build_performance_page_query(
+    full_table: str, where: str, page: PerformancePage
+) -> str:
+    """Build SQL for one page of per-ad rows plus the total matching ads.
+
+    ``min_spend`` becomes a HAVING clause and the order, ``@limit`` and
+    ``@offset`` are applied in BigQuery; only *page.fields* are selected.
+    Every row carries ``total_count``, the number of ads before the window.
+    When the page is empty, a single row with ``in_page`` NULL still carries
+    the count.
+    """
+    having = f"\n        HAVING SUM({COL_SPEND}) >= @min_spend"
+    if page.min_spend is None:
+        having = ""
+    direction = "DESC" if page.descending else "ASC"
+    columns = ", ".join(f"page.{field}" for field in page.fields)
+    return f"""
+    WITH ads AS (
+        SELECT
+            {COL_AD_NAME} AS ad_name,
+            SUM({COL_SPEND}) AS spend,
+            SUM({COL_REVENUE}) AS revenue,
+            SAFE_DIVIDE(SUM({COL_REVENUE}), SUM({COL_SPEND})) AS croas
+        FROM {_tokenized_table(full_table)}
+        WHERE {where}
+        GROUP BY {COL_AD_NAME}{having}
+    ),
+    page AS (
+        SELECT *, TRUE AS in_page
+        FROM ads
+        ORDER BY {page.sort} {direction}, ad_name
+        LIMIT @limit OFFSET @offset
+    )
+    SELECT {columns}, page.in_page, total.total_count
+    FROM (SELECT COUNT(*) AS total_count FROM ads) AS total
+    LEFT JOIN page ON TRUE
+    ORDER BY page.{page.sort} {direction}, page.ad_name
     """
 
 
@@ -207,10 +1087,7 @@ def _build_performance_summary_query(
     final aggregation into BigQuery so the backend receives one row
     instead of materializing thousands of per-ad rows in memory.
     """
-    acronym_clause = f"LOWER({COL_AD_NAME}) LIKE @acronym_pattern"
-    where_clauses = [acronym_clause]
-    if p1_only:
-        where_clauses.append(f"LOWER({COL_AD_NAME}) LIKE '%__p1__%'")
+    where_clauses = _token_clauses("@acronym", p1_only=p1_only)
     if has_date_filter:
         date_col = _get_date_column()
         where_clauses.append(f"DATE({date_col}) BETWEEN @start_date AND @end_date")
@@ -222,7 +1099,7 @@ def _build_performance_summary_query(
             {COL_AD_NAME},
             SUM({COL_SPEND}) AS spend,
             SUM({COL_REVENUE}) AS revenue
-        FROM {full_table}
+        FROM {_tokenized_table(full_table)}
         WHERE {where}
         GROUP BY {COL_AD_NAME}
     )
@@ -234,29 +1111,232 @@ def _build_performance_summary_query(
     """
 
 
-def _build_cache_key(
-    acronym: str,
-    p1_only: bool,
-    start_date: str | None,
-    end_date: str | None,
+def _build_performance_summary_batch_query(
+    full_table: str,
+    *,
+    p1_only: bool = True,
+    has_date_filter: bool = False,
 ) -> str:
-    parts = [acronym.strip().lower()]
-    parts.append("p1" if p1_only else "all")
-    if start_date and end_date:
-        parts.append(f"{start_date}_{end_date}")
-    return "|".join(parts)
+    """Build SQL returning one summary row per requested acronym.
+
+    Each row's tokens (computed once, see :func:`_tokenized_table`) are
+    unnested and those in ``@acronyms`` kept, the same token equality the
+    single-acronym queries use; rows are then grouped on the acronym, so the
+    whole batch is served by one scan of the table. Tokens are deduplicated
+    so an acronym repeated in one ad name is not counted twice.
+    """
+    where_clauses = _token_clauses(None, p1_only=p1_only)
+    if has_date_filter:
+        date_col = _get_date_column()
+        where_clauses.append(f"DATE({date_col}) BETWEEN @start_date AND @end_date")
+    where = "\n          AND ".join(where_clauses) or "TRUE"
+
+    return f"""
+    WITH per_ad AS (
+        SELECT
+            acronym,
+            {COL_AD_NAME},
+            SUM({COL_SPEND}) AS spend,
+            SUM({COL_REVENUE}) AS revenue
+        FROM {_tokenized_table(full_table)}
+        CROSS JOIN UNNEST(
+            ARRAY(
+                SELECT DISTINCT token FROM UNNEST(name_tokens) AS token
+                WHERE token IN UNNEST(@acronyms)
+            )
+        ) AS acronym
+        WHERE {where}
+        GROUP BY acronym, {COL_AD_NAME}
+    )
+    SELECT
+        acronym,
+        COALESCE(SUM(spend), 0) AS total_spend,
+        SAFE_DIVIDE(SUM(revenue), SUM(spend)) AS blended_croas,
+        COUNT(*) AS row_count
+    FROM per_ad
+    GROUP BY acronym
+    """
+
+
+def _build_daily_performance_query(full_table: str) -> str:
+    """Build SQL returning spend/revenue sums per (ad_name, day).
+
+    Only the days in ``@days`` are read; the BETWEEN bound on the same column
+    lets BigQuery prune partitions outside the span of those days.
+    """
+    date_col = _get_date_column()
+    (acronym_clause,) = _token_clauses("@acronym", p1_only=False)
+    return f"""
+    SELECT
+        {COL_AD_NAME} AS ad_name,
+        DATE({date_col}) AS day,
+        SUM({COL_SPEND}) AS spend,
+        SUM({COL_REVENUE}) AS revenue
+    FROM {_tokenized_table(full_table)}
+    WHERE {acronym_clause}
+      AND DATE({date_col}) BETWEEN @start_date AND @end_date
+      AND DATE({date_col}) IN UNNEST(@days)
+    GROUP BY ad_name, day
+    """
+
+
+def _build_cache_key(
+    acronym: str,
+    p1_only: bool,
+    start_date: str | None,
+    end_date: str | None,
+) -> str:
+    parts = [normalize_token(acronym)]
+    parts.append("p1" if p1_only else "all")
+    if start_date and end_date:
+        parts.append(f"{start_date}_{end_date}")
+    return "|".join(parts)
+
+
+def _build_day_cache_key(acronym: str, day: date) -> str:
+    return f"{normalize_token(acronym)}|all|{day.isoformat()}"
+
+
+def _days_in_range(start_date: str, end_date: str) -> list[date]:
+    """Return every day from *start_date* to *end_date* inclusive.
+
+    Raises 422 for malformed dates or a range longer than
+    ``DAILY_BUCKET_MAX_DAYS``; a reversed range is empty.
+    """
+    try:
+        start = date.fromisoformat(start_date)
+        end = date.fromisoformat(end_date)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=422,
+            detail="start_date and end_date must be YYYY-MM-DD",
+        ) from e
+    span = (end - start).days + 1
+    if span > DAILY_BUCKET_MAX_DAYS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Date range is limited to {DAILY_BUCKET_MAX_DAYS} days",
+        )
+    return [start + timedelta(days=i) for i in range(max(span, 0))]
+
+
+def _merge_daily_buckets(
+    buckets: list[dict[str, tuple[float, float]]],
+) -> list[dict[str, Any]]:
+    """Combine per-day buckets into ``/performance`` rows.
+
+    Spend and revenue are summed per ad across the days and cROAS is
+    recomputed from the merged sums, exactly as the range query would.
+    """
+    totals: dict[str, list[float]] = {}
+    for bucket in buckets:
+        for ad_name, (spend, revenue) in bucket.items():
+            sums = totals.setdefault(ad_name, [0.0, 0.0])
+            sums[0] += spend
+            sums[1] += revenue
+    rows = [
+        {
+            "ad_name": ad_name,
+            "spend": spend,
+            "revenue": revenue,
+            "croas": revenue / spend if spend else None,
+        }
+        for ad_name, (spend, revenue) in totals.items()
+    ]
+    rows.sort(key=lambda row: row["spend"], reverse=True)
+    return rows
+
+
+async def _load_daily_performance(
+    client: bigquery.Client,
+    acronym: str,
+    start_date: str,
+    end_date: str,
+) -> list[dict[str, Any]]:
+    """Answer a date-range request from per-day buckets.
+
+    Days already in ``_daily_cache`` are reused; the rest are read with one
+    BigQuery job and cached (days without matching ads as empty buckets).
+    """
+    days = _days_in_range(start_date, end_date)
+    buckets: dict[date, dict[str, tuple[float, float]]] = {}
+    missing: list[date] = []
+    for day in days:
+        bucket = _daily_cache.get(_build_day_cache_key(acronym, day))
+        if bucket is None:
+            missing.append(day)
+        else:
+            buckets[day] = bucket
+
+    if missing:
+        fetched: dict[date, dict[str, tuple[float, float]]] = {
+            day: {} for day in missing
+        }
+        query = _build_daily_performance_query(_get_full_table())
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter(
+                    "acronym", "STRING", normalize_token(acronym)
+                ),
+                bigquery.ScalarQueryParameter("start_date", "DATE", missing[0]),
+                bigquery.ScalarQueryParameter("end_date", "DATE", missing[-1]),
+                bigquery.ArrayQueryParameter("days", "DATE", missing),
+            ],
+        )
+        for row in await _run_query_rows(client, query, job_config, label="daily"):
+            day = row["day"]
+            if isinstance(day, str):
+                day = date.fromisoformat(day)
+            fetched.setdefault(day, {})[row["ad_name"]] = (
+                float(row["spend"] or 0),
+                float(row["revenue"] or 0),
+            )
+        for day, bucket in fetched.items():
+            _daily_cache.set(_build_day_cache_key(acronym, day), bucket)
+        buckets.update(fetched)
+
+    return _merge_daily_buckets([buckets[day] for day in days if day in buckets])
 
 
 def _build_query_params(
-    acronym_pattern: str,
+    acronym: str,
     p1_only: bool,
     start_date: str | None,
     end_date: str | None,
 ) -> list[bigquery.ScalarQueryParameter]:
     params: list[bigquery.ScalarQueryParameter] = [
+        bigquery.ScalarQueryParameter("acronym", "STRING", normalize_token(acronym)),
+    ]
+    if not p1_only and start_date and end_date:
+        params.append(bigquery.ScalarQueryParameter("start_date", "DATE", start_date))
+        params.append(bigquery.ScalarQueryParameter("end_date", "DATE", end_date))
+    return params
+
+
+def _build_page_query_params(
+    page: PerformancePage,
+) -> list[bigquery.ScalarQueryParameter]:
+    params = [
         bigquery.ScalarQueryParameter(
-            "acronym_pattern", "STRING", f"%{acronym_pattern}%"
+            "limit", "INT64", _INT64_MAX if page.limit is None else page.limit
         ),
+        bigquery.ScalarQueryParameter("offset", "INT64", page.offset),
+    ]
+    if page.min_spend is not None:
+        params.append(
+            bigquery.ScalarQueryParameter("min_spend", "FLOAT64", page.min_spend)
+        )
+    return params
+
+
+def _build_batch_query_params(
+    acronyms: list[str],
+    p1_only: bool,
+    start_date: str | None,
+    end_date: str | None,
+) -> list[bigquery.ScalarQueryParameter | bigquery.ArrayQueryParameter]:
+    params: list[bigquery.ScalarQueryParameter | bigquery.ArrayQueryParameter] = [
+        bigquery.ArrayQueryParameter("acronyms", "STRING", acronyms),
     ]
     if not p1_only and start_date and end_date:
         params.append(bigquery.ScalarQueryParameter("start_date", "DATE", start_date))
@@ -264,8 +1344,14 @@ def _build_query_params(
     return params
 
 
-@router.get("/performance", response_model=list[dict[str, Any]])
-def get_performance(
+@router.get(
+    "/performance",
+    response_model=list[dict[str, Any]],
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def get_performance(
+    request: Request,
+    response: Response,
     client: bigquery.Client = Depends(get_bigquery_client),
     employee_acronym: str = Query(
         ...,
@@ -284,79 +1370,433 @@ def get_performance(
         None,
         description="End of date range (YYYY-MM-DD). Used when p1_only=false.",
     ),
-) -> list[dict[str, Any]]:
+    limit: int | None = Query(
+        None,
+        ge=1,
+        le=PERFORMANCE_MAX_PAGE_SIZE,
+        description="Return at most this many ads (default: all).",
+    ),
+    offset: int = Query(0, ge=0, description="Skip this many ads first."),
+    sort: Literal["spend", "croas", "ad_name"] = Query(
+        "spend", description="Column to order ads by."
+    ),
+    order: Literal["asc", "desc"] | None = Query(
+        None,
+        description="Sort direction. Default: desc for spend/croas, asc for ad_name.",
+    ),
+    min_spend: float | None = Query(
+        None, ge=0, description="Only ads with at least this total spend."
+    ),
+    fields: str | None = Query(
+        None,
+        description="Comma-separated columns to return (ad_name, spend, revenue, "
+        "croas). Default: all.",
+    ),
+    stream: bool = Query(
+        False,
+        description="Stream rows as NDJSON (same as Accept: application/x-ndjson).",
+    ),
+    accept: str | None = Header(None),
+) -> Response:
     """
     Return deduplicated ad performance by employee acronym.
 
     By default filters to P1 campaigns. When ``p1_only=false`` and dates are
-    provided, filters by the configured date column instead.
+    provided, filters by the configured date column instead. The ``Age``
+    response header gives the age of the (possibly cached) data in seconds
+    and ``X-Total-Count`` the number of matching ads before ``limit`` and
+    ``offset``. Pages are cut from a cached full result when there is one
+    and queried from BigQuery (filtered, sorted and windowed there) when not.
+    With ``stream=true`` or ``Accept: application/x-ndjson`` the full result
+    is sent as newline-delimited JSON while BigQuery result pages arrive;
+    combining that with ``limit``, ``offset``, ``sort``, ``order``,
+    ``min_spend`` or ``fields`` is a 422.
     """
     has_date_filter = not p1_only and bool(start_date) and bool(end_date)
     cache_key = _build_cache_key(employee_acronym, p1_only, start_date, end_date)
-    cached = _get_cached_performance(cache_key)
-    if cached is not None:
-        return cached
-
-    project = os.environ.get("GCP_PROJECT")
-    dataset = os.environ.get("BIGQUERY_DATASET")
-    table = os.environ.get("BIGQUERY_TABLE")
-    if not project or not dataset or not table:
+    page = _build_page(limit, offset, sort, order, min_spend, fields)
+    streamed = stream or NDJSON_MEDIA_TYPE in (accept or "")
+    if streamed and page is not None:
         raise HTTPException(
-            status_code=503,
-            detail=(
-                "BigQuery table not configured: set GCP_PROJECT, "
-                "BIGQUERY_DATASET, BIGQUERY_TABLE"
+            status_code=422,
+            detail="Streaming sends the full result: drop limit, offset, sort, "
+            "order, min_spend and fields, or ask for JSON",
+        )
+
+    @_one_worker_at_a_time(_performance_cache, cache_key)
+    async def load() -> Encoded[list[dict[str, Any]]]:
+        # Re-check: a call that finished just before this one became leader
+        # may already have filled the cache.
+        cached = await _performance_cache.aget(cache_key)
+        if cached is not None:
+            return cached
+        per_ad = await _query_local_performance(
+            employee_acronym, p1_only, start_date, end_date
+        )
+        if per_ad is None and not p1_only and start_date and end_date:
+            per_ad = await _load_daily_performance(
+                client, employee_acronym, start_date, end_date
+            )
+        if per_ad is not None:
+            await _summary_cache.aset(
+                cache_key, _encode(_summarize_performance_rows(per_ad))
+            )
+            return await _cache_performance(cache_key, per_ad)
+        full_table = _get_full_table()
+        query = _build_performance_query(
+            full_table,
+            p1_only=p1_only,
+            has_date_filter=has_date_filter,
+            with_total=True,
+        )
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=_build_query_params(
+                employee_acronym, p1_only, start_date, end_date
             ),
         )
-    full_table = f"`{project}`.`{dataset}`.`{table}`"
+        rows = await _run_query_rows(client, query, job_config, label="performance")
+        out: list[dict[str, Any]] = []
+        total: dict[str, Any] | None = None
+        for row in rows:
+            if row.pop("is_total", 0):
+                total = row
+            else:
+                out.append(row)
+
+        if total is not None:
+            # The ROLLUP total row is the same aggregation the summary query
+            # computes, so the summary view is filled by this job too.
+            await _summary_cache.aset(cache_key, _total_summary(total, len(out)))
+        return await _cache_performance(cache_key, out)
+
+    if page is not None:
+        hit = await _performance_cache.alookup(cache_key)
+        if hit is not None:
+            if hit.stale:
+                _schedule_refresh("performance", _performance_flight, cache_key, load)
+            return await _page_response(
+                request, *_cut_page(hit.value.value, page), age=hit.age
+            )
+        if _use_local_store():
+            entry = await _while_connected(
+                request, _performance_flight.do(cache_key, load)
+            )
+            return await _page_response(request, *_cut_page(entry.value, page), age=0)
+        try:
+            rows, total_count = await _while_connected(
+                request,
+                _query_performance_page(
+                    client, page, employee_acronym, p1_only, start_date, end_date
+                ),
+            )
+        except HTTPException as e:
+            hit = await _last_good(_performance_cache, cache_key, e)
+            if hit is None:
+                raise
+            return await _page_response(
+                request, *_cut_page(hit.value.value, page), age=hit.age, stale=True
+            )
+        return await _page_response(request, rows, total_count, age=0)
+
+    if streamed:
+        hit = await _performance_cache.alookup(cache_key)
+        if hit is not None:
+            if hit.stale:
+                _schedule_refresh("performance", _performance_flight, cache_key, load)
+            return _ndjson_response(_ndjson_lines(hit.value.value), age=hit.age)
+        if _use_local_store():
+            entry = await _while_connected(
+                request, _performance_flight.do(cache_key, load)
+            )
+            return _ndjson_response(_ndjson_lines(entry.value), age=0)
+        try:
+            return await _while_connected(
+                request,
+                _stream_performance(
+                    client, cache_key, employee_acronym, p1_only, start_date, end_date
+                ),
+            )
+        except HTTPException as e:
+            hit = await _last_good(_performance_cache, cache_key, e)
+            if hit is None:
+                raise
+            return _ndjson_response(
+                _ndjson_lines(hit.value.value), age=hit.age, stale=True
+            )
+
+    entry = await _while_connected(
+        request,
+        _cached_or_load(
+            "performance",
+            _performance_cache,
+            _performance_flight,
+            cache_key,
+            load,
+            response,
+        ),
+    )
+    response.headers["X-Total-Count"] = str(len(entry.value))
+    return _encoded_response(entry, request, response)
+
+
+def _build_page(
+    limit: int | None,
+    offset: int,
+    sort: str,
+    order: str | None,
+    min_spend: float | None,
+    fields: str | None,
+) -> PerformancePage | None:
+    """Return the requested page, or None when all ads are wanted as-is.
+
+    Raises 422 for unknown ``fields``.
+    """
+    page = PerformancePage(
+        sort=sort,
+        descending=(order or ("asc" if sort == "ad_name" else "desc")) == "desc",
+        limit=limit,
+        offset=offset,
+        min_spend=min_spend,
+    )
+    if fields is not None:
+        names = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+        unknown = [name for name in names if name not in PERFORMANCE_FIELDS]
+        if not names or unknown:
+            raise HTTPException(
+                status_code=422,
+                detail=f"fields must be a comma-separated subset of "
+                f"{', '.join(PERFORMANCE_FIELDS)}",
+            )
+        page = replace(page, fields=names)
+    return None if page == PerformancePage() else page
+
+
+def _cut_page(
+    rows: list[dict[str, Any]], page: PerformancePage
+) -> tuple[list[dict[str, Any]], int]:
+    """Apply *page* to a full per-ad result; return the page and the total.
+
+    Filters and orders exactly like :func:`_build_performance_page_query`.
+    """
+    if page.min_spend is not None:
+        rows = [
+            row
+            for row in rows
+            if row.get("spend") is not None and row["spend"] >= page.min_spend
+        ]
+    ordered = sorted(rows, key=lambda row: _nulls_first(row.get("ad_name")))
+    # Stable sort: ties keep the ad_name order. Reversing moves NULLs last.
+    ordered.sort(
+        key=lambda row: _nulls_first(row.get(page.sort)), reverse=page.descending
+    )
+    end = None if page.limit is None else page.offset + page.limit
+    window = ordered[page.offset : end]
+    if page.fields != PERFORMANCE_FIELDS:
+        window = [{field: row.get(field) for field in page.fields} for row in window]
+    return window, len(ordered)
+
+
+def _nulls_first(value: Any) -> tuple[bool, Any]:
+    """Sort key placing None before any value, as BigQuery does ascending."""
+    return (value is not None, value)
+
+
+async def _query_performance_page(
+    client: bigquery.Client,
+    page: PerformancePage,
+    employee_acronym: str,
+    p1_only: bool,
+    start_date: str | None,
+    end_date: str | None,
+) -> tuple[list[dict[str, Any]], int]:
+    """Query one page of per-ad rows from BigQuery; return it and the total.
+
+    Date ranges are read with one query over the range (per-day buckets
+    would have to be merged in full to sort them).
+    """
+    has_date_filter = not p1_only and bool(start_date) and bool(end_date)
+    if has_date_filter:
+        _days_in_range(start_date or "", end_date or "")
     query = _build_performance_query(
-        full_table, p1_only=p1_only, has_date_filter=has_date_filter
+        _get_full_table(),
+        p1_only=p1_only,
+        has_date_filter=has_date_filter,
+        page=page,
     )
-    acronym_pattern = _acronym_substring(employee_acronym)
     job_config = bigquery.QueryJobConfig(
         query_parameters=_build_query_params(
-            acronym_pattern, p1_only, start_date, end_date
-        ),
+            employee_acronym, p1_only, start_date, end_date
+        )
+        + _build_page_query_params(page),
     )
-    try:
-        query_job = client.query(query, job_config=job_config)
-        rows = list(query_job.result())
-    except Exception as e:
-        raise HTTPException(
-            status_code=502, detail=f"BigQuery request failed: {e!s}"
-        ) from e
-    out: list[dict[str, Any]] = []
+    rows = await _run_query_rows(client, query, job_config, label="performance_page")
+    total_count = int(rows[0]["total_count"]) if rows else 0
+    out = [
+        {field: row[field] for field in page.fields}
+        for row in rows
+        if row.get("in_page")
+    ]
+    return out, total_count
+
+
+async def _page_response(
+    request: Request,
+    rows: list[dict[str, Any]],
+    total_count: int,
+    *,
+    age: float,
+    stale: bool = False,
+) -> Response:
+    """Send a page of rows with its ``Age`` and ``X-Total-Count`` headers."""
+    headers = {"Age": str(int(age)), "X-Total-Count": str(total_count)}
+    if stale:
+        headers["X-Stale"] = "1"
+    entry = await _encode_off_loop(rows)
+    return encoded_response(entry, request.headers, headers)
+
+
+async def _cache_performance(
+    cache_key: str, rows: list[dict[str, Any]]
+) -> Encoded[list[dict[str, Any]]]:
+    """Encode per-ad *rows* once and cache them under *cache_key*."""
+    entry = await _encode_off_loop(rows)
+    await _performance_cache.aset(cache_key, entry)
+    return entry
+
+
+def _total_summary(total: dict[str, Any], row_count: int) -> Encoded[dict[str, Any]]:
+    """Build the summary from the ROLLUP total row of the performance query."""
+    return _encode(
+        {
+            "total_spend": total["spend"] or 0,
+            "blended_croas": total["croas"],
+            "row_count": row_count,
+        }
+    )
+
+
+def _ndjson_lines(rows: Iterable[dict[str, Any]]) -> Iterable[bytes]:
+    """Encode *rows* as newline-delimited JSON, one line per row."""
     for row in rows:
-        raw = dict(row)
-        out.append({k: _json_serial(v) for k, v in raw.items()})
+        yield dumps(row) + b"\n"
 
-    _set_cached_performance(cache_key, out)
-    return out
 
+def _ndjson_response(
+    lines: Iterable[bytes] | AsyncIterator[bytes], *, age: float, stale: bool = False
+) -> StreamingResponse:
+    """Stream NDJSON *lines*, with ``Age`` giving the data's age in seconds."""
+    headers = {"Age": str(int(age))}
+    if stale:
+        headers["X-Stale"] = "1"
+    return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE, headers=headers)
 
-_summary_cache: dict[str, tuple[float, dict[str, Any]]] = {}
-_summary_cache_lock = threading.Lock()
 
+async def _stream_performance(
+    client: bigquery.Client,
+    cache_key: str,
+    employee_acronym: str,
+    p1_only: bool,
+    start_date: str | None,
+    end_date: str | None,
+) -> StreamingResponse:
+    """Run the per-ad query and stream its rows as NDJSON, page by page.
 
-def _get_cached_summary(cache_key: str) -> dict[str, Any] | None:
-    with _summary_cache_lock:
-        entry = _summary_cache.get(cache_key)
-        if entry is None:
-            return None
-        cached_at, data = entry
-        if _time.monotonic() - cached_at > PERFORMANCE_CACHE_TTL_SECONDS:
-            del _summary_cache[cache_key]
+    The job runs (and is refused or fails with the usual status codes) before
+    the response starts. Rows are then converted and sent one result page of
+    ``PERFORMANCE_STREAM_PAGE_SIZE`` rows at a time, so memory stays bounded
+    by the page size rather than the result size. Date ranges are read with
+    one query over the range instead of per-day buckets. Streamed rows are
+    not cached; the ROLLUP total row, which comes first, fills the summary
+    cache once the stream completes.
+    """
+    has_date_filter = not p1_only and bool(start_date) and bool(end_date)
+    if has_date_filter:
+        _days_in_range(start_date or "", end_date or "")
+    query = _build_performance_query(
+        _get_full_table(),
+        p1_only=p1_only,
+        has_date_filter=has_date_filter,
+        with_total=True,
+    )
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=_build_query_params(
+            employee_acronym, p1_only, start_date, end_date
+        ),
+    )
+    result = await _run_job(
+        client,
+        query,
+        job_config,
+        label="performance",
+        fetch=lambda job: job.result(
+            page_size=PERFORMANCE_STREAM_PAGE_SIZE, timeout=_query_timeout()
+        ),
+    )
+
+    pages = iter(result.pages)
+
+    def next_chunk() -> tuple[bytes, int, dict[str, Any] | None] | None:
+        """Fetch and encode the next page: its NDJSON, row count and total row."""
+        page = next(pages, None)
+        if page is None:
             return None
-        return data
+        chunk: list[bytes] = []
+        total: dict[str, Any] | None = None
+        for row in _rows_to_dicts(result.schema, page):
+            if row.pop("is_total", 0):
+                total = row
+            else:
+                chunk.append(dumps(row) + b"\n")
+        return b"".join(chunk), len(chunk), total
+
+    async def lines() -> AsyncIterator[bytes]:
+        total: dict[str, Any] | None = None
+        row_count = 0
+        # Fetching a page may go over the network and encoding it is CPU
+        # work, so both run off the loop.
+        while (next_page := await asyncio.to_thread(next_chunk)) is not None:
+            chunk, count, page_total = next_page
+            row_count += count
+            if page_total is not None:
+                total = page_total
+            if chunk:
+                yield chunk
+        if total is not None:
+            await _summary_cache.aset(cache_key, _total_summary(total, row_count))
 
+    return _ndjson_response(lines(), age=0)
 
-def _set_cached_summary(cache_key: str, data: dict[str, Any]) -> None:
-    with _summary_cache_lock:
-        _summary_cache[cache_key] = (_time.monotonic(), data)
 
+def _empty_summary() -> dict[str, Any]:
+    """Summary returned when no ads match the filters.
 
-@router.get("/performance/summary")
-def get_performance_summary(
+    Matches the summary query over no rows: ``SAFE_DIVIDE`` by a zero (or
+    null) spend gives a null blended cROAS.
+    """
+    return {"total_spend": 0, "blended_croas": None, "row_count": 0}
+
+
+def _summarize_performance_rows(rows: list[dict[str, Any]]) -> dict[str, Any]:
+    """Re-aggregate per-ad rows into the ``/performance/summary`` shape.
+
+    Mirrors the summary query: spend and revenue are summed across ads and
+    blended cROAS is total revenue over total spend (None when spend is 0).
+    """
+    if not rows:
+        return _empty_summary()
+    total_spend = sum(row.get("spend") or 0 for row in rows)
+    total_revenue = sum(row.get("revenue") or 0 for row in rows)
+    return {
+        "total_spend": total_spend,
+        "blended_croas": total_revenue / total_spend if total_spend else None,
+        "row_count": len(rows),
+    }
+
+
+@router.get("/performance/summary", response_model=dict[str, Any])
+async def get_performance_summary(
+    request: Request,
+    response: Response,
     client: bigquery.Client = Depends(get_bigquery_client),
     employee_acronym: str = Query(
         ...,
@@ -375,57 +1815,492 @@ def get_performance_summary(
         None,
         description="End of date range (YYYY-MM-DD). Used when p1_only=false.",
     ),
-) -> dict[str, Any]:
+) -> Response:
     """
     Return aggregated performance summary by employee acronym.
 
     By default filters to P1 campaigns. When ``p1_only=false`` and dates are
-    provided, filters by the configured date column instead.
+    provided, filters by the configured date column instead. The ``Age``
+    response header gives the age of the (possibly cached) data in seconds.
     """
     has_date_filter = not p1_only and bool(start_date) and bool(end_date)
     cache_key = _build_cache_key(employee_acronym, p1_only, start_date, end_date)
-    cached = _get_cached_summary(cache_key)
-    if cached is not None:
-        return cached
 
-    project = os.environ.get("GCP_PROJECT")
-    dataset = os.environ.get("BIGQUERY_DATASET")
-    table = os.environ.get("BIGQUERY_TABLE")
-    if not project or not dataset or not table:
-        raise HTTPException(
-            status_code=503,
-            detail=(
-                "BigQuery table not configured: set GCP_PROJECT, "
-                "BIGQUERY_DATASET, BIGQUERY_TABLE"
+    @_one_worker_at_a_time(_summary_cache, cache_key)
+    async def load() -> Encoded[dict[str, Any]]:
+        hit = await _cached_summary(cache_key)
+        if hit is not None:
+            return hit.value
+        per_ad = await _query_local_performance(
+            employee_acronym, p1_only, start_date, end_date
+        )
+        if per_ad is None and not p1_only and start_date and end_date:
+            per_ad = await _load_daily_performance(
+                client, employee_acronym, start_date, end_date
+            )
+        if per_ad is not None:
+            entry = _encode(_summarize_performance_rows(per_ad))
+            await _summary_cache.aset(cache_key, entry)
+            return entry
+        full_table = _get_full_table()
+        query = _build_performance_summary_query(
+            full_table, p1_only=p1_only, has_date_filter=has_date_filter
+        )
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=_build_query_params(
+                employee_acronym, p1_only, start_date, end_date
             ),
         )
-    full_table = f"`{project}`.`{dataset}`.`{table}`"
-    query = _build_performance_summary_query(
+        rows = await _run_query_rows(
+            client, query, job_config, label="summary", max_results=1, short=True
+        )
+        entry = _encode(rows[0] if rows else _empty_summary())
+        await _summary_cache.aset(cache_key, entry)
+        return entry
+
+    entry = await _while_connected(
+        request,
+        _cached_or_load(
+            "summary", _summary_cache, _summary_flight, cache_key, load, response
+        ),
+    )
+    return _encoded_response(entry, request, response)
+
+
+async def _cached_rows(cache_key: str) -> CacheHit[list[dict[str, Any]]] | None:
+    """Return the fresh cached per-ad rows for *cache_key* with their age."""
+    hit = await _performance_cache.afresh(cache_key)
+    return CacheHit(hit.value.value, hit.age, hit.stale) if hit is not None else None
+
+
+async def _cached_summary(cache_key: str) -> CacheHit[Encoded[dict[str, Any]]] | None:
+    """Return the fresh cached summary, or one made from the cached per-ad rows.
+
+    A summary of cached rows is cached as old as the rows.
+    """
+    hit = await _summary_cache.afresh(cache_key)
+    if hit is not None:
+        return hit
+    rows = await _cached_rows(cache_key)
+    if rows is None:
+        return None
+    summary = _encode(_summarize_performance_rows(rows.value))
+    await _summary_cache.aset(cache_key, summary, age=rows.age)
+    return CacheHit(summary, rows.age, rows.stale)
+
+
+AcronymStr = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+
+
+class PerformanceSummaryBatchRequest(BaseModel):
+    """Request body for ``POST /performance/summary/batch``."""
+
+    employee_acronyms: list[AcronymStr] = Field(
+        ...,
+        min_length=1,
+        max_length=SUMMARY_BATCH_MAX_ACRONYMS,
+        description="Acronyms as __XX__ substrings in ad_name (underscore-delimited)",
+    )
+    p1_only: bool = Field(
+        True,
+        description="Filter to P1 ads only. Set false for probationary date-range.",
+    )
+    start_date: str | None = Field(
+        None,
+        description="Start of date range (YYYY-MM-DD). Used when p1_only=false.",
+    )
+    end_date: str | None = Field(
+        None,
+        description="End of date range (YYYY-MM-DD). Used when p1_only=false.",
+    )
+
+
+@router.post("/performance/summary/batch", response_model=dict[str, dict[str, Any]])
+async def get_performance_summary_batch(
+    request: Request,
+    body: PerformanceSummaryBatchRequest,
+    client: bigquery.Client = Depends(get_bigquery_client),
+) -> Response:
+    """
+    Return aggregated performance summaries for several employee acronyms.
+
+    Acronyms already in the summary cache are answered from it; the rest are
+    computed together in a single grouped BigQuery job and written back to the
+    cache, so later single-acronym summary requests hit. The response is
+    spliced from the summaries' cached JSON encodings. When BigQuery fails
+    and every missing summary has a last good cached value, those are
+    served instead and ``X-Stale`` is set. Malformed dates or a range longer
+    than ``DAILY_BUCKET_MAX_DAYS`` are 422, as for the single summary.
+    """
+    if not body.p1_only and body.start_date and body.end_date:
+        _days_in_range(body.start_date, body.end_date)
+    stale: set[str] = set()
+    results = await _while_connected(
+        request,
+        _load_summaries(
+            client,
+            body.employee_acronyms,
+            body.p1_only,
+            body.start_date,
+            body.end_date,
+            stale=stale,
+        ),
+    )
+    return await _summaries_response(request, results, stale=bool(stale))
+
+
+async def _load_summaries(
+    client: bigquery.Client,
+    acronyms: list[str],
+    p1_only: bool,
+    start_date: str | None,
+    end_date: str | None,
+    *,
+    background: bool = False,
+    stale: set[str] | None = None,
+    ages: dict[str, float] | None = None,
+) -> dict[str, Encoded[dict[str, Any]]]:
+    """Return summaries for *acronyms*, querying the uncached ones in one job.
+
+    Results are written to the summary cache. With *background* (cache
+    warming) cached summaries and per-ad rows are not reused but replaced,
+    and the query queues behind user queries. Otherwise, if the query fails
+    and every uncached acronym has a last good summary, those are returned
+    and their acronyms added to *stale*. *ages* receives the age in seconds
+    of each summary answered from cached data.
+    """
+    has_date_filter = not p1_only and bool(start_date) and bool(end_date)
+    results: dict[str, Encoded[dict[str, Any]]] = {}
+    pending: dict[str, list[str]] = {}
+    for acronym in acronyms:
+        cache_key = _build_cache_key(acronym, p1_only, start_date, end_date)
+        hit = None if background else await _cached_summary(cache_key)
+        if hit is not None:
+            results[acronym] = hit.value
+            if ages is not None:
+                ages[acronym] = hit.age
+            continue
+        per_ad = await _query_local_performance(acronym, p1_only, start_date, end_date)
+        if per_ad is not None:
+            results[acronym] = _encode(_summarize_performance_rows(per_ad))
+            await _summary_cache.aset(cache_key, results[acronym])
+        else:
+            pending.setdefault(normalize_token(acronym), []).append(acronym)
+    if not pending:
+        return results
+
+    full_table = _get_full_table()
+    query = _build_performance_summary_batch_query(
         full_table, p1_only=p1_only, has_date_filter=has_date_filter
     )
-    acronym_pattern = _acronym_substring(employee_acronym)
     job_config = bigquery.QueryJobConfig(
-        query_parameters=_build_query_params(
-            acronym_pattern, p1_only, start_date, end_date
+        query_parameters=_build_batch_query_params(
+            list(pending), p1_only, start_date, end_date
         ),
     )
     try:
-        query_job = client.query(query, job_config=job_config)
-        rows = list(query_job.result(max_results=1))
-    except Exception as e:
-        raise HTTPException(
-            status_code=502, detail=f"BigQuery request failed: {e!s}"
-        ) from e
+        rows = await _run_query_rows(
+            client, query, job_config, label="summary_batch", background=background
+        )
+    except HTTPException as e:
+        if background:
+            raise
+        fallback: dict[str, Encoded[dict[str, Any]]] = {}
+        for normalized in pending:
+            hit = await _last_good(
+                _summary_cache,
+                _build_cache_key(normalized, p1_only, start_date, end_date),
+                e,
+            )
+            if hit is None:
+                raise
+            fallback[normalized] = hit.value
+        for normalized, spellings in pending.items():
+            for acronym in spellings:
+                results[acronym] = fallback[normalized]
+                if stale is not None:
+                    stale.add(acronym)
+        return results
+
+    fetched: dict[str, dict[str, Any]] = {}
+    for row in rows:
+        acronym = str(row.pop("acronym"))
+        fetched[acronym] = row
+
+    for normalized, spellings in pending.items():
+        summary = _encode(fetched.get(normalized) or _empty_summary())
+        await _summary_cache.aset(
+            _build_cache_key(normalized, p1_only, start_date, end_date), summary
+        )
+        for acronym in spellings:
+            results[acronym] = summary
+    return results
+
+
+def _join_summaries(results: dict[str, Encoded[dict[str, Any]]]) -> Encoded[None]:
+    """Join per-acronym summaries into one JSON object from their encodings."""
+    members = (dumps(acronym) + b":" + entry.body for acronym, entry in results.items())
+    body = b"{" + b",".join(members) + b"}"
+    return Encoded.from_body(None, body, compress_min_bytes=RESPONSE_COMPRESS_MIN_BYTES)
+
+
+async def _summaries_response(
+    request: Request,
+    results: dict[str, Encoded[dict[str, Any]]],
+    *,
+    stale: bool = False,
+) -> Response:
+    """Send the joined summaries, encoded off the event loop."""
+    entry = await asyncio.to_thread(_join_summaries, results)
+    return encoded_response(entry, request.headers, {"X-Stale": "1"} if stale else None)
+
+
+@router.get("/cache/stats")
+def get_cache_stats() -> dict[str, Any]:
+    """
+    Return size, hit and eviction stats for the performance caches.
+
+    ``backend`` names where the performance and summary caches are shared
+    between workers (``memory`` means per-process).
+
+    ``single_flight.coalesced`` counts requests that waited on an identical
+    in-flight BigQuery query instead of starting their own; ``queries``
+    reports running and queued BigQuery jobs and ``circuit`` the BigQuery
+    circuit breaker.
+    """
+    return {
+        "performance": {
+            **_performance_cache.stats(),
+            "single_flight": _performance_flight.stats(),
+        },
+        "summary": {
+            **_summary_cache.stats(),
+            "single_flight": _summary_flight.stats(),
+        },
+        "daily": _daily_cache.stats(),
+        "backend": _cache_backend.kind if _cache_backend else "memory",
+        "queries": _query_runner.stats(),
+        "governor": _query_runner.governor.stats() if _query_runner.governor else {},
+        "circuit": _circuit_breaker.stats(),
+    }
+
+
+@router.post("/rollups/sync")
+async def post_rollup_sync(
+    client: bigquery.Client = Depends(get_bigquery_client),
+) -> dict[str, Any]:
+    """
+    Sync the local rollup store from BigQuery now (e.g. after an ETL load).
+
+    Returns the first re-synced day (null for a full sync), the number of
+    (ad_name, day) rows written and the resulting store status.
+    """
+    result = await sync_rollups(client)
+    status = await asyncio.to_thread(_get_rollup_store().status)
+    return {**result, "store": status}
+
+
+@router.get("/rollups/status")
+async def get_rollup_status() -> dict[str, Any]:
+    """Return the query mode and the local rollup store's contents and sync time."""
+    status = await asyncio.to_thread(_get_rollup_store().status)
+    return {"mode": "local" if _use_local_store() else "live", "store": status}
+
+
+async def _warm_summaries(
+    client: bigquery.Client,
+    acronyms: list[str],
+    p1_only: bool,
+    start_date: str | None,
+    end_date: str | None,
+) -> int:
+    summaries = await _load_summaries(
+        client, acronyms, p1_only, start_date, end_date, background=True
+    )
+    return len(summaries)
+
+
+SummaryKey = tuple[str, str | None, str | None]
+
+
+def summary_key(employee: Mapping[str, Any]) -> SummaryKey | None:
+    """Return the ``(acronym, start, end)`` summary the dashboard shows.
+
+    Probationary employees get their ``(startDate, reviewDate)`` range, and
+    None without both dates. Everyone else counts as tenured, as on the
+    settings page, and gets ``(None, None)`` (P1 summaries). None without
+    an acronym.
+    """
+    acronym = str(employee.get("acronym") or "").strip()
+    if not acronym:
+        return None
+    if employee.get("status") != "probationary":
+        return acronym, None, None
+    start_date, end_date = employee.get("startDate"), employee.get("reviewDate")
+    if start_date and end_date:
+        return acronym, start_date, end_date
+    return None
+
+
+def _summary_groups(
+    employees: Iterable[Mapping[str, Any]],
+) -> dict[tuple[str | None, str | None], list[str]]:
+    """Group employee acronyms by their :func:`summary_key` date range."""
+    groups: dict[tuple[str | None, str | None], list[str]] = {}
+    for employee in employees:
+        key = summary_key(employee)
+        if key is None:
+            continue
+        acronym, start_date, end_date = key
+        group = groups.setdefault((start_date, end_date), [])
+        if acronym not in group:
+            group.append(acronym)
+    return groups
+
+
+def _summary_chunks(
+    employees: Iterable[Mapping[str, Any]],
+) -> list[tuple[str | None, str | None, list[str]]]:
+    """Split :func:`_summary_groups` into batches of at most the batch size."""
+    chunks = []
+    for (start_date, end_date), acronyms in _summary_groups(employees).items():
+        for i in range(0, len(acronyms), SUMMARY_BATCH_MAX_ACRONYMS):
+            chunks.append(
+                (start_date, end_date, acronyms[i : i + SUMMARY_BATCH_MAX_ACRONYMS])
+            )
+    return chunks
+
+
+async def load_employee_summaries(
+    client: bigquery.Client,
+    employees: Iterable[Mapping[str, Any]],
+    *,
+    stale: set[SummaryKey] | None = None,
+    ages: dict[SummaryKey, float] | None = None,
+) -> dict[SummaryKey, dict[str, Any] | Exception]:
+    """Return the dashboard summary of each employee, keyed by :func:`summary_key`.
+
+    Tenured employees get their P1 summaries, probationary employees their
+    ``startDate``..``reviewDate`` summaries; probationary employees without
+    both dates are left out. Each batch is loaded like ``POST
+    /performance/summary/batch`` (cache first, one job for the rest) and the
+    batches run concurrently. Keys in a batch that failed map to its
+    exception; those answered with last good data are added to *stale*, and
+    *ages* receives the age of those answered from cached data.
+    """
+    chunks = _summary_chunks(employees)
+    chunk_stale: list[set[str]] = [set() for _ in chunks]
+    chunk_ages: list[dict[str, float]] = [{} for _ in chunks]
+    results = await asyncio.gather(
+        *(
+            _load_summaries(
+                client,
+                acronyms,
+                start_date is None,
+                start_date,
+                end_date,
+                stale=stale_acronyms,
+                ages=acronym_ages,
+            )
+            for (start_date, end_date, acronyms), stale_acronyms, acronym_ages in zip(
+                chunks, chunk_stale, chunk_ages, strict=True
+            )
+        ),
+        return_exceptions=True,
+    )
+    summaries: dict[SummaryKey, dict[str, Any] | Exception] = {}
+    for (start_date, end_date, acronyms), result, stale_acronyms, acronym_ages in zip(
+        chunks, results, chunk_stale, chunk_ages, strict=True
+    ):
+        if isinstance(result, BaseException) and not isinstance(result, Exception):
+            raise result
+        for acronym in acronyms:
+            key = (acronym, start_date, end_date)
+            summaries[key] = (
+                result if isinstance(result, Exception) else result[acronym].value
+            )
+            if stale is not None and acronym in stale_acronyms:
+                stale.add(key)
+            if ages is not None and acronym in acronym_ages:
+                ages[key] = acronym_ages[acronym]
+    return summaries
+
+
+async def _plan_cache_warming() -> list[WarmStep] | None:
+    """Build warming steps from the employees in the stored settings.
+
+    The same summaries as ``GET /api/dashboard`` shows (see
+    :func:`_summary_groups`). Each step is one batch query, for up to
+    ``SUMMARY_BATCH_MAX_ACRONYMS`` employees sharing the same filter. With a
+    shared cache, a worker skips the pass while another holds the warming
+    lock, which :func:`_finish_cache_warming` releases after the pass. The
+    lock is held for up to ``CACHE_WARM_LOCK_SECONDS``, longer than a pass
+    takes, not the load lock's ``CACHE_LOAD_LOCK_SECONDS``.
+    """
+    if isinstance(_summary_cache, SharedTTLCache) and not (
+        await _summary_cache.atry_lock("warm", CACHE_WARM_LOCK_SECONDS)
+    ):
+        return None
+    settings = await asyncio.to_thread(load_settings)
+    client = await asyncio.to_thread(get_bigquery_client)
+    steps: list[WarmStep] = []
+    for start_date, end_date, acronyms in _summary_chunks(
+        settings.get("employees") or []
+    ):
+        p1_only = start_date is None
+        label = "P1" if p1_only else f"{start_date}..{end_date}"
+        steps.append(
+            WarmStep(
+                f"{label} ({len(acronyms)} employees)",
+                partial(
+                    _warm_summaries, client, acronyms, p1_only, start_date, end_date
+                ),
+            )
+        )
+    return steps
+
+
+async def _finish_cache_warming() -> None:
+    """Release the warming lock taken by :func:`_plan_cache_warming`."""
+    if isinstance(_summary_cache, SharedTTLCache):
+        await _summary_cache.aunlock("warm")
+
+
+_cache_warmer = CacheWarmer(_plan_cache_warming, finish=_finish_cache_warming)
+
+
+def start_cache_warming() -> None:
+    """Warm the summary caches on startup and on the configured schedule.
+
+    ``CACHE_WARM_ON_STARTUP`` (default true), ``CACHE_WARM_TIMES`` (daily
+    ``HH:MM`` UTC times, e.g. just after the upstream ETL load) and
+    ``CACHE_WARM_INTERVAL`` (seconds, 0 for none) are read here.
+    """
+    on_startup = os.environ.get("CACHE_WARM_ON_STARTUP", "true").strip().lower()
+    _cache_warmer.on_startup = on_startup in ("1", "true", "yes")
+    _cache_warmer.times = parse_times(os.environ.get("CACHE_WARM_TIMES", ""))
+    _cache_warmer.interval_seconds = int(os.environ.get("CACHE_WARM_INTERVAL", "0"))
+    _cache_warmer.start()
+
+
+async def stop_cache_warming() -> None:
+    """Stop scheduled warming (called on app shutdown)."""
+    await _cache_warmer.stop()
+
+
+@router.post("/cache/warm", status_code=202)
+async def post_cache_warm() -> dict[str, Any]:
+    """
+    Start warming the summary caches now (e.g. after an ETL load).
+
+    Does nothing if a pass is already running. Returns its progress, as
+    ``GET /cache/warm`` does.
+    """
+    _cache_warmer.trigger()
+    return _cache_warmer.status()
 
-    if not rows:
-        result: dict[str, Any] = {
-            "total_spend": 0,
-            "blended_croas": 0,
-            "row_count": 0,
-        }
-    else:
-        raw = dict(rows[0])
-        result = {k: _json_serial(v) for k, v in raw.items()}
 
-    _set_cached_summary(cache_key, result)
-    return result
+@router.get("/cache/warm")
+def get_cache_warm_status() -> dict[str, Any]:
+    """Return the cache warming schedule and the progress of the last pass."""
+    return _cache_warmer.status()
@@ -0,0 +1,150 @@
+"""Dashboard snapshot: the settings joined with every employee's summary."""
+
+import asyncio
+import json
+import sqlite3
+from collections.abc import Collection, Mapping
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from google.cloud import bigquery
+
+from routers.bigquery import (
+    PERFORMANCE_CACHE_TTL_SECONDS,
+    RESPONSE_COMPRESS_MIN_BYTES,
+    SummaryKey,
+    get_bigquery_client,
+    load_employee_summaries,
+    summary_key,
+)
+from routers.settings import load_versioned_settings, settings_etag
+from services.cache import TTLCache
+from services.evaluation import (
+    CROAS_DEFAULT_BANDS,
+    SPEND_DEFAULT_BANDS,
+    UNRATED,
+    EvaluationKey,
+    normalize_bands,
+)
+from services.serialization import Encoded, encoded_response, encoded_size
+from services.singleflight import SingleFlight
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+# A snapshot per settings version; older versions are evicted as they change.
+_snapshot_cache: TTLCache[Encoded[dict[str, Any]]] = TTLCache(
+    ttl_seconds=PERFORMANCE_CACHE_TTL_SECONDS,
+    max_entries=4,
+    max_bytes=4 * 1024 * 1024,
+    sizeof=encoded_size,
+)
+_snapshot_flight: SingleFlight[tuple[Encoded[dict[str, Any]], bool, float]] = (
+    SingleFlight()
+)
+
+
+def build_snapshot(
+    version: int,
+    settings: Mapping[str, Any],
+    summaries: Mapping[SummaryKey, dict[str, Any] | Exception],
+    stale: Collection[SummaryKey] = (),
+) -> dict[str, Any]:
+    """Join *settings* with *summaries* and evaluate each employee.
+
+    *summaries* are keyed by :func:`summary_key`, so employees sharing an
+    acronym get the summary of their own date range. Each employee entry is
+    the stored employee plus its ``summary`` (null if it has none, e.g.
+    probationary without dates, or ``error`` when its query failed),
+    ``stale`` (the summary is last good data served while BigQuery fails;
+    keys in *stale*), and ``spendColor`` and ``croasColor`` from the
+    evaluation keys. Bonus eligibility is not included: the dashboard
+    decides it per ad row, which a summary does not have. Missing or
+    invalid keys get the settings page's defaults (see
+    :func:`normalize_bands`). A null blended cROAS is rated as 0, as on the
+    dashboard.
+    """
+    spend_key = EvaluationKey(
+        normalize_bands(settings.get("spendEvaluationKey"), SPEND_DEFAULT_BANDS)
+    )
+    croas_key = EvaluationKey(
+        normalize_bands(settings.get("croasEvaluationKey"), CROAS_DEFAULT_BANDS)
+    )
+    employees = []
+    for employee in settings.get("employees") or []:
+        key = summary_key(employee)
+        summary = summaries.get(key) if key is not None else None
+        entry = {
+            **employee,
+            "summary": None,
+            "error": None,
+            "stale": key in stale,
+            "spendColor": UNRATED,
+            "croasColor": UNRATED,
+        }
+        if isinstance(summary, Exception):
+            # HTTPException (e.g. BigQuery failed, refused by cost limits).
+            entry["error"] = str(getattr(summary, "detail", None) or summary)
+        elif summary is not None:
+            entry["summary"] = summary
+            entry["spendColor"] = spend_key.color(summary.get("total_spend") or 0)
+            entry["croasColor"] = croas_key.color(summary.get("blended_croas") or 0)
+        employees.append(entry)
+    return {
+        **settings,
+        "settingsVersion": settings_etag(version),
+        "employees": employees,
+    }
+
+
+@router.get("", response_model=dict[str, Any])
+async def get_dashboard(
+    request: Request,
+    client: bigquery.Client = Depends(get_bigquery_client),
+) -> Response:
+    """
+    Return the settings and every employee's summary and evaluation at once.
+
+    Replaces fetching the settings and then one summary per employee. The
+    snapshot is cached per settings version for the summary cache TTL, so
+    saving the settings shows at once while data changes show within the
+    TTL. The ``Age`` header gives the age in seconds of the oldest summary
+    in the snapshot, which expires when that summary would. While
+    BigQuery fails, employees with last good summaries are answered from
+    them (flagged ``stale``, with ``X-Stale`` set) and the snapshot is not
+    cached.
+    """
+    try:
+        version, settings = await asyncio.to_thread(load_versioned_settings)
+    except (sqlite3.Error, json.JSONDecodeError) as e:
+        raise HTTPException(
+            status_code=500, detail=f"Failed to load settings: {e!s}"
+        ) from e
+    cache_key = str(version)
+    hit = _snapshot_cache.lookup(cache_key)
+    if hit is not None:
+        return encoded_response(hit.value, request.headers, {"Age": str(int(hit.age))})
+
+    async def load() -> tuple[Encoded[dict[str, Any]], bool, float]:
+        stale: set[SummaryKey] = set()
+        ages: dict[SummaryKey, float] = {}
+        summaries = await load_employee_summaries(
+            client, settings.get("employees") or [], stale=stale, ages=ages
+        )
+        # The snapshot is as old as its oldest cached summary, and expires
+        # with it.
+        age = max(ages.values(), default=0.0)
+        snapshot = build_snapshot(version, settings, summaries, stale)
+        # The snapshot covers every employee; encode it off the event loop.
+        entry = await asyncio.to_thread(
+            Encoded.of, snapshot, compress_min_bytes=RESPONSE_COMPRESS_MIN_BYTES
+        )
+        # Retry failed or stale employees on the next request, not after a TTL.
+        if not stale and not any(isinstance(s, Exception) for s in summaries.values()):
+            _snapshot_cache.set(cache_key, entry, age=age)
+        return entry, bool(stale), age
+
+    entry, stale, age = await _snapshot_flight.do(cache_key, load)
+    headers = {"Age": str(int(age))}
+    if stale:
+        headers["X-Stale"] = "1"
+    return encoded_response(entry, request.headers, headers)
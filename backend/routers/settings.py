@@ -1,26 +1,50 @@
 """Settings API backed by Postgres (Neon) or SQLite for shared persistence."""
 
 import json
+import logging
 import os
 import sqlite3
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Response
+
+from services.settings_db import PostgresConnections, SQLiteConnections
 
 router = APIRouter(prefix="/settings", tags=["settings"])
+logger = logging.getLogger(__name__)
 
 _USE_POSTGRES = bool(os.environ.get("DATABASE_URL", "").strip())
+DATABASE_POOL_MAX_SIZE = int(os.environ.get("DATABASE_POOL_MAX_SIZE", "5"))
+SETTINGS_VERSION_CHECK_SECONDS = float(
+    os.environ.get("SETTINGS_VERSION_CHECK_SECONDS", "1")
+)
+
+
+@dataclass
+class _CachedSettings:
+    """Parsed settings held in memory, with the stored version they came from."""
+
+    store: str
+    version: int
+    settings: dict[str, Any]
+    checked_at: float
+
+
+_cached: _CachedSettings | None = None
+_cache_lock = threading.Lock()
+_db: SQLiteConnections | PostgresConnections | None = None
+_db_lock = threading.Lock()
 
 
 def _get_sqlite_db_path() -> Path:
     path = os.environ.get("DATABASE_PATH")
     if path:
         return Path(path)
-    base = Path(__file__).resolve().parent.parent
-    data_dir = base / "data"
-    data_dir.mkdir(exist_ok=True)
-    return data_dir / "settings.db"
+    return Path(__file__).resolve().parent.parent / "data" / "settings.db"
 
 
 def _default_settings() -> dict[str, Any]:
@@ -64,122 +88,478 @@ def _default_settings() -> dict[str, Any]:
     }
 
 
-def _get_settings_postgres() -> dict[str, Any]:
-    import psycopg
+class SettingsConflict(Exception):
+    """The stored settings changed since the version an update was based on."""
 
-    url = os.environ["DATABASE_URL"]
-    with psycopg.connect(url) as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS settings (
-                    key TEXT PRIMARY KEY,
-                    value TEXT NOT NULL,
-                    updated_at TIMESTAMPTZ DEFAULT now()
-                )
-                """
-            )
-            conn.commit()
-            cur.execute("SELECT value FROM settings WHERE key = %s", ("app",))
-            row = cur.fetchone()
-    raw = row[0] if row else None
-    if raw is None:
-        return _default_settings()
-    return json.loads(raw)
-
-
-def _save_settings_postgres(settings: dict[str, Any]) -> dict[str, Any]:
-    import psycopg
-
-    url = os.environ["DATABASE_URL"]
-    value = json.dumps(settings)
-    with psycopg.connect(url) as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS settings (
-                    key TEXT PRIMARY KEY,
-                    value TEXT NOT NULL,
-                    updated_at TIMESTAMPTZ DEFAULT now()
+    def __init__(self, version: int) -> None:
+        super().__init__(f"Settings were changed (now version {version})")
+        self.version = version
+
+
+_POSTGRES_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        updated_at TIMESTAMPTZ DEFAULT now(),
+        version BIGINT NOT NULL DEFAULT 0
+    )
+    """,
+    "ALTER TABLE settings ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0",
+)
+# One row per employee, keyed by normalized acronym. The "app" settings row
+# then holds "employees": [] as a placeholder for the rows, in sort_order.
+_EMPLOYEES_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS settings_employees (
+        key TEXT PRIMARY KEY,
+        sort_order INTEGER NOT NULL,
+        data TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS settings_employees_order"
+    " ON settings_employees (sort_order)",
+)
+
+
+def _sql(statement: str) -> str:
+    """Adapt a statement written with ``?`` placeholders to the database in use."""
+    return statement.replace("?", "%s") if _USE_POSTGRES else statement
+
+
+def _ensure_postgres_schema(conn: Any) -> None:
+    for statement in (*_POSTGRES_SCHEMA, *_EMPLOYEES_SCHEMA):
+        conn.execute(statement)
+    _migrate_employees(conn)
+
+
+def _ensure_sqlite_schema(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TEXT DEFAULT (datetime('now')),
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(settings)")}
+    if "version" not in columns:
+        conn.execute(
+            "ALTER TABLE settings ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+        )
+    for statement in _EMPLOYEES_SCHEMA:
+        conn.execute(statement)
+    _migrate_employees(conn)
+
+
+def _migrate_employees(conn: Any) -> None:
+    """Move employees stored inside the settings value into their own rows."""
+    _lock_settings(conn, create=False)
+    row = conn.execute("SELECT value FROM settings WHERE key = 'app'").fetchone()
+    if row is None:
+        return
+    value = json.loads(row[0])
+    employees = value.get("employees")
+    if not isinstance(employees, list) or not employees:
+        return
+    value["employees"] = []
+    _replace_employees(conn, _employee_rows(employees, strict=False))
+    conn.execute(
+        _sql("UPDATE settings SET value = ? WHERE key = 'app'"), (json.dumps(value),)
+    )
+
+
+def _acronym_key(acronym: Any) -> str:
+    return acronym.strip().lower() if isinstance(acronym, str) else ""
+
+
+def _employee_key(acronym: Any) -> str:
+    key = _acronym_key(acronym)
+    if not key:
+        raise ValueError("Each employee needs a non-empty acronym")
+    return key
+
+
+def _unkeyed(position: int) -> str:
+    """Row key for an employee with a blank or repeated acronym.
+
+    Acronym keys are stripped, so one starting with a space never collides.
+    """
+    return f" {position}"
+
+
+def _employee_rows(
+    employees: Any, *, strict: bool = True
+) -> list[tuple[str, dict[str, Any]]]:
+    """Key *employees* by acronym for storage, keeping their order.
+
+    An employee whose acronym is blank (e.g. just added in the UI) or repeats
+    an earlier one is stored under an :func:`_unkeyed` key, so PATCH only
+    addresses the first employee with a given acronym. Entries that are not
+    objects raise ValueError, or with ``strict=False`` (migrating old data)
+    are logged and dropped.
+    """
+    if not isinstance(employees, list):
+        raise ValueError("employees must be a list")
+    rows: list[tuple[str, dict[str, Any]]] = []
+    keys: set[str] = set()
+    for employee in employees:
+        if not isinstance(employee, dict):
+            if strict:
+                raise ValueError("Each employee must be an object")
+            logger.warning("Dropping malformed employee %r", employee)
+            continue
+        key = _acronym_key(employee.get("acronym"))
+        if not key or key in keys:
+            key = _unkeyed(len(rows))
+        keys.add(key)
+        rows.append((key, employee))
+    return rows
+
+
+def _replace_employees(conn: Any, rows: list[tuple[str, dict[str, Any]]]) -> None:
+    conn.execute("DELETE FROM settings_employees")
+    if rows:
+        conn.cursor().executemany(
+            _sql(
+                "INSERT INTO settings_employees (key, sort_order, data)"
+                " VALUES (?, ?, ?)"
+            ),
+            [(key, i, json.dumps(data)) for i, (key, data) in enumerate(rows)],
+        )
+
+
+def _lock_settings(conn: Any, *, create: bool = True) -> int:
+    """Start a write transaction that locks the settings; return their version.
+
+    Concurrent writers (in any worker) wait for the lock, so an update can
+    check the version it was based on before applying. With *create*, the
+    defaults are stored first (as version 0) when nothing is stored yet.
+    """
+    select = "SELECT version FROM settings WHERE key = 'app'"
+    if _USE_POSTGRES:
+        select += " FOR UPDATE"
+    elif not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    row = conn.execute(select).fetchone()
+    if row is not None or not create:
+        return row[0] if row else 0
+    value = _default_settings()
+    employees = _employee_rows(value["employees"])
+    value["employees"] = []
+    inserted = conn.execute(
+        _sql(
+            "INSERT INTO settings (key, value, version) VALUES ('app', ?, 0)"
+            " ON CONFLICT (key) DO NOTHING"
+        ),
+        (json.dumps(value),),
+    )
+    if inserted.rowcount == 1:
+        _replace_employees(conn, employees)
+    return conn.execute(select).fetchone()[0]
+
+
+def _check_version(if_match: str | None, version: int) -> None:
+    """Raise SettingsConflict unless ``If-Match`` (if given) names *version*."""
+    if if_match is None:
+        return
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag == settings_etag(version):
+            return
+    raise SettingsConflict(version)
+
+
+def settings_etag(version: int) -> str:
+    """Return the ETag of the settings at *version*."""
+    return f'"{version}"'
+
+
+def _read_settings() -> tuple[int, dict[str, Any]]:
+    """Read the stored settings and their version in one consistent snapshot."""
+    with _get_db().connection() as conn:
+        if _USE_POSTGRES:
+            conn.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        else:
+            conn.execute("BEGIN")
+        row = conn.execute(
+            "SELECT version, value FROM settings WHERE key = 'app'"
+        ).fetchone()
+        if row is None:
+            return 0, _default_settings()
+        settings = json.loads(row[1])
+        if "employees" in settings:
+            settings["employees"] = [
+                json.loads(employee[0])
+                for employee in conn.execute(
+                    "SELECT data FROM settings_employees ORDER BY sort_order"
                 )
-                """
-            )
-            cur.execute(
-                """
-                INSERT INTO settings (key, value, updated_at)
-                VALUES ('app', %s, now())
-                ON CONFLICT (key) DO UPDATE SET
-                    value = EXCLUDED.value,
-                    updated_at = EXCLUDED.updated_at
-                """,
-                (value,),
-            )
-            conn.commit()
-    return settings
+            ]
+    return row[0], settings
 
 
-def _get_settings_sqlite() -> dict[str, Any]:
-    db_path = _get_sqlite_db_path()
-    conn = sqlite3.connect(str(db_path))
-    conn.row_factory = sqlite3.Row
-    try:
+def _read_version() -> int:
+    with _get_db().connection() as conn:
+        row = conn.execute("SELECT version FROM settings WHERE key = 'app'").fetchone()
+    return row[0] if row else 0
+
+
+def _write_settings(settings: dict[str, Any], if_match: str | None) -> int:
+    """Replace all stored settings with *settings*; return the new version."""
+    value = dict(settings)
+    employees = None
+    if "employees" in value:
+        employees = _employee_rows(value["employees"])
+        value["employees"] = []
+    encoded = json.dumps(value)
+    with _get_db().connection() as conn:
+        version = _lock_settings(conn)
+        _check_version(if_match, version)
+        _replace_employees(conn, employees or [])
         conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL,
-                updated_at TEXT DEFAULT (datetime('now'))
-            )
-            """
+            _sql(
+                "UPDATE settings SET value = ?, version = version + 1,"
+                " updated_at = CURRENT_TIMESTAMP WHERE key = 'app'"
+            ),
+            (encoded,),
         )
-        conn.commit()
-        cur = conn.execute("SELECT value FROM settings WHERE key = 'app'")
-        row = cur.fetchone()
-        raw = row["value"] if row else None
-        if raw is None:
-            return _default_settings()
-        return json.loads(raw)
-    finally:
-        conn.close()
-
-
-def _save_settings_sqlite(settings: dict[str, Any]) -> dict[str, Any]:
-    value = json.dumps(settings)
-    db_path = _get_sqlite_db_path()
-    conn = sqlite3.connect(str(db_path))
-    try:
+    return version + 1
+
+
+def _merge_patch(target: Any, patch: Any) -> Any:
+    """Apply a JSON Merge Patch (RFC 7396): objects merge, null removes a key."""
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = _merge_patch(result.get(key), value)
+    return result
+
+
+def _patch_employee(conn: Any, acronym: str, change: Any) -> None:
+    """Add, update (merge) or, for a null *change*, remove one employee row."""
+    key = _employee_key(acronym)
+    if change is None:
+        conn.execute(_sql("DELETE FROM settings_employees WHERE key = ?"), (key,))
+        return
+    if not isinstance(change, dict):
+        raise ValueError(f"Update for employee {acronym!r} must be an object or null")
+    row = conn.execute(
+        _sql("SELECT data FROM settings_employees WHERE key = ?"), (key,)
+    ).fetchone()
+    employee = _merge_patch(json.loads(row[0]) if row else {"acronym": acronym}, change)
+    if _employee_key(employee.get("acronym")) != key:
+        raise ValueError(
+            f"Cannot rename employee {acronym!r}; remove it and add the new acronym"
+        )
+    if row is not None:
         conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS settings (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL,
-                updated_at TEXT DEFAULT (datetime('now'))
-            )
-            """
+            _sql("UPDATE settings_employees SET data = ? WHERE key = ?"),
+            (json.dumps(employee), key),
+        )
+    else:
+        conn.execute(
+            _sql(
+                "INSERT INTO settings_employees (key, sort_order, data)"
+                " SELECT ?, COALESCE(MAX(sort_order), -1) + 1, ?"
+                " FROM settings_employees"
+            ),
+            (key, json.dumps(employee)),
         )
+
+
+def _apply_patch(patch: dict[str, Any], if_match: str | None) -> int:
+    """Apply a merge *patch* to the stored settings; return the new version.
+
+    Only the employees named in the patch are read and written.
+    """
+    employees = patch.get("employees")
+    if (
+        "employees" in patch
+        and employees is not None
+        and not isinstance(employees, dict)
+    ):
+        raise ValueError("employees must be an object keyed by acronym")
+    rest = {key: value for key, value in patch.items() if key != "employees"}
+    with _get_db().connection() as conn:
+        version = _lock_settings(conn)
+        _check_version(if_match, version)
+        row = conn.execute("SELECT value FROM settings WHERE key = 'app'").fetchone()
+        value = _merge_patch(json.loads(row[0]), rest)
+        if "employees" in patch and employees is None:
+            value.pop("employees", None)
+            conn.execute("DELETE FROM settings_employees")
+        elif employees:
+            value.setdefault("employees", [])
+            for acronym, change in employees.items():
+                _patch_employee(conn, acronym, change)
         conn.execute(
-            """
-            INSERT OR REPLACE INTO settings (key, value, updated_at)
-            VALUES ('app', ?, datetime('now'))
-            """,
-            (value,),
+            _sql(
+                "UPDATE settings SET value = ?, version = version + 1,"
+                " updated_at = CURRENT_TIMESTAMP WHERE key = 'app'"
+            ),
+            (json.dumps(value),),
         )
-        conn.commit()
-        return settings
-    finally:
-        conn.close()
+    return version + 1
+
+
+def _settings_store() -> str:
+    """Identify the settings database, so a cached copy is not reused for another.
+
+    ``DATABASE_PATH`` is read per call and may change (e.g. between tests).
+    """
+    if _USE_POSTGRES:
+        return "postgres"
+    return str(_get_sqlite_db_path())
+
+
+def _get_db() -> SQLiteConnections | PostgresConnections:
+    """Return the connection manager for the settings database.
+
+    It is created, and the schema created or migrated, once per database:
+    at startup via :func:`open_settings_db`, or else on first use.
+    """
+    global _db
+    store = _settings_store()
+    db = _db
+    if db is not None and db.name == store:
+        return db
+    with _db_lock:
+        if _db is not None and _db.name == store:
+            return _db
+        if _USE_POSTGRES:
+            db = PostgresConnections(
+                os.environ["DATABASE_URL"], max_size=DATABASE_POOL_MAX_SIZE
+            )
+            with db.connection() as conn:
+                _ensure_postgres_schema(conn)
+        else:
+            db = SQLiteConnections(Path(store))
+            with db.connection() as conn:
+                _ensure_sqlite_schema(conn)
+        previous, _db = _db, db
+    if previous is not None:
+        previous.close()
+    return db
+
+
+def open_settings_db() -> None:
+    """Connect to the settings database and set up its schema (app startup).
+
+    A failure is logged and retried on first use, so the API still starts
+    while the database is unreachable.
+    """
+    try:
+        _get_db()
+    except Exception:
+        logger.warning("Settings database is not available yet", exc_info=True)
+
+
+def close_settings_db() -> None:
+    """Close the settings database connections (app shutdown)."""
+    global _db
+    with _db_lock:
+        db, _db = _db, None
+    if db is not None:
+        db.close()
+
+
+def _remember(store: str, version: int, settings: dict[str, Any]) -> None:
+    """Cache *settings* unless a newer version is already cached."""
+    global _cached
+    with _cache_lock:
+        if _cached is None or _cached.store != store or _cached.version <= version:
+            _cached = _CachedSettings(store, version, settings, time.monotonic())
+
+
+def _load() -> tuple[int, dict[str, Any]]:
+    store = _settings_store()
+    cached = _cached
+    if cached is not None and cached.store == store:
+        now = time.monotonic()
+        if now - cached.checked_at < SETTINGS_VERSION_CHECK_SECONDS:
+            return cached.version, cached.settings
+        if _read_version() == cached.version:
+            cached.checked_at = now
+            return cached.version, cached.settings
+    version, settings = _read_settings()
+    _remember(store, version, settings)
+    return version, settings
+
+
+def load_settings() -> dict[str, Any]:
+    """Return the stored settings, from memory when they are unchanged.
+
+    The parsed settings are kept together with their stored version. Every
+    ``SETTINGS_VERSION_CHECK_SECONDS`` a read compares that version with
+    the database (one indexed lookup, no parsing), so changes saved by other
+    workers are picked up; in between, reads are answered from memory.
+    Saving through this worker updates the cached copy at once. The returned
+    dict is shared and must not be modified.
+    """
+    return _load()[1]
+
+
+def load_versioned_settings() -> tuple[int, dict[str, Any]]:
+    """Like :func:`load_settings`, together with the settings' stored version.
+
+    For caching data derived from the settings: the version changes with
+    every save.
+    """
+    return _load()
+
+
+def save_settings(
+    settings: dict[str, Any], if_match: str | None = None
+) -> tuple[int, dict[str, Any]]:
+    """Replace the stored settings with *settings*; return the new version.
+
+    Raises SettingsConflict if *if_match* does not name the stored version,
+    ValueError for malformed or duplicate employees.
+    """
+    store = _settings_store()
+    version = _write_settings(settings, if_match)
+    _remember(store, version, settings)
+    return version, settings
+
+
+def apply_settings_patch(
+    patch: dict[str, Any], if_match: str | None
+) -> tuple[int, dict[str, Any]]:
+    """Apply a merge *patch* to the stored settings; return the new version.
+
+    Raises like :func:`save_settings`.
+    """
+    store = _settings_store()
+    _apply_patch(patch, if_match)
+    version, settings = _read_settings()
+    _remember(store, version, settings)
+    return version, settings
+
+
+def _conflict(e: SettingsConflict) -> HTTPException:
+    return HTTPException(
+        status_code=412,
+        detail=f"{e!s}; reload the settings and retry",
+        headers={"ETag": settings_etag(e.version)},
+    )
 
 
 @router.get("", response_model=dict[str, Any])
-def get_settings() -> dict[str, Any]:
+def get_settings(response: Response) -> dict[str, Any]:
     """
     Return app settings (employee mapping, evaluation thresholds, periods).
-    Uses Postgres (Neon) when DATABASE_URL is set, else SQLite.
+    Uses Postgres (Neon) when DATABASE_URL is set, else SQLite. Served from
+    memory while the stored version is unchanged (see :func:`load_settings`).
+    The ``ETag`` header carries the version, for ``If-Match`` on updates.
     """
     try:
-        if _USE_POSTGRES:
-            return _get_settings_postgres()
-        return _get_settings_sqlite()
+        version, settings = _load()
     except (sqlite3.Error, json.JSONDecodeError) as e:
         raise HTTPException(
             status_code=500, detail=f"Failed to load settings: {e!s}"
@@ -188,18 +568,60 @@ def get_settings() -> dict[str, Any]:
         raise HTTPException(
             status_code=500, detail=f"Failed to load settings: {e!s}"
         ) from e
+    response.headers["ETag"] = settings_etag(version)
+    return settings
 
 
 @router.put("", response_model=dict[str, Any])
-def put_settings(settings: dict[str, Any]) -> dict[str, Any]:
+def put_settings(
+    settings: dict[str, Any],
+    response: Response,
+    if_match: str | None = Header(None),
+) -> dict[str, Any]:
     """
     Update app settings. Replaces stored settings with the request body.
-    Shared across all users.
+    Shared across all users. With ``If-Match``, the update is refused (412)
+    if the settings changed since that version was read.
     """
     try:
-        if _USE_POSTGRES:
-            return _save_settings_postgres(settings)
-        return _save_settings_sqlite(settings)
+        version, saved = save_settings(settings, if_match)
+    except SettingsConflict as e:
+        raise _conflict(e) from e
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        raise HTTPException(
+            status_code=400, detail=f"Failed to save settings: {e!s}"
+        ) from e
+    except Exception as e:
+        raise HTTPException(
+            status_code=400, detail=f"Failed to save settings: {e!s}"
+        ) from e
+    response.headers["ETag"] = settings_etag(version)
+    return saved
+
+
+@router.patch("", response_model=dict[str, Any])
+def patch_settings(
+    patch: dict[str, Any],
+    response: Response,
+    if_match: str | None = Header(None),
+) -> dict[str, Any]:
+    """
+    Partially update app settings (JSON Merge Patch, keyed employees).
+
+    Top-level fields in the body replace the stored ones (``null`` removes
+    one). ``employees`` is an object keyed by acronym: each value is merged
+    into that employee (or adds it), ``null`` removes it. ``If-Match`` with
+    the ``ETag`` of the settings the edit is based on is required; 412 if
+    they changed since. Returns the updated settings.
+    """
+    if if_match is None:
+        raise HTTPException(
+            status_code=428, detail="If-Match with the settings ETag is required"
+        )
+    try:
+        version, settings = apply_settings_patch(patch, if_match)
+    except SettingsConflict as e:
+        raise _conflict(e) from e
     except (sqlite3.Error, TypeError, ValueError) as e:
         raise HTTPException(
             status_code=400, detail=f"Failed to save settings: {e!s}"
@@ -208,3 +630,5 @@ def put_settings(settings: dict[str, Any]) -> dict[str, Any]:
         raise HTTPException(
             status_code=400, detail=f"Failed to save settings: {e!s}"
         ) from e
+    response.headers["ETag"] = settings_etag(version)
+    return settings
@@ -0,0 +1 @@
+"""Shared backend services (caching, request coalescing)."""
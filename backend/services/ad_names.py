@@ -0,0 +1,21 @@
+"""Tokens encoded in ad names (employee acronym, period)."""
+
+TOKEN_SEPARATOR = "__"
+P1_TOKEN = "p1"
+
+
+def normalize_token(value: str) -> str:
+    """Return *value* in the form tokens are compared in (trimmed, lowercase)."""
+    return value.strip().lower()
+
+
+def ad_name_tokens(ad_name: str) -> list[str]:
+    """Return the lowercased ``__``-delimited tokens inside *ad_name*.
+
+    Ad names encode the employee acronym and the period as ``__XX__``, so
+    only parts with a ``__`` on both sides count: the leading and trailing
+    parts are dropped. ``"Spring__HM__P1__a"`` yields ``["hm", "p1"]``.
+    Matching is exact token equality; single underscores are part of a
+    token, not a wildcard.
+    """
+    return normalize_token(ad_name).split(TOKEN_SEPARATOR)[1:-1]
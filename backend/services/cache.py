@@ -0,0 +1,460 @@
+"""Bounded in-process cache with LRU eviction, TTL expiry and size accounting."""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Generic, TypeVar
+
+from services.cache_backends import CacheBackend
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+R = TypeVar("R")
+
+
+def estimate_size(value: Any) -> int:
+    """Approximate the memory held by a JSON-like value, in bytes.
+
+    Walks dicts, lists and tuples and sums ``sys.getsizeof`` of every
+    container, key and leaf. Shared objects are counted once.
+    """
+    seen: set[int] = set()
+    stack = [value]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+    return total
+
+
+@dataclass
+class _Entry(Generic[V]):
+    value: V
+    stored_at: float
+    size: int
+
+
+@dataclass(frozen=True)
+class CacheHit(Generic[V]):
+    """A cached value together with its age and freshness."""
+
+    value: V
+    age: float
+    stale: bool
+
+
+class TTLCache(Generic[V]):
+    """Thread-safe LRU cache bounded by entry count and approximate bytes.
+
+    Entries are fresh for ``ttl_seconds`` after they are stored. With
+    ``stale_seconds`` > 0 they are then kept as stale for that much longer:
+    :meth:`get` no longer returns them, but :meth:`lookup` does (flagged
+    ``stale``) so callers can serve them while refreshing in the background.
+    Entries past both windows are expired: they are dropped when read and by
+    :meth:`sweep`, which a :class:`CacheSweeper` calls periodically so keys
+    that are never read again do not linger. When a store would exceed
+    ``max_entries`` or ``max_bytes``, the least recently used entries are
+    evicted first.
+
+    While ``keep_expired`` is set (e.g. the data source is down), expired
+    entries are still not served by :meth:`lookup` but are kept rather than
+    dropped, so :meth:`last_good` can fall back to them.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float,
+        max_entries: int,
+        max_bytes: int,
+        stale_seconds: float = 0,
+        sizeof: Callable[[Any], int] = estimate_size,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self.keep_expired = False
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, _Entry[V]] = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _is_expired(self, entry: _Entry[V], now: float) -> bool:
+        return now - entry.stored_at > self.ttl_seconds + self.stale_seconds
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _lookup(self, key: str, *, allow_stale: bool) -> CacheHit[V] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            now = time.monotonic()
+            if self._is_expired(entry, now):
+                if not self.keep_expired:
+                    self._remove(key)
+                    self._expirations += 1
+                self._misses += 1
+                return None
+            age = now - entry.stored_at
+            stale = age > self.ttl_seconds
+            if stale and not allow_stale:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if stale:
+                self._stale_hits += 1
+            else:
+                self._hits += 1
+            return CacheHit(entry.value, age, stale)
+
+    def lookup(self, key: str) -> CacheHit[V] | None:
+        """Return the entry for *key* with its age, including stale entries.
+
+        Returns None when the key is absent or past the stale window.
+        """
+        return self._lookup(key, allow_stale=True)
+
+    def get(self, key: str) -> V | None:
+        """Return the cached value if present and fresh, else None."""
+        hit = self._lookup(key, allow_stale=False)
+        return hit.value if hit is not None else None
+
+    def fresh(self, key: str) -> CacheHit[V] | None:
+        """Like :meth:`get`, but return the entry with its age."""
+        return self._lookup(key, allow_stale=False)
+
+    def last_good(self, key: str) -> CacheHit[V] | None:
+        """Return the newest value for *key*, however old, or None.
+
+        Like :meth:`lookup`, but falls back to an expired entry (flagged
+        ``stale``) kept while ``keep_expired`` is set.
+        """
+        hit = self.lookup(key)
+        return hit if hit is not None else self._kept(key)
+
+    def _kept(self, key: str) -> CacheHit[V] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self._stale_hits += 1
+            return CacheHit(entry.value, time.monotonic() - entry.stored_at, True)
+
+    def set(self, key: str, value: V, *, age: float = 0.0) -> None:
+        """Store *value*, evicting least recently used entries to stay in bounds.
+
+        *age* is how old the value already is (e.g. when copied from another
+        cache). Values larger than ``max_bytes`` on their own are not cached.
+        """
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = _Entry(value, time.monotonic() - age, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+
+    def delete(self, key: str) -> None:
+        """Drop *key* if present."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    # Async counterparts for callers on the event loop. In memory they finish
+    # without waiting; :class:`SharedTTLCache` runs its backend I/O in a thread.
+
+    async def _alookup(self, key: str, *, allow_stale: bool) -> CacheHit[V] | None:
+        return self._lookup(key, allow_stale=allow_stale)
+
+    async def alookup(self, key: str) -> CacheHit[V] | None:
+        """Async :meth:`lookup`."""
+        return await self._alookup(key, allow_stale=True)
+
+    async def aget(self, key: str) -> V | None:
+        """Async :meth:`get`."""
+        hit = await self._alookup(key, allow_stale=False)
+        return hit.value if hit is not None else None
+
+    async def afresh(self, key: str) -> CacheHit[V] | None:
+        """Async :meth:`fresh`."""
+        return await self._alookup(key, allow_stale=False)
+
+    async def alast_good(self, key: str) -> CacheHit[V] | None:
+        """Async :meth:`last_good`."""
+        hit = await self.alookup(key)
+        return hit if hit is not None else self._kept(key)
+
+    async def aset(self, key: str, value: V, *, age: float = 0.0) -> None:
+        """Async :meth:`set`."""
+        self.set(key, value, age=age)
+
+    async def adelete(self, key: str) -> None:
+        """Async :meth:`delete`."""
+        self.delete(key)
+
+    def invalidate(self) -> None:
+        """Drop every entry but keep the counters (e.g. after upstream changes)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._hits = self._stale_hits = self._misses = 0
+            self._evictions = self._expirations = 0
+
+    def sweep(self) -> int:
+        """Remove every expired entry; return how many were removed.
+
+        Does nothing while ``keep_expired`` is set.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.keep_expired:
+                return 0
+            expired = [k for k, e in self._entries.items() if self._is_expired(e, now)]
+            for key in expired:
+                self._remove(key)
+            self._expirations += len(expired)
+            return len(expired)
+
+    def stats(self) -> dict[str, int | float]:
+        """Return size, limit and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "stale_seconds": self.stale_seconds,
+                "hits": self._hits,
+                "stale_hits": self._stale_hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+
+class SharedTTLCache(TTLCache[V]):
+    """:class:`TTLCache` with a second tier shared between worker processes.
+
+    Stores are written through to *backend* under ``<namespace>:<key>``, and
+    local misses are read back from it, so a value loaded by one worker is
+    served by every worker (with its original age, so it goes stale and
+    expires at the same time everywhere). *encode* and *decode* convert
+    values to and from backend payloads. ``try_lock``/``unlock`` let one
+    worker at a time load a key. The backend blocks on I/O, so on the event
+    loop use the ``a*`` methods, which call it in a thread. Backend failures
+    are logged and treated as misses, which degrades the cache to
+    per-process rather than failing requests.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        *,
+        namespace: str,
+        encode: Callable[[V], bytes],
+        decode: Callable[[bytes], V],
+        lock_seconds: float = 60.0,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.backend = backend
+        self.namespace = namespace
+        self.lock_seconds = lock_seconds
+        self._encode = encode
+        self._decode = decode
+        self._shared_hits = 0
+        self._shared_errors = 0
+
+    def _shared_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _shared(self, fn: Callable[..., R], *args: Any, **kwargs: Any) -> R | None:
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            logger.warning(
+                "Shared %s cache backend call failed", self.backend.kind, exc_info=True
+            )
+            with self._lock:
+                self._shared_errors += 1
+            return None
+
+    def _lookup(self, key: str, *, allow_stale: bool) -> CacheHit[V] | None:
+        hit = super()._lookup(key, allow_stale=allow_stale)
+        if hit is not None and not hit.stale:
+            return hit
+        return self._lookup_shared(key, hit, allow_stale=allow_stale)
+
+    async def _alookup(self, key: str, *, allow_stale: bool) -> CacheHit[V] | None:
+        hit = super()._lookup(key, allow_stale=allow_stale)
+        if hit is not None and not hit.stale:
+            return hit
+        return await asyncio.to_thread(
+            self._lookup_shared, key, hit, allow_stale=allow_stale
+        )
+
+    def _lookup_shared(
+        self, key: str, hit: CacheHit[V] | None, *, allow_stale: bool
+    ) -> CacheHit[V] | None:
+        """Return the backend's copy of *key* if it beats the local *hit*."""
+        # Missing or stale here: another worker may have a (fresher) copy.
+        stored = self._shared(self.backend.get, self._shared_key(key))
+        if stored is None:
+            return hit
+        age = max(time.time() - stored.stored_at, 0.0)
+        stale = age > self.ttl_seconds
+        if hit is not None and age >= hit.age:
+            return hit
+        if age > self.ttl_seconds + self.stale_seconds or (stale and not allow_stale):
+            return hit
+        value = self._decode(stored.payload)
+        super().set(key, value, age=age)
+        with self._lock:
+            self._shared_hits += 1
+        return CacheHit(value, age, stale)
+
+    def set(self, key: str, value: V, *, age: float = 0.0) -> None:
+        super().set(key, value, age=age)
+        self._store_shared(key, value, age)
+
+    def _store_shared(self, key: str, value: V, age: float) -> None:
+        self._shared(
+            self.backend.set,
+            self._shared_key(key),
+            self._encode(value),
+            stored_at=time.time() - age,
+            ttl_seconds=self.ttl_seconds + self.stale_seconds,
+        )
+
+    async def aset(self, key: str, value: V, *, age: float = 0.0) -> None:
+        super().set(key, value, age=age)
+        await asyncio.to_thread(self._store_shared, key, value, age)
+
+    def delete(self, key: str) -> None:
+        super().delete(key)
+        self._shared(self.backend.delete, self._shared_key(key))
+
+    async def adelete(self, key: str) -> None:
+        super().delete(key)
+        await asyncio.to_thread(
+            self._shared, self.backend.delete, self._shared_key(key)
+        )
+
+    def invalidate(self) -> None:
+        super().invalidate()
+        self._shared(self.backend.clear, f"{self.namespace}:")
+
+    def clear(self) -> None:
+        super().clear()
+        self._shared(self.backend.clear, f"{self.namespace}:")
+        with self._lock:
+            self._shared_hits = self._shared_errors = 0
+
+    def try_lock(self, key: str, ttl_seconds: float | None = None) -> bool:
+        """Take the cross-worker load lock for *key*.
+
+        The lock expires after *ttl_seconds* (default ``lock_seconds``).
+        Returns True (go ahead and load) when the backend is unreachable.
+        """
+        acquired = self._shared(
+            self.backend.acquire,
+            self._shared_key(key),
+            self.lock_seconds if ttl_seconds is None else ttl_seconds,
+        )
+        return acquired is not False
+
+    def unlock(self, key: str) -> None:
+        self._shared(self.backend.release, self._shared_key(key))
+
+    async def atry_lock(self, key: str, ttl_seconds: float | None = None) -> bool:
+        """Async :meth:`try_lock`."""
+        return await asyncio.to_thread(self.try_lock, key, ttl_seconds)
+
+    async def aunlock(self, key: str) -> None:
+        """Async :meth:`unlock`."""
+        await asyncio.to_thread(self.unlock, key)
+
+    def stats(self) -> dict[str, int | float]:
+        """Like :meth:`TTLCache.stats`, plus ``shared_hits``/``shared_errors``.
+
+        ``misses`` counts local misses, including those then answered by the
+        shared backend (``shared_hits``).
+        """
+        stats = super().stats()
+        with self._lock:
+            stats["shared_hits"] = self._shared_hits
+            stats["shared_errors"] = self._shared_errors
+        return stats
+
+
+class CacheSweeper:
+    """Daemon thread that periodically sweeps expired entries from caches."""
+
+    def __init__(self, caches: list[TTLCache[Any]], interval_seconds: float) -> None:
+        self._caches = caches
+        self._interval = interval_seconds
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start sweeping in the background; no-op if already running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="cache-sweeper", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and wait briefly for it to exit."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            for cache in self._caches:
+                cache.sweep()
@@ -0,0 +1,249 @@
+"""Cache storage shared between worker processes (SQLite file or Redis)."""
+
+import sqlite3
+import struct
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Protocol
+from urllib.parse import urlsplit
+
+import redis
+
+
+@dataclass(frozen=True)
+class StoredValue:
+    """A payload read from a shared backend and when it was stored."""
+
+    payload: bytes
+    # Wall-clock time (``time.time()``), comparable across processes.
+    stored_at: float
+
+
+class CacheBackend(Protocol):
+    """Key/value storage with expiry and short-lived locks, shared by workers.
+
+    Keys are namespaced by the caller. ``acquire``/``release`` give one
+    worker at a time the right to load a key; a lock expires on its own
+    after ``ttl_seconds`` so a crashed worker cannot hold it forever. Calls
+    block on I/O, so async callers run them in a thread.
+    """
+
+    kind: str
+
+    def get(self, key: str) -> StoredValue | None: ...
+
+    def set(
+        self, key: str, payload: bytes, *, stored_at: float, ttl_seconds: float
+    ) -> None: ...
+
+    def delete(self, key: str) -> None: ...
+
+    def clear(self, prefix: str) -> None:
+        """Drop every entry whose key starts with *prefix*."""
+        ...
+
+    def acquire(self, key: str, ttl_seconds: float) -> bool:
+        """Take the load lock for *key*; False if another worker holds it."""
+        ...
+
+    def release(self, key: str) -> None: ...
+
+
+class SQLiteCacheBackend:
+    """Shared cache in one SQLite file (WAL mode) for workers on one host."""
+
+    kind = "sqlite"
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._token = uuid.uuid4().hex
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=5)
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(
+                        """
+                        CREATE TABLE IF NOT EXISTS cache_entries (
+                            key TEXT PRIMARY KEY,
+                            payload BLOB NOT NULL,
+                            stored_at REAL NOT NULL,
+                            expires_at REAL NOT NULL
+                        );
+                        CREATE TABLE IF NOT EXISTS cache_locks (
+                            key TEXT PRIMARY KEY,
+                            owner TEXT NOT NULL,
+                            expires_at REAL NOT NULL
+                        );
+                        """
+                    )
+                    conn.commit()
+                    self._initialized = True
+        return conn
+
+    def get(self, key: str) -> StoredValue | None:
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT payload, stored_at FROM cache_entries"
+                " WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        finally:
+            conn.close()
+        return StoredValue(bytes(row[0]), row[1]) if row else None
+
+    def set(
+        self, key: str, payload: bytes, *, stored_at: float, ttl_seconds: float
+    ) -> None:
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries"
+                    " (key, payload, stored_at, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, payload, stored_at, stored_at + ttl_seconds),
+                )
+                conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+        finally:
+            conn.close()
+
+    def delete(self, key: str) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+        finally:
+            conn.close()
+
+    def clear(self, prefix: str) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE substr(key, 1, ?) = ?",
+                    (len(prefix), prefix),
+                )
+        finally:
+            conn.close()
+
+    def acquire(self, key: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "DELETE FROM cache_locks WHERE key = ? AND expires_at <= ?",
+                    (key, now),
+                )
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO cache_locks (key, owner, expires_at)"
+                    " VALUES (?, ?, ?)",
+                    (key, self._token, now + ttl_seconds),
+                )
+                return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def release(self, key: str) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "DELETE FROM cache_locks WHERE key = ? AND owner = ?",
+                    (key, self._token),
+                )
+        finally:
+            conn.close()
+
+
+class RedisCacheBackend:
+    """Shared cache in Redis (or anything speaking its protocol), for any host.
+
+    Uses only ``GET``, ``SET`` (with ``PX``/``NX``), ``DEL`` and ``SCAN``.
+    Values are the stored-at time as an 8-byte double followed by the
+    payload. Load locks live under their own ``lock:`` prefix, so clearing
+    a namespace's values leaves other workers' locks alone. The redis-py
+    client keeps a thread-safe connection pool and reconnects after a
+    failed connection on the next call.
+    """
+
+    kind = "redis"
+
+    def __init__(self, client: redis.Redis) -> None:
+        self._client = client
+        self._token = uuid.uuid4().hex.encode()
+
+    @classmethod
+    def from_url(cls, url: str, *, timeout_seconds: float = 2.0) -> "RedisCacheBackend":
+        """Connect to the server at *url* (``redis://``, ``rediss://``, ``unix://``)."""
+        if urlsplit(url).scheme not in ("redis", "rediss", "unix"):
+            raise ValueError(f"Unsupported cache URL: {url!r}")
+        return cls(
+            redis.Redis.from_url(
+                url,
+                socket_timeout=timeout_seconds,
+                socket_connect_timeout=timeout_seconds,
+            )
+        )
+
+    def get(self, key: str) -> StoredValue | None:
+        value = self._client.get(key)
+        if not isinstance(value, bytes) or len(value) < 8:
+            return None
+        (stored_at,) = struct.unpack("!d", value[:8])
+        return StoredValue(value[8:], stored_at)
+
+    def set(
+        self, key: str, payload: bytes, *, stored_at: float, ttl_seconds: float
+    ) -> None:
+        remaining_ms = int((stored_at + ttl_seconds - time.time()) * 1000)
+        if remaining_ms <= 0:
+            return
+        self._client.set(key, struct.pack("!d", stored_at) + payload, px=remaining_ms)
+
+    def delete(self, key: str) -> None:
+        self._client.delete(key)
+
+    def clear(self, prefix: str) -> None:
+        keys = list(self._client.scan_iter(match=f"{prefix}*", count=500))
+        for start in range(0, len(keys), 500):
+            self._client.delete(*keys[start : start + 500])
+
+    def acquire(self, key: str, ttl_seconds: float) -> bool:
+        return bool(
+            self._client.set(
+                f"lock:{key}", self._token, nx=True, px=int(ttl_seconds * 1000)
+            )
+        )
+
+    def release(self, key: str) -> None:
+        if self._client.get(f"lock:{key}") == self._token:
+            self._client.delete(f"lock:{key}")
+
+
+def create_backend(
+    kind: str, *, sqlite_path: Path, redis_url: str
+) -> CacheBackend | None:
+    """Return the shared backend for *kind*; None for ``memory`` (per-process).
+
+    Raises ValueError for an unknown kind.
+    """
+    kind = kind.strip().lower()
+    if kind in ("", "memory"):
+        return None
+    if kind == "sqlite":
+        return SQLiteCacheBackend(sqlite_path)
+    if kind == "redis":
+        return RedisCacheBackend.from_url(redis_url)
+    raise ValueError(f"Unknown cache backend {kind!r}: use memory, sqlite or redis")
@@ -0,0 +1,212 @@
+"""Scheduled prefilling of caches, with progress reporting."""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+MAX_REPORTED_ERRORS = 20
+
+
+@dataclass(frozen=True)
+class WarmStep:
+    """One unit of warming work, e.g. one query filling several cache keys."""
+
+    label: str
+    # Awaited to do the work; returns the number of cache entries filled.
+    run: Callable[[], Awaitable[int]]
+
+
+def parse_times(value: str) -> list[time]:
+    """Parse comma-separated ``HH:MM`` times of day (UTC); ValueError if invalid."""
+    times = []
+    for part in value.split(","):
+        part = part.strip()
+        if part:
+            times.append(time.fromisoformat(part).replace(tzinfo=timezone.utc))
+    return sorted(times)
+
+
+def next_run_at(
+    now: datetime,
+    times: Sequence[time],
+    interval_seconds: float,
+    last_started: datetime | None,
+) -> datetime | None:
+    """Return when warming is next due, or None if nothing is scheduled.
+
+    The earliest of the next daily time in *times* and *interval_seconds*
+    after *last_started* (or after *now* if it never ran).
+    """
+    candidates = []
+    for at in times:
+        due = datetime.combine(now.date(), at)
+        if due <= now:
+            due += timedelta(days=1)
+        candidates.append(due)
+    if interval_seconds > 0:
+        candidates.append((last_started or now) + timedelta(seconds=interval_seconds))
+    return min(candidates, default=None)
+
+
+class CacheWarmer:
+    """Run warming passes on startup and on a schedule, one pass at a time.
+
+    Each pass asks *plan* for its steps (re-read every time, so changes to
+    the inputs apply to the next pass) and runs them in order. A failing
+    step is logged and recorded in :meth:`status`; the rest still run.
+    *plan* returns None to skip a pass, e.g. when another worker is warming
+    the shared cache. *finish* is awaited when a pass that was not skipped
+    ends, however it ends, e.g. to release a lock *plan* took.
+    """
+
+    def __init__(
+        self,
+        plan: Callable[[], Awaitable[list[WarmStep] | None]],
+        *,
+        finish: Callable[[], Awaitable[None]] | None = None,
+        times: Sequence[time] = (),
+        interval_seconds: float = 0,
+        on_startup: bool = True,
+    ) -> None:
+        self._plan = plan
+        self._finish = finish
+        self.times = list(times)
+        self.interval_seconds = interval_seconds
+        self.on_startup = on_startup
+        self._task: asyncio.Task[None] | None = None
+        self._pass: asyncio.Task[dict[str, Any]] | None = None
+        self._next_run: datetime | None = None
+        self._runs = 0
+        self._state = "idle"
+        self._started_at: datetime | None = None
+        self._finished_at: datetime | None = None
+        self._steps_total = 0
+        self._steps_done = 0
+        self._current_step: str | None = None
+        self._entries_warmed = 0
+        self._errors: list[str] = []
+
+    def start(self) -> None:
+        """Start the scheduling loop; no-op if running or nothing is scheduled."""
+        if self._task is not None:
+            return
+        if not (self.on_startup or self.times or self.interval_seconds > 0):
+            return
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """Cancel the scheduling loop and any pass in progress."""
+        tasks = [t for t in (self._task, self._pass) if t is not None]
+        self._task = self._pass = None
+        self._next_run = None
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    async def _loop(self) -> None:
+        if self.on_startup:
+            await self._run_logged()
+        while True:
+            now = datetime.now(timezone.utc)
+            self._next_run = next_run_at(
+                now, self.times, self.interval_seconds, self._started_at
+            )
+            if self._next_run is None:
+                return
+            await asyncio.sleep(max(0.0, (self._next_run - now).total_seconds()))
+            await self._run_logged()
+
+    async def _run_logged(self) -> None:
+        try:
+            await self.warm()
+        except Exception:
+            logger.warning("Cache warming failed", exc_info=True)
+
+    def trigger(self) -> None:
+        """Start a pass in the background unless one is already running."""
+        if self._pass is None or self._pass.done():
+            self._runs += 1
+            self._state = "planning"
+            self._started_at = datetime.now(timezone.utc)
+            self._finished_at = None
+            self._steps_total = self._steps_done = self._entries_warmed = 0
+            self._current_step = None
+            self._errors = []
+            self._pass = asyncio.create_task(self._warm())
+            self._pass.add_done_callback(_retrieve_outcome)
+
+    async def warm(self) -> dict[str, Any]:
+        """Run one pass now (or join the running one) and return the status."""
+        self.trigger()
+        assert self._pass is not None
+        return await asyncio.shield(self._pass)
+
+    async def _warm(self) -> dict[str, Any]:
+        try:
+            steps = await self._plan()
+            if steps is None:
+                self._state = "skipped"
+                return self.status()
+            self._state = "running"
+            self._steps_total = len(steps)
+            for step in steps:
+                self._current_step = step.label
+                try:
+                    self._entries_warmed += await step.run()
+                except Exception as e:
+                    logger.warning("Cache warming step %s failed: %s", step.label, e)
+                    if len(self._errors) < MAX_REPORTED_ERRORS:
+                        self._errors.append(f"{step.label}: {e!s}")
+                self._steps_done += 1
+            self._state = "idle"
+        except BaseException as e:
+            self._state = "failed"
+            if not isinstance(e, asyncio.CancelledError):
+                self._errors.append(f"plan: {e!s}")
+            raise
+        finally:
+            self._current_step = None
+            self._finished_at = datetime.now(timezone.utc)
+            if self._finish is not None and self._state != "skipped":
+                await self._finish()
+        return self.status()
+
+    def status(self) -> dict[str, Any]:
+        """Return the schedule and the progress of the current or last pass."""
+        return {
+            "state": self._state,
+            "runs": self._runs,
+            "started_at": _iso(self._started_at),
+            "finished_at": _iso(self._finished_at),
+            "steps_total": self._steps_total,
+            "steps_done": self._steps_done,
+            "current_step": self._current_step,
+            "entries_warmed": self._entries_warmed,
+            "errors": list(self._errors),
+            "next_run_at": _iso(self._next_run),
+            "schedule": {
+                "on_startup": self.on_startup,
+                "times": [t.strftime("%H:%M") for t in self.times],
+                "interval_seconds": self.interval_seconds,
+            },
+        }
+
+
+def _iso(value: datetime | None) -> str | None:
+    return value.isoformat() if value is not None else None
+
+
+def _retrieve_outcome(task: asyncio.Task[dict[str, Any]]) -> None:
+    # Retrieve the outcome so a pass nobody awaited does not log
+    # "exception was never retrieved"; failures are already in the status.
+    if not task.cancelled():
+        task.exception()
@@ -0,0 +1,155 @@
+"""Circuit breaker that fails fast while a dependency (BigQuery) is down."""
+
+import threading
+import time
+from collections.abc import Callable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """The circuit is open: the call was refused without being attempted."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__("BigQuery is unavailable; failing fast until it recovers")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Stop calling a dependency after repeated failures or slow calls.
+
+    Closed, every call goes through. ``failure_threshold`` consecutive
+    failures, where a call slower than ``slow_call_seconds`` counts as one,
+    open the circuit: calls are refused at once with :class:`CircuitOpen`.
+    After ``open_seconds`` a single probe call is let through (half-open);
+    its success closes the circuit, its failure opens it for another
+    ``open_seconds``. A threshold of 0 disables the breaker, a slow-call
+    limit of 0 ignores latency.
+
+    Every :meth:`before_call` that does not raise must be followed by
+    :meth:`record_success`, :meth:`record_failure` or :meth:`release` (the
+    call ended without saying anything about the dependency, e.g. it was
+    refused by another check or cancelled). *on_state_change* is called
+    with the new state whenever it changes.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int = 5,
+        slow_call_seconds: float = 0,
+        open_seconds: float = 30.0,
+        on_state_change: Callable[[str], None] | None = None,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.on_state_change = on_state_change
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._opened = 0
+        self._rejected = 0
+        self._slow_calls = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def _set_state(self, state: str) -> Callable[[], None] | None:
+        """Switch to *state*; return the notification to send outside the lock."""
+        if state == self._state:
+            return None
+        self._state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self._opened += 1
+        if self.on_state_change is None:
+            return None
+        callback = self.on_state_change
+        return lambda: callback(state)
+
+    def before_call(self) -> None:
+        """Allow the call, or raise :class:`CircuitOpen` to fail fast."""
+        if not self.enabled:
+            return
+        notify = None
+        with self._lock:
+            if self._state == CLOSED:
+                return
+            retry_after = self._opened_at + self.open_seconds - time.monotonic()
+            if self._state == OPEN and retry_after <= 0:
+                notify = self._set_state(HALF_OPEN)
+            if self._state == OPEN or self._probing:
+                self._rejected += 1
+                raise CircuitOpen(max(retry_after, 1.0))
+            self._probing = True
+        if notify is not None:
+            notify()
+
+    def record_success(self, duration: float) -> None:
+        """Record a finished call; one slower than the limit counts as failed."""
+        if not self.enabled:
+            return
+        if self.slow_call_seconds > 0 and duration > self.slow_call_seconds:
+            with self._lock:
+                self._slow_calls += 1
+            self.record_failure()
+            return
+        with self._lock:
+            self._probing = False
+            self._failures = 0
+            notify = self._set_state(CLOSED)
+        if notify is not None:
+            notify()
+
+    def record_failure(self) -> None:
+        """Record a failed call; may open the circuit."""
+        if not self.enabled:
+            return
+        notify = None
+        with self._lock:
+            self._probing = False
+            self._failures += 1
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._failures >= self.failure_threshold
+            ):
+                notify = self._set_state(OPEN)
+        if notify is not None:
+            notify()
+
+    def release(self) -> None:
+        """End a call that neither succeeded nor failed against the dependency."""
+        with self._lock:
+            self._probing = False
+
+    def reset(self) -> None:
+        """Close the circuit and zero the counters."""
+        with self._lock:
+            notify = self._set_state(CLOSED)
+            self._failures = self._opened = self._rejected = self._slow_calls = 0
+            self._probing = False
+        if notify is not None:
+            notify()
+
+    def stats(self) -> dict[str, int | float | str]:
+        """Return the state, settings and counters."""
+        with self._lock:
+            return {
+                "state": self._state if self.enabled else "disabled",
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "slow_call_seconds": self.slow_call_seconds,
+                "open_seconds": self.open_seconds,
+                "opened": self._opened,
+                "rejected": self._rejected,
+                "slow_calls": self._slow_calls,
+            }
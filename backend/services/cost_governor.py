@@ -0,0 +1,171 @@
+"""Per-query and rolling-window limits on BigQuery bytes billed."""
+
+import hashlib
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from google.cloud import bigquery
+
+from services.cache import TTLCache
+
+
+class QueryTooExpensive(Exception):
+    """The query's estimated bytes exceed the per-query limit."""
+
+    def __init__(self, estimated_bytes: int, limit_bytes: int) -> None:
+        super().__init__(
+            f"Query would process about {estimated_bytes} bytes, over the "
+            f"per-query limit of {limit_bytes} bytes; narrow the date range"
+        )
+        self.estimated_bytes = estimated_bytes
+        self.limit_bytes = limit_bytes
+
+
+class QueryBudgetExhausted(Exception):
+    """Running the query would exceed the rolling byte budget."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__("BigQuery byte budget for the current window is used up")
+        self.retry_after = retry_after
+
+
+@dataclass
+class Reservation:
+    """Bytes held against the window budget while a job runs."""
+
+    bytes: int
+    settled: bool = False
+
+
+def query_fingerprint(query: str, job_config: bigquery.QueryJobConfig | None) -> str:
+    """Identify a query by its SQL text and parameter values."""
+    digest = hashlib.sha256(query.encode())
+    if job_config is not None:
+        for param in job_config.query_parameters:
+            value = getattr(param, "values", getattr(param, "value", None))
+            digest.update(f"\0{param.name}={value!r}".encode())
+    return digest.hexdigest()
+
+
+class CostGovernor:
+    """Caps what one query and one time window may bill.
+
+    Every new query fingerprint (SQL plus parameter values) is dry-run once
+    to estimate its bytes; estimates are cached for ``estimate_ttl_seconds``.
+    A query estimated above ``max_bytes_billed`` is refused, and jobs that
+    do run carry ``maximum_bytes_billed`` so BigQuery enforces the same
+    limit. ``window_budget_bytes`` caps the bytes billed over the trailing
+    ``window_seconds``: the estimate is reserved when a job is admitted and
+    replaced by the bytes actually billed when it finishes, so concurrent
+    requests cannot all slip in under the budget. A limit of 0 disables it.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_bytes_billed: int = 0,
+        window_budget_bytes: int = 0,
+        window_seconds: float = 3600.0,
+        estimate_ttl_seconds: float = 3600.0,
+    ) -> None:
+        self.max_bytes_billed = max_bytes_billed
+        self.window_budget_bytes = window_budget_bytes
+        self.window_seconds = window_seconds
+        self._estimates: TTLCache[int] = TTLCache(
+            ttl_seconds=estimate_ttl_seconds,
+            max_entries=10_000,
+            max_bytes=4 * 1024 * 1024,
+        )
+        self._lock = threading.Lock()
+        # (timestamp, bytes) billed by finished jobs inside the window.
+        self._billed: deque[tuple[float, int]] = deque()
+        self._reserved = 0
+        self._dry_runs = 0
+        self._rejected_too_expensive = 0
+        self._rejected_budget = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_bytes_billed or self.window_budget_bytes)
+
+    def cached_estimate(self, fingerprint: str) -> int | None:
+        return self._estimates.get(fingerprint)
+
+    def store_estimate(self, fingerprint: str, estimated_bytes: int) -> None:
+        with self._lock:
+            self._dry_runs += 1
+        self._estimates.set(fingerprint, estimated_bytes)
+
+    def apply_limit(
+        self, job_config: bigquery.QueryJobConfig | None
+    ) -> bigquery.QueryJobConfig | None:
+        """Return *job_config* with ``maximum_bytes_billed`` set, if capped."""
+        if not self.max_bytes_billed:
+            return job_config
+        if job_config is None:
+            job_config = bigquery.QueryJobConfig()
+        job_config.maximum_bytes_billed = self.max_bytes_billed
+        return job_config
+
+    def _prune(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        while self._billed and self._billed[0][0] <= cutoff:
+            self._billed.popleft()
+
+    def _used(self) -> int:
+        return sum(billed for _, billed in self._billed) + self._reserved
+
+    def reserve(self, estimated_bytes: int) -> Reservation:
+        """Admit a job estimated at *estimated_bytes* or raise.
+
+        Raises :class:`QueryTooExpensive` or :class:`QueryBudgetExhausted`.
+        """
+        with self._lock:
+            if self.max_bytes_billed and estimated_bytes > self.max_bytes_billed:
+                self._rejected_too_expensive += 1
+                raise QueryTooExpensive(estimated_bytes, self.max_bytes_billed)
+            if self.window_budget_bytes:
+                now = time.monotonic()
+                self._prune(now)
+                if self._used() + estimated_bytes > self.window_budget_bytes:
+                    self._rejected_budget += 1
+                    raise QueryBudgetExhausted(self._retry_after(now, estimated_bytes))
+            self._reserved += estimated_bytes
+            return Reservation(estimated_bytes)
+
+    def _retry_after(self, now: float, needed: int) -> float:
+        """Seconds until enough billed bytes leave the window for *needed*."""
+        excess = self._used() + needed - self.window_budget_bytes
+        for billed_at, billed in self._billed:
+            excess -= billed
+            if excess <= 0:
+                return max(billed_at + self.window_seconds - now, 1.0)
+        # Only reservations (running jobs) are in the way: try again shortly.
+        return 1.0
+
+    def settle(self, reservation: Reservation, billed_bytes: int) -> None:
+        """Release *reservation* and record *billed_bytes* in the window."""
+        with self._lock:
+            if reservation.settled:
+                return
+            reservation.settled = True
+            self._reserved -= reservation.bytes
+            if billed_bytes > 0:
+                self._billed.append((time.monotonic(), billed_bytes))
+
+    def stats(self) -> dict[str, int | float]:
+        """Return limits, window usage and rejection counters."""
+        with self._lock:
+            self._prune(time.monotonic())
+            return {
+                "max_bytes_billed": self.max_bytes_billed,
+                "window_budget_bytes": self.window_budget_bytes,
+                "window_seconds": self.window_seconds,
+                "window_billed_bytes": sum(billed for _, billed in self._billed),
+                "reserved_bytes": self._reserved,
+                "dry_runs": self._dry_runs,
+                "rejected_too_expensive": self._rejected_too_expensive,
+                "rejected_budget": self._rejected_budget,
+            }
@@ -0,0 +1,76 @@
+"""Evaluation colors from threshold bands (spend, cROAS)."""
+
+import math
+from collections.abc import Iterable, Mapping, Sequence
+from typing import Any
+
+UNRATED = "gray"
+COLORS = ("green", "yellow", "red")
+
+# Defaults of the settings page (frontend/lib/settings-api.ts), used when
+# the stored settings lack a key or band.
+SPEND_DEFAULT_BANDS: tuple[dict[str, Any], ...] = (
+    {"min": 20_000, "max": None, "color": "green"},
+    {"min": 10_000, "max": 20_000, "color": "yellow"},
+    {"min": 0, "max": 10_000, "color": "red"},
+)
+CROAS_DEFAULT_BANDS: tuple[dict[str, Any], ...] = (
+    {"min": 3, "max": None, "color": "green"},
+    {"min": 1, "max": 3, "color": "yellow"},
+    {"min": 0, "max": 1, "color": "red"},
+)
+
+
+def normalize_bands(
+    bands: Any, defaults: Sequence[Mapping[str, Any]]
+) -> list[Mapping[str, Any]]:
+    """Return the green, yellow and red bands as the settings page reads them.
+
+    Not a list: *defaults*. Otherwise a missing ``min`` is 0, an unknown
+    color is green, and the first band of each color is used, falling back
+    to the default band for a color with none.
+    """
+    if not isinstance(bands, list):
+        return list(defaults)
+    parsed: list[Mapping[str, Any]] = []
+    for band in bands:
+        band = band if isinstance(band, Mapping) else {}
+        color = band.get("color")
+        parsed.append(
+            {
+                "min": 0 if band.get("min") is None else band["min"],
+                "max": band.get("max"),
+                "color": color if color in COLORS else "green",
+            }
+        )
+    return [
+        next((band for band in parsed if band["color"] == color), default)
+        for color, default in zip(COLORS, defaults, strict=True)
+    ]
+
+
+class EvaluationKey:
+    """Threshold bands ``{min, max, color}``, matched in their stored order.
+
+    A value falls in a band when ``min <= value < max`` (``max`` null means
+    no upper bound), and the first matching band wins, as on the dashboard
+    (``frontend/lib/evaluation.ts``); values in no band are ``"gray"``.
+    Malformed bands (missing or non-numeric bounds) are ignored.
+    """
+
+    def __init__(self, bands: Iterable[Mapping[str, Any]]) -> None:
+        self._bands: list[tuple[float, float, str]] = []
+        for band in bands:
+            try:
+                low = float(band["min"])
+                high = math.inf if band.get("max") is None else float(band["max"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            self._bands.append((low, high, str(band.get("color") or UNRATED)))
+
+    def color(self, value: float) -> str:
+        """Return the color of the first band containing *value*."""
+        for low, high, color in self._bands:
+            if low <= value < high:
+                return color
+        return UNRATED
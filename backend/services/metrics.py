@@ -0,0 +1,24 @@
+"""Prometheus metrics registry served at ``/metrics``.
+
+Metrics are ``prometheus_client`` counters, histograms and gauges created
+with ``registry=REGISTRY``; values that already live elsewhere (e.g. cache
+statistics) are read at scrape time by collectors registered on it.
+"""
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    disable_created_metrics,
+    generate_latest,
+)
+
+# Only the values are scraped; skip the per-series ``*_created`` timestamps.
+disable_created_metrics()
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+REGISTRY = CollectorRegistry()
+
+
+def render() -> bytes:
+    """Return all metrics in the Prometheus text exposition format."""
+    return generate_latest(REGISTRY)
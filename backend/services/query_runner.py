@@ -0,0 +1,542 @@
+"""Async execution of BigQuery jobs without holding a thread for the wait."""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, TypeVar
+
+import requests
+from google.api_core import exceptions as google_exceptions
+from google.auth.exceptions import TransportError
+from google.cloud import bigquery
+from google.cloud.bigquery.table import RowIterator
+from prometheus_client import Counter, Histogram
+
+from services.circuit_breaker import CircuitBreaker, CircuitOpen
+from services.cost_governor import (
+    CostGovernor,
+    QueryBudgetExhausted,
+    QueryTooExpensive,
+    Reservation,
+    query_fingerprint,
+)
+from services.metrics import REGISTRY
+
+T = TypeVar("T")
+logger = logging.getLogger(__name__)
+
+POLL_INITIAL_SECONDS = 0.05
+POLL_MAX_SECONDS = 1.0
+POLL_BACKOFF = 1.5
+
+JOB_DURATION_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_jobs = Counter(
+    "bigquery_jobs",
+    "BigQuery jobs run, by query and outcome.",
+    ("query", "outcome"),
+    registry=REGISTRY,
+)
+_job_duration = Histogram(
+    "bigquery_job_duration_seconds",
+    "Time from job submission to rows fetched (excluding queueing for a slot).",
+    ("query",),
+    buckets=JOB_DURATION_BUCKETS,
+    registry=REGISTRY,
+)
+_bytes_processed = Counter(
+    "bigquery_bytes_processed",
+    "QueryJob.total_bytes_processed.",
+    ("query",),
+    registry=REGISTRY,
+)
+_bytes_billed = Counter(
+    "bigquery_bytes_billed",
+    "QueryJob.total_bytes_billed.",
+    ("query",),
+    registry=REGISTRY,
+)
+_slot_millis = Counter(
+    "bigquery_slot_milliseconds",
+    "QueryJob.slot_millis.",
+    ("query",),
+    registry=REGISTRY,
+)
+_cache_hits = Counter(
+    "bigquery_cache_hits",
+    "Jobs answered from BigQuery's result cache.",
+    ("query",),
+    registry=REGISTRY,
+)
+_dry_runs = Counter(
+    "bigquery_dry_runs",
+    "Dry runs made to estimate new queries.",
+    ("query",),
+    registry=REGISTRY,
+)
+_cancellations = Counter(
+    "bigquery_job_cancellations",
+    "Jobs cancelled before finishing, by reason (deadline or abandoned).",
+    ("query", "reason"),
+    registry=REGISTRY,
+)
+_short_queries = Counter(
+    "bigquery_short_queries",
+    "Queries run via query_and_wait, by whether BigQuery created a job.",
+    ("query", "job"),
+    registry=REGISTRY,
+)
+_circuit_rejections = Counter(
+    "bigquery_circuit_rejections",
+    "Queries refused without calling BigQuery while the circuit is open.",
+    ("query",),
+    registry=REGISTRY,
+)
+_rejections = Counter(
+    "bigquery_governor_rejections",
+    "Queries refused by the cost governor, by reason.",
+    ("query", "reason"),
+    registry=REGISTRY,
+)
+
+
+class QueryTimeout(TimeoutError):
+    """A query did not finish within the runner's deadline."""
+
+
+# Errors saying BigQuery is down or slow, which count against the circuit
+# breaker: 5xx responses, retries given up, transport failures and missed
+# deadlines. Requests BigQuery rejects (4xx, e.g. an invalid query) do not.
+_BREAKER_FAILURES: tuple[type[BaseException], ...] = (
+    google_exceptions.ServerError,
+    google_exceptions.RetryError,
+    TransportError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+def _job_stat(job: Any, name: str) -> int | None:
+    """Read a numeric QueryJob statistic; None when absent (or not a number)."""
+    value = getattr(job, name, None)
+    if isinstance(value, bool) or not isinstance(value, int):
+        return None
+    return value
+
+
+def _describe_params(job_config: bigquery.QueryJobConfig | None) -> str:
+    """Summarize query parameters (acronym, dates, ...) for the job log line."""
+    if job_config is None:
+        return ""
+    parts: list[str] = []
+    for param in job_config.query_parameters:
+        if isinstance(param, bigquery.ArrayQueryParameter):
+            parts.append(f"{param.name}=[{len(param.values)}]")
+        elif isinstance(param, bigquery.ScalarQueryParameter):
+            parts.append(f"{param.name}={param.value}")
+    return " ".join(parts)
+
+
+class QueryRunner:
+    """Submit BigQuery jobs and await their completion from async handlers.
+
+    The google-cloud-bigquery client is synchronous, so each HTTP call it
+    makes (job insert, status poll, result page fetch) runs in a worker
+    thread. Between polls the coroutine sleeps on the event loop instead of
+    blocking a thread in ``QueryJob.result()`` for the whole job. Those
+    threads come from a dedicated pool, not the web server's threadpool,
+    and at most ``max_concurrency`` jobs are in flight at once; further
+    queries wait their turn.
+
+    With a *governor*, each job is first checked against its per-query and
+    rolling-window byte limits (see :class:`CostGovernor`); refused queries
+    raise before anything is billed.
+
+    Background jobs (e.g. cache warming) yield to user traffic: they start
+    only while no other query is waiting for a slot, and leave at least one
+    slot free for users when ``max_concurrency`` allows.
+
+    A job still running *timeout_seconds* after it was submitted, or whose
+    caller is cancelled (e.g. nobody waits for the result any more), is
+    cancelled in BigQuery so it stops using slots; the first raises
+    :class:`QueryTimeout`.
+
+    With a *breaker*, queries fail fast with :class:`CircuitOpen` while
+    BigQuery keeps failing or answering too slowly (see
+    :class:`CircuitBreaker`).
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        governor: CostGovernor | None = None,
+        *,
+        timeout_seconds: float | None = None,
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.governor = governor
+        self.timeout_seconds = timeout_seconds
+        self.breaker = breaker
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="bigquery"
+        )
+        self.background_concurrency = max(1, max_concurrency - 1)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._slots: asyncio.Condition | None = None
+        self._running = 0
+        self._waiting = 0
+        self._waiting_foreground = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+
+    def _get_slots(self) -> asyncio.Condition:
+        # asyncio primitives belong to one event loop; recreate the condition
+        # if the app is (re)started on a new loop, e.g. between test clients.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._slots is None:
+            self._loop = loop
+            self._slots = asyncio.Condition()
+        return self._slots
+
+    def _slot_free(self, background: bool) -> bool:
+        if not background:
+            return self._running < self.max_concurrency
+        return (
+            self._waiting_foreground == 0
+            and self._running < self.background_concurrency
+        )
+
+    async def _acquire_slot(self, background: bool) -> None:
+        """Wait for a job slot; background jobs wait for user queries first."""
+        slots = self._get_slots()
+        self._waiting += 1
+        if not background:
+            self._waiting_foreground += 1
+        try:
+            async with slots:
+                await slots.wait_for(partial(self._slot_free, background))
+                self._running += 1
+        finally:
+            self._waiting -= 1
+            if not background:
+                self._waiting_foreground -= 1
+                # Queued background jobs may go once no user query waits.
+                async with slots:
+                    slots.notify_all()
+
+    async def _release_slot(self) -> None:
+        slots = self._get_slots()
+        async with slots:
+            self._running -= 1
+            slots.notify_all()
+
+    async def _call(self, fn: Callable[[], T]) -> T:
+        """Run a short blocking client call on the dedicated thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn)
+
+    async def _estimate(
+        self,
+        governor: CostGovernor,
+        client: bigquery.Client,
+        query: str,
+        job_config: bigquery.QueryJobConfig | None,
+        label: str,
+    ) -> int:
+        """Return estimated bytes for *query*, dry-running it if not yet known."""
+        fingerprint = query_fingerprint(query, job_config)
+        estimate = governor.cached_estimate(fingerprint)
+        if estimate is not None:
+            return estimate
+        dry_config = bigquery.QueryJobConfig(
+            dry_run=True,
+            use_query_cache=False,
+            query_parameters=list(job_config.query_parameters) if job_config else [],
+        )
+        dry_job = await self._call(partial(client.query, query, job_config=dry_config))
+        estimate = _job_stat(dry_job, "total_bytes_processed") or 0
+        governor.store_estimate(fingerprint, estimate)
+        _dry_runs.labels(query=label).inc()
+        return estimate
+
+    async def _admit(
+        self,
+        client: bigquery.Client,
+        query: str,
+        job_config: bigquery.QueryJobConfig | None,
+        label: str,
+    ) -> tuple[Reservation | None, bigquery.QueryJobConfig | None]:
+        """Check *query* against the governor; return its reservation and config."""
+        governor = self.governor
+        if governor is None or not governor.enabled:
+            return None, job_config
+        estimate = await self._estimate(governor, client, query, job_config, label)
+        try:
+            reservation = governor.reserve(estimate)
+        except QueryTooExpensive:
+            _rejections.labels(query=label, reason="too_expensive").inc()
+            raise
+        except QueryBudgetExhausted:
+            _rejections.labels(query=label, reason="budget").inc()
+            raise
+        return reservation, governor.apply_limit(job_config)
+
+    async def run(
+        self,
+        client: bigquery.Client,
+        query: str,
+        job_config: bigquery.QueryJobConfig | None = None,
+        *,
+        max_results: int | None = None,
+        label: str = "query",
+        background: bool = False,
+    ) -> list[Any]:
+        """Run *query* and return its rows; exceptions propagate unchanged.
+
+        *label* names the kind of query in the job metrics and log line;
+        *background* queues the job behind user queries. Raises
+        :class:`QueryTooExpensive` or :class:`QueryBudgetExhausted` when the
+        governor refuses the query.
+        """
+        return await self.run_fetch(
+            client,
+            query,
+            job_config,
+            label=label,
+            fetch=lambda job: list(job.result(max_results=max_results)),
+            background=background,
+        )
+
+    async def run_fetch(
+        self,
+        client: bigquery.Client,
+        query: str,
+        job_config: bigquery.QueryJobConfig | None = None,
+        *,
+        label: str = "query",
+        fetch: Callable[[bigquery.QueryJob], T],
+        background: bool = False,
+    ) -> T:
+        """Like :meth:`run`, but the finished job's results are read by *fetch*.
+
+        *fetch* runs on the runner's thread pool, so it may page through
+        results or convert them (e.g. via Arrow) without blocking the loop.
+        """
+
+        async def execute(config: bigquery.QueryJobConfig | None) -> tuple[Any, T]:
+            job = await self._call(partial(client.query, query, job_config=config))
+            deadline = (
+                None
+                if self.timeout_seconds is None
+                else time.monotonic() + self.timeout_seconds
+            )
+            try:
+                delay = POLL_INITIAL_SECONDS
+                while not await self._call(job.done):
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise QueryTimeout(
+                                f"BigQuery job did not finish within "
+                                f"{self.timeout_seconds:g} seconds"
+                            )
+                        delay = min(delay, remaining)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * POLL_BACKOFF, POLL_MAX_SECONDS)
+                return job, await self._call(partial(fetch, job))
+            except QueryTimeout:
+                self._cancel_job(job, label, "deadline")
+                raise
+            except asyncio.CancelledError:
+                self._cancel_job(job, label, "abandoned")
+                raise
+
+        return await self._execute(
+            client, query, job_config, label, background, execute
+        )
+
+    async def run_and_wait(
+        self,
+        client: bigquery.Client,
+        query: str,
+        job_config: bigquery.QueryJobConfig | None = None,
+        *,
+        label: str = "query",
+        max_results: int,
+        fetch: Callable[[RowIterator], T],
+        background: bool = False,
+    ) -> T:
+        """Like :meth:`run_fetch`, via ``Client.query_and_wait``, for tiny results.
+
+        One ``jobs.query`` call runs the query and returns its first page,
+        instead of inserting a job, polling it and then fetching the rows.
+        When the client's job creation mode is optional, BigQuery may skip
+        creating a job altogether. The call holds a pool thread until the
+        query finishes, so this suits quick queries of up to *max_results*
+        rows. The client itself falls back to a full job for options
+        ``jobs.query`` does not support, and *fetch* pages in any rows past
+        the first page. The deadline is passed as ``wait_timeout``; as no
+        job handle is returned before the query ends, it is not cancelled.
+        """
+
+        async def execute(config: bigquery.QueryJobConfig | None) -> tuple[Any, T]:
+            def wait() -> tuple[RowIterator, T]:
+                options: dict[str, Any] = {"max_results": max_results}
+                if self.timeout_seconds is not None:
+                    options["wait_timeout"] = self.timeout_seconds
+                rows = client.query_and_wait(query, job_config=config, **options)
+                return rows, fetch(rows)
+
+            rows, result = await self._call(wait)
+            _short_queries.labels(
+                query=label, job="created" if rows.job_id else "none"
+            ).inc()
+            return rows, result
+
+        return await self._execute(
+            client, query, job_config, label, background, execute
+        )
+
+    async def _execute(
+        self,
+        client: bigquery.Client,
+        query: str,
+        job_config: bigquery.QueryJobConfig | None,
+        label: str,
+        background: bool,
+        execute: Callable[[bigquery.QueryJobConfig | None], Awaitable[tuple[Any, T]]],
+    ) -> T:
+        """Admit *query*, take a slot and ``execute`` it with metrics and logging.
+
+        *execute* is given the (possibly limited) job config and returns
+        the object carrying the query statistics (a ``QueryJob`` or
+        ``RowIterator``) together with the result.
+        """
+        breaker = self.breaker
+        if breaker is not None:
+            try:
+                breaker.before_call()
+            except CircuitOpen:
+                _circuit_rejections.labels(query=label).inc()
+                raise
+        try:
+            reservation, job_config = await self._admit(
+                client, query, job_config, label
+            )
+            try:
+                await self._acquire_slot(background)
+            except BaseException:
+                self._settle(reservation, None)
+                raise
+        except BaseException as e:
+            self._record_outcome(e)
+            raise
+        started = time.monotonic()
+        try:
+            job, rows = await execute(job_config)
+        except BaseException as e:
+            cancelled = isinstance(e, QueryTimeout | asyncio.CancelledError)
+            if not cancelled:
+                self._failed += 1
+            _jobs.labels(
+                query=label, outcome="cancelled" if cancelled else "error"
+            ).inc()
+            self._settle(reservation, None)
+            self._record_outcome(e)
+            raise
+        finally:
+            await self._release_slot()
+            elapsed = time.monotonic() - started
+            _job_duration.labels(query=label).observe(elapsed)
+        if breaker is not None:
+            breaker.record_success(elapsed)
+        self._completed += 1
+        _jobs.labels(query=label, outcome="success").inc()
+        self._settle(reservation, job)
+        self._record_job_stats(job, label, job_config)
+        return rows
+
+    def _record_outcome(self, error: BaseException) -> None:
+        """Tell the circuit breaker how a call that raised *error* went.
+
+        Only errors showing BigQuery unavailable (see ``_BREAKER_FAILURES``)
+        count as failures. Rejected requests, refusals by the cost governor
+        and callers going away say nothing about its health.
+        """
+        if self.breaker is None:
+            return
+        if isinstance(error, _BREAKER_FAILURES):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+
+    def _cancel_job(self, job: Any, label: str, reason: str) -> None:
+        """Ask BigQuery to cancel *job* (without waiting) and count it."""
+        self._cancelled += 1
+        _cancellations.labels(query=label, reason=reason).inc()
+        logger.info(
+            "Cancelling BigQuery %s job %s (%s)",
+            label,
+            getattr(job, "job_id", None),
+            reason,
+        )
+        self._executor.submit(job.cancel).add_done_callback(_log_cancel_failure)
+
+    def _settle(self, reservation: Reservation | None, job: Any) -> None:
+        """Replace *reservation* with the bytes *job* billed (0 if it failed)."""
+        if reservation is None or self.governor is None:
+            return
+        billed = _job_stat(job, "total_bytes_billed") if job is not None else 0
+        self.governor.settle(
+            reservation, reservation.bytes if billed is None else billed
+        )
+
+    @staticmethod
+    def _record_job_stats(
+        job: Any, label: str, job_config: bigquery.QueryJobConfig | None
+    ) -> None:
+        """Add the finished job's bytes, slot time and cache use to the metrics."""
+        processed = _job_stat(job, "total_bytes_processed")
+        billed = _job_stat(job, "total_bytes_billed")
+        slot_millis = _job_stat(job, "slot_millis")
+        cache_hit = getattr(job, "cache_hit", None) is True
+        if processed is not None:
+            _bytes_processed.labels(query=label).inc(processed)
+        if billed is not None:
+            _bytes_billed.labels(query=label).inc(billed)
+        if slot_millis is not None:
+            _slot_millis.labels(query=label).inc(slot_millis)
+        if cache_hit:
+            _cache_hits.labels(query=label).inc()
+        logger.info(
+            "BigQuery %s job: %s bytes processed, %s billed, %s slot ms,"
+            " cache_hit=%s %s",
+            label,
+            processed,
+            billed,
+            slot_millis,
+            cache_hit,
+            _describe_params(job_config),
+        )
+
+    def stats(self) -> dict[str, int]:
+        """Return concurrency limit, running/waiting jobs and outcome counters."""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self._running,
+            "waiting": self._waiting,
+            "completed": self._completed,
+            "failed": self._failed,
+            "cancelled": self._cancelled,
+        }
+
+
+def _log_cancel_failure(future: Future[Any]) -> None:
+    if (error := future.exception()) is not None:
+        logger.warning("Cancelling a BigQuery job failed: %s", error)
@@ -0,0 +1,192 @@
+"""Local SQLite store of per-(ad_name, day) spend/revenue rollups."""
+
+import sqlite3
+import threading
+from collections.abc import Iterable
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from services.ad_names import P1_TOKEN, ad_name_tokens, normalize_token
+
+
+class RollupStore:
+    """Per-ad daily sums of spend and revenue, synced from BigQuery.
+
+    The store holds one row per (ad_name, day) with the summed spend and
+    revenue for that day. Filtering and aggregating over it reproduces the
+    per-ad and summary results of the live BigQuery queries in milliseconds.
+    Days are replaced as a unit on sync, so restated upstream data and ads
+    that disappear from a day are reflected after the next sync.
+
+    The ``__XX__`` tokens of each ad name are parsed once, when the name is
+    first written, into the ``ad_tokens`` lookup table; queries filter on
+    exact token equality through its index instead of pattern-matching
+    every row.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._write_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path))
+        conn.row_factory = sqlite3.Row
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS ad_daily (
+                    ad_name TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    spend REAL NOT NULL DEFAULT 0,
+                    revenue REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (ad_name, day)
+                );
+                CREATE INDEX IF NOT EXISTS ad_daily_day ON ad_daily (day);
+                CREATE TABLE IF NOT EXISTS ad_tokens (
+                    token TEXT NOT NULL,
+                    ad_name TEXT NOT NULL,
+                    PRIMARY KEY (token, ad_name)
+                );
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+                """
+            )
+            # Stores written before ad_tokens existed: parse their names now.
+            names = conn.execute(
+                "SELECT DISTINCT ad_name FROM ad_daily"
+                " WHERE ad_name NOT IN (SELECT ad_name FROM ad_tokens)"
+            ).fetchall()
+            conn.executemany(
+                "INSERT OR IGNORE INTO ad_tokens (token, ad_name) VALUES (?, ?)",
+                _token_rows(row["ad_name"] for row in names),
+            )
+            conn.commit()
+            self._initialized = True
+        return conn
+
+    def last_synced_day(self) -> date | None:
+        """Return the latest day present in the store, or None if empty."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT MAX(day) AS day FROM ad_daily").fetchone()
+        finally:
+            conn.close()
+        return date.fromisoformat(row["day"]) if row["day"] else None
+
+    def replace_days(self, since: date | None, rows: Iterable[dict[str, Any]]) -> int:
+        """Replace every day on or after *since* (all days if None) with *rows*.
+
+        Each row needs ``ad_name``, ``day`` (date or ISO string), ``spend`` and
+        ``revenue``. Runs in one transaction; returns the number of rows written.
+        """
+        values = [
+            (
+                row["ad_name"],
+                row["day"].isoformat() if isinstance(row["day"], date) else row["day"],
+                float(row["spend"] or 0),
+                float(row["revenue"] or 0),
+            )
+            for row in rows
+            if row["ad_name"] is not None and row["day"] is not None
+        ]
+        synced_at = datetime.now(timezone.utc).isoformat()
+        with self._write_lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    if since is None:
+                        conn.execute("DELETE FROM ad_daily")
+                    else:
+                        conn.execute(
+                            "DELETE FROM ad_daily WHERE day >= ?", (since.isoformat(),)
+                        )
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO ad_daily (ad_name, day, spend, revenue)"
+                        " VALUES (?, ?, ?, ?)",
+                        values,
+                    )
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO ad_tokens (token, ad_name)"
+                        " VALUES (?, ?)",
+                        _token_rows({value[0] for value in values}),
+                    )
+                    conn.execute(
+                        "INSERT OR REPLACE INTO sync_state (key, value)"
+                        " VALUES ('last_sync_at', ?)",
+                        (synced_at,),
+                    )
+            finally:
+                conn.close()
+        return len(values)
+
+    def query_performance(
+        self,
+        acronym: str,
+        *,
+        p1_only: bool = True,
+        start_date: str | None = None,
+        end_date: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Return per-ad rows shaped like the live ``/performance`` query.
+
+        Ads match when *acronym* (and ``P1`` with *p1_only*) is one of their
+        ad-name tokens, compared case-insensitively.
+        """
+        token_filter = "ad_name IN (SELECT ad_name FROM ad_tokens WHERE token = ?)"
+        where = [token_filter]
+        params: list[Any] = [normalize_token(acronym)]
+        if p1_only:
+            where.append(token_filter)
+            params.append(P1_TOKEN)
+        if start_date and end_date:
+            where.append("day BETWEEN ? AND ?")
+            params.extend([start_date, end_date])
+        sql = f"""
+            SELECT
+                ad_name,
+                SUM(spend) AS spend,
+                SUM(revenue) AS revenue,
+                CASE WHEN SUM(spend) = 0 THEN NULL
+                     ELSE SUM(revenue) / SUM(spend) END AS croas
+            FROM ad_daily
+            WHERE {" AND ".join(where)}
+            GROUP BY ad_name
+            ORDER BY spend DESC
+        """
+        conn = self._connect()
+        try:
+            return [dict(row) for row in conn.execute(sql, params).fetchall()]
+        finally:
+            conn.close()
+
+    def status(self) -> dict[str, Any]:
+        """Return row/ad counts, the synced day range and the last sync time."""
+        conn = self._connect()
+        try:
+            counts = conn.execute(
+                "SELECT COUNT(*) AS row_count, COUNT(DISTINCT ad_name) AS ad_count,"
+                " MIN(day) AS first_day, MAX(day) AS last_day FROM ad_daily"
+            ).fetchone()
+            synced = conn.execute(
+                "SELECT value FROM sync_state WHERE key = 'last_sync_at'"
+            ).fetchone()
+        finally:
+            conn.close()
+        return {
+            **dict(counts),
+            "last_sync_at": synced["value"] if synced else None,
+        }
+
+
+def _token_rows(ad_names: Iterable[str]) -> list[tuple[str, str]]:
+    """Return ``(token, ad_name)`` rows for the ``ad_tokens`` table."""
+    return [
+        (token, ad_name) for ad_name in ad_names for token in ad_name_tokens(ad_name)
+    ]
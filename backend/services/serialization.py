@@ -0,0 +1,254 @@
+"""Column-wise conversion of query results and fast, pre-encoded JSON."""
+
+import gzip
+import hashlib
+import logging
+import sys
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Generic, TypeVar
+
+import orjson
+from fastapi.responses import Response
+
+from services.cache import estimate_size
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_NUMERIC_TYPES = frozenset({"NUMERIC", "BIGNUMERIC", "DECIMAL", "BIGDECIMAL"})
+_TEMPORAL_TYPES = frozenset({"DATE", "DATETIME", "TIMESTAMP", "TIME"})
+_NESTED_TYPES = frozenset({"RECORD", "STRUCT", "JSON", "RANGE"})
+
+
+def json_ready(value: Any) -> Any:
+    """Convert any value (including nested dicts/lists) to a JSON-ready form.
+
+    Used where no schema says what a value is; columns of known type are
+    converted by :func:`column_converter` instead.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, bytes):
+        return value.hex()
+    if isinstance(value, dict):
+        return {k: json_ready(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_ready(v) for v in value]
+    return value
+
+
+def _isoformat(value: date | time) -> str:
+    return value.isoformat()
+
+
+def column_converter(field_type: str, mode: str = "NULLABLE") -> Callable | None:
+    """Return how to make one BigQuery column's values JSON-ready.
+
+    The conversion is chosen once per column from its schema type: NUMERIC
+    to float, DATE/DATETIME/TIMESTAMP/TIME to ISO strings, BYTES to hex, and
+    nested or repeated values through :func:`json_ready`. Returns None for
+    columns whose values already are JSON-ready (STRING, INT64, FLOAT64,
+    BOOL).
+    """
+    if mode == "REPEATED" or field_type in _NESTED_TYPES:
+        return json_ready
+    if field_type in _NUMERIC_TYPES:
+        return float
+    if field_type in _TEMPORAL_TYPES:
+        return _isoformat
+    if field_type == "BYTES":
+        return bytes.hex
+    return None
+
+
+def rows_to_records(
+    names: Sequence[str],
+    converters: Sequence[Callable | None],
+    rows: Sequence[Sequence[Any]],
+) -> list[dict[str, Any]]:
+    """Build JSON-ready dicts from row tuples, converting column by column."""
+    columns = [list(column) for column in zip(*rows, strict=True)]
+    for i, convert in enumerate(converters):
+        if convert is not None:
+            columns[i] = [None if v is None else convert(v) for v in columns[i]]
+    return [dict(zip(names, values, strict=True)) for values in zip(*columns)]
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, bytes):
+        return value.hex()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    """Encode *value* as JSON bytes with orjson (dates as ISO strings)."""
+    return orjson.dumps(value, default=_default)
+
+
+_brotli: Any = None
+_brotli_checked = False
+
+
+def _get_brotli() -> Any:
+    """Return the ``brotli`` module, or None (logged once) if not installed."""
+    global _brotli, _brotli_checked
+    if not _brotli_checked:
+        _brotli_checked = True
+        try:
+            import brotli
+
+            _brotli = brotli
+        except ImportError:
+            logger.warning("brotli is not installed; compressing with gzip only")
+    return _brotli
+
+
+def compress(body: bytes) -> dict[str, bytes]:
+    """Return *body* compressed per content-coding (``br`` if available, ``gzip``)."""
+    compressed = {"gzip": gzip.compress(body, compresslevel=6, mtime=0)}
+    brotli = _get_brotli()
+    if brotli is not None:
+        compressed["br"] = brotli.compress(body, quality=5)
+    return compressed
+
+
+def loads(body: bytes) -> Any:
+    """Decode JSON *body* (the inverse of :func:`dumps`)."""
+    return orjson.loads(body)
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Encoded(Generic[T]):
+    """A value together with its JSON encoding, so it is encoded only once.
+
+    Cache entries hold these: a hit returns ``body`` as the response without
+    re-validating or re-encoding, while ``value`` stays available for
+    re-aggregation (e.g. summaries computed from per-ad rows). ``etag`` is a
+    strong ETag over ``body``; ``compressed`` holds the body per
+    content-coding when it was at least ``compress_min_bytes`` long.
+    """
+
+    value: T
+    body: bytes
+    etag: str
+    compressed: Mapping[str, bytes] = field(default_factory=dict)
+
+    @classmethod
+    def of(cls, value: T, *, compress_min_bytes: int = 0) -> "Encoded[T]":
+        """Encode *value*; compress it too when *compress_min_bytes* is set."""
+        return cls.from_body(value, dumps(value), compress_min_bytes=compress_min_bytes)
+
+    @classmethod
+    def from_body(
+        cls, value: T, body: bytes, *, compress_min_bytes: int = 0
+    ) -> "Encoded[T]":
+        """Wrap an already encoded *body* of *value*."""
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        compressed: dict[str, bytes] = {}
+        if compress_min_bytes and len(body) >= compress_min_bytes:
+            compressed = compress(body)
+        return cls(value, body, f'"{digest}"', compressed)
+
+
+def encoded_size(entry: Encoded[Any]) -> int:
+    """Approximate memory held by *entry*: value, body and compressed bodies."""
+    return (
+        estimate_size(entry.value)
+        + sys.getsizeof(entry.body)
+        + sum(sys.getsizeof(b) for b in entry.compressed.values())
+    )
+
+
+class JSONBytesResponse(Response):
+    """JSON response that sends pre-encoded bytes (or encodes with orjson)."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
+
+
+def _variant_etag(etag: str, coding: str) -> str:
+    return f'{etag[:-1]}-{coding}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Return whether an ``If-None-Match`` header matches *etag*.
+
+    Uses the weak comparison RFC 9110 prescribes for ``If-None-Match`` and
+    also accepts the tags of compressed variants of the same body.
+    """
+    if not if_none_match:
+        return False
+    accepted = {etag, *(_variant_etag(etag, coding) for coding in ("gzip", "br"))}
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") in accepted:
+            return True
+    return False
+
+
+def choose_encoding(
+    accept_encoding: str | None, available: Sequence[str]
+) -> str | None:
+    """Pick the first of *available* codings that *accept_encoding* allows."""
+    if not accept_encoding or not available:
+        return None
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        name, _, q = params.strip().partition("=")
+        if name.strip() == "q":
+            try:
+                quality = float(q)
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for coding in available:
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def encoded_response(
+    entry: Encoded[Any],
+    request_headers: Mapping[str, str],
+    headers: Mapping[str, str] | None = None,
+) -> Response:
+    """Answer a request with *entry*, honouring conditionals and compression.
+
+    A matching ``If-None-Match`` gives ``304 Not Modified`` with no body.
+    Otherwise the body is sent compressed (``br`` preferred over ``gzip``)
+    when the client accepts it and a compressed copy exists, with its own
+    ETag; ``Vary: Accept-Encoding`` is set either way. ``Cache-Control:
+    no-cache`` lets clients store the response but revalidate before reuse.
+    *headers* are added to the response.
+    """
+    out = {
+        **(headers or {}),
+        "ETag": entry.etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache",
+    }
+    if etag_matches(request_headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=out)
+    available = [c for c in ("br", "gzip") if c in entry.compressed]
+    coding = choose_encoding(request_headers.get("accept-encoding"), available)
+    if coding is None:
+        return JSONBytesResponse(entry.body, headers=out)
+    out["ETag"] = _variant_etag(entry.etag, coding)
+    out["Content-Encoding"] = coding
+    return JSONBytesResponse(entry.compressed[coding], headers=out)
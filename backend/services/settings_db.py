@@ -0,0 +1,87 @@
+"""Reused database connections for the settings store (Postgres or SQLite)."""
+
+import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+
+class SQLiteConnections:
+    """One reused WAL-mode connection per thread to a SQLite file.
+
+    Opening a connection (and re-reading the schema) per request costs more
+    than the query itself; a thread keeps its connection for the life of the
+    process instead. :meth:`connection` wraps each use in a transaction.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.name = str(path)
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened: list[sqlite3.Connection] = []
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Yield this thread's connection; commit on success, else roll back."""
+        conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Only this thread uses it; close() may run on another thread.
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            with self._lock:
+                self._opened.append(conn)
+        with conn:
+            yield conn
+
+    def close(self) -> None:
+        """Close every connection opened so far."""
+        with self._lock:
+            opened, self._opened = self._opened, []
+        for conn in opened:
+            conn.close()
+
+
+class PostgresConnections:
+    """A psycopg connection pool, so requests skip connection and TLS setup.
+
+    Connections idle for longer than *max_idle_seconds* are closed (Neon
+    and similar services drop idle connections) and each one is checked
+    before it is handed out. :meth:`connection` wraps each use in a
+    transaction.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        min_size: int = 1,
+        max_size: int = 5,
+        max_idle_seconds: float = 240,
+    ) -> None:
+        from psycopg_pool import ConnectionPool
+
+        self.name = "postgres"
+        self._pool = ConnectionPool(
+            url,
+            min_size=min_size,
+            max_size=max_size,
+            max_idle=max_idle_seconds,
+            check=ConnectionPool.check_connection,
+            open=True,
+        )
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Yield a pooled connection; commit on success, else roll back."""
+        with self._pool.connection() as conn:
+            yield conn
+
+    def close(self) -> None:
+        """Close the pool and its connections."""
+        self._pool.close()
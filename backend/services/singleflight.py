@@ -0,0 +1,72 @@
+"""Single-flight coalescing of concurrent calls that share a key."""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Call(Generic[T]):
+    task: asyncio.Future[T]
+    waiters: int = 0
+
+
+class SingleFlight(Generic[T]):
+    """Run at most one call per key at a time; concurrent callers share it.
+
+    The first caller for a key starts the call as its own task. Callers that
+    arrive while it is still running await the same task and receive the
+    same result, or have the same exception raised, instead of repeating the
+    work. Because the work runs in a separate task, a caller that goes away
+    (e.g. a cancelled request) does not cancel it for the others; once every
+    caller has gone away, the call is cancelled too, since nobody is left
+    to use its result (e.g. a BigQuery job is stopped). Once the call
+    completes the key is released, so later callers start a fresh call.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, _Call[T]] = {}
+        self._executed = 0
+        self._coalesced = 0
+        self._abandoned = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Return ``await fn()``, sharing one execution among concurrent callers."""
+        call = self._calls.get(key)
+        if call is None or call.task.done():
+            task = asyncio.ensure_future(fn())
+            call = self._calls[key] = _Call(task)
+            self._executed += 1
+            task.add_done_callback(lambda t: self._release(key, t))
+        else:
+            self._coalesced += 1
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+                self._abandoned += 1
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _release(self, key: str, task: asyncio.Future[T]) -> None:
+        call = self._calls.get(key)
+        if call is not None and call.task is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the outcome as retrieved even if every caller went away.
+            task.exception()
+
+    def stats(self) -> dict[str, int]:
+        """Return executed/coalesced/abandoned counters and calls in flight."""
+        return {
+            "executed": self._executed,
+            "coalesced": self._coalesced,
+            "abandoned": self._abandoned,
+            "in_flight": len(self._calls),
+        }
@@ -4,17 +4,40 @@ import pytest
 from fastapi.testclient import TestClient
 
 from main import app
-from routers.bigquery import _performance_cache, _summary_cache
+from routers.bigquery import (
+    _circuit_breaker,
+    _daily_cache,
+    _performance_cache,
+    _summary_cache,
+)
+from routers.dashboard import _snapshot_cache
+
+
+@pytest.fixture(autouse=True)
+def _isolated_app_startup(monkeypatch, tmp_path):
+    """Keep the app lifespan off real BigQuery and the real settings database.
+
+    Queries run as polled jobs (``client.query``), as the mocks expect;
+    tests of the short-query path switch it back on.
+    """
+    monkeypatch.setenv("CACHE_WARM_ON_STARTUP", "false")
+    monkeypatch.setattr("routers.bigquery.BIGQUERY_SHORT_QUERY_MODE", "off")
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "settings.db"))
 
 
 @pytest.fixture(autouse=True)
 def _clear_performance_cache():
-    """Ensure the in-memory caches are empty for each test."""
+    """Ensure the in-memory caches are empty (and the circuit closed) per test."""
+    _circuit_breaker.reset()
     _performance_cache.clear()
     _summary_cache.clear()
+    _daily_cache.clear()
+    _snapshot_cache.clear()
     yield
     _performance_cache.clear()
     _summary_cache.clear()
+    _daily_cache.clear()
+    _snapshot_cache.clear()
 
 
 @pytest.fixture
@@ -0,0 +1,19 @@
+"""Tests for ad-name token parsing."""
+
+from services.ad_names import ad_name_tokens, normalize_token
+
+
+def test_ad_name_tokens_are_inner_double_underscore_parts() -> None:
+    assert ad_name_tokens("Spring__HM__P1__a") == ["hm", "p1"]
+    assert ad_name_tokens("HM__P1") == []
+    assert ad_name_tokens("plain") == []
+
+
+def test_ad_name_tokens_do_not_treat_underscore_as_wildcard() -> None:
+    """``__hm__`` as a LIKE pattern matched these; token equality does not."""
+    assert "hm" not in ad_name_tokens("x__hm_a__p1__y")
+    assert "hm" not in ad_name_tokens("x__ahm__p1__y")
+
+
+def test_normalize_token() -> None:
+    assert normalize_token("  XY ") == "xy"
@@ -1,17 +1,36 @@
 """Tests for BigQuery sample and performance endpoints."""
 
+import asyncio
+import json
 import os
-from unittest.mock import MagicMock
+import threading
+import time
+from collections.abc import Iterator
+from datetime import date
+from decimal import Decimal
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import pytest
+from fastapi import HTTPException, Request
 from fastapi.testclient import TestClient
+from google.api_core.exceptions import ServiceUnavailable
 
 from main import app
 from routers.bigquery import (
-    _acronym_substring,
     _build_performance_query,
+    _build_performance_summary_batch_query,
     _build_performance_summary_query,
+    _circuit_breaker,
+    _performance_cache,
+    _performance_flight,
+    _query_runner,
+    _summarize_performance_rows,
+    _summary_cache,
+    _while_connected,
     get_bigquery_client,
 )
+from services.serialization import Encoded
 
 
 def test_get_sample_returns_up_to_five_rows(client: TestClient) -> None:
@@ -154,7 +173,8 @@ def test_get_performance_query_uses_filter_and_dedup(client: TestClient) -> None
         for key in ("GCP_PROJECT", "BIGQUERY_DATASET", "BIGQUERY_TABLE"):
             os.environ.pop(key, None)
 
-    assert "__p1__" in query.lower() and "ad_name" in query
+    assert "'p1' IN UNNEST(" in query and "ad_name" in query
+    assert "LIKE" not in query
     assert "adset_name" not in query
     assert "GROUP BY" in query and "ad_name" in query
     assert "SUM(" in query and "spend_sum" in query
@@ -163,7 +183,7 @@ def test_get_performance_query_uses_filter_and_dedup(client: TestClient) -> None
         and "placed_order_total_revenue_sum_direct_session" in query
     )
     params = {p.name: p.value for p in job_config.query_parameters}
-    assert params.get("acronym_pattern") == "%__xy__%"
+    assert params.get("acronym") == "xy"
 
 
 def test_get_performance_requires_employee_acronym(client: TestClient) -> None:
@@ -183,11 +203,13 @@ def test_get_performance_requires_employee_acronym(client: TestClient) -> None:
             os.environ.pop(key, None)
 
 
-def test_acronym_substring() -> None:
-    """Acronym substring uses double-underscore delimiters."""
-    assert _acronym_substring("HM") == "__hm__"
-    assert _acronym_substring("CP") == "__cp__"
-    assert _acronym_substring("  XY  ") == "__xy__"
+def test_build_performance_query_uses_precomputed_tokens_column(monkeypatch) -> None:
+    """BIGQUERY_NAME_TOKENS_COLUMN replaces per-row parsing of ad_name."""
+    monkeypatch.setenv("BIGQUERY_NAME_TOKENS_COLUMN", "name_tokens")
+    query = _build_performance_query("`p`.`d`.`t`")
+    assert "@acronym IN UNNEST(name_tokens)" in query
+    assert "'p1' IN UNNEST(name_tokens)" in query
+    assert "SPLIT(" not in query
 
 
 def test_build_performance_query_deduplication_and_blend() -> None:
@@ -200,8 +222,10 @@ def test_build_performance_query_deduplication_and_blend() -> None:
     assert "SAFE_DIVIDE" in query
     assert "placed_order_total_revenue_sum_direct_session" in query
     assert "ORDER BY spend DESC" in query
-    assert "@acronym_pattern" in query
-    assert "__p1__" in query
+    assert "@acronym IN UNNEST(name_tokens)" in query
+    assert "'p1' IN UNNEST(name_tokens)" in query
+    # ad_name is split once per row, in the tokenized derived table.
+    assert query.count("SPLIT(") == 1
 
 
 # --- Performance summary endpoint (aggregated single-row response) ---
@@ -239,7 +263,7 @@ def test_get_performance_summary_returns_aggregated_result(
 
 
 def test_get_performance_summary_empty_result(client: TestClient) -> None:
-    """Summary returns zeroes when BigQuery returns no rows."""
+    """Summary returns zero spend and null cROAS when BigQuery has no rows."""
     mock_job = MagicMock()
     mock_job.result.return_value = []
     mock_bq = MagicMock()
@@ -262,7 +286,7 @@ def test_get_performance_summary_empty_result(client: TestClient) -> None:
     assert response.status_code == 200
     data = response.json()
     assert data["total_spend"] == 0
-    assert data["blended_croas"] == 0
+    assert data["blended_croas"] is None
     assert data["row_count"] == 0
 
 
@@ -296,8 +320,8 @@ def test_build_performance_summary_query_uses_cte_aggregation() -> None:
     assert "total_spend" in query
     assert "blended_croas" in query
     assert "row_count" in query
-    assert "__p1__" in query
-    assert "@acronym_pattern" in query
+    assert "'p1' IN UNNEST(" in query
+    assert "@acronym IN UNNEST(" in query
     assert "adset_name" not in query
 
 
@@ -305,11 +329,11 @@ def test_build_performance_query_without_p1_and_with_dates() -> None:
     """Query without P1 filter and with date range includes BETWEEN, no p1."""
     full_table = "`p`.`d`.`t`"
     query = _build_performance_query(full_table, p1_only=False, has_date_filter=True)
-    assert "__p1__" not in query
+    assert "'p1'" not in query
     assert "BETWEEN" in query
     assert "@start_date" in query
     assert "@end_date" in query
-    assert "@acronym_pattern" in query
+    assert "@acronym IN UNNEST(" in query
     assert "GROUP BY" in query
     assert "adset_name" not in query
 
@@ -318,9 +342,9 @@ def test_build_performance_query_without_p1_no_dates() -> None:
     """Query without P1 and without dates omits both predicates."""
     full_table = "`p`.`d`.`t`"
     query = _build_performance_query(full_table, p1_only=False, has_date_filter=False)
-    assert "__p1__" not in query
+    assert "'p1'" not in query
     assert "BETWEEN" not in query
-    assert "@acronym_pattern" in query
+    assert "@acronym IN UNNEST(" in query
 
 
 def test_build_summary_query_without_p1_and_with_dates() -> None:
@@ -329,7 +353,7 @@ def test_build_summary_query_without_p1_and_with_dates() -> None:
     query = _build_performance_summary_query(
         full_table, p1_only=False, has_date_filter=True
     )
-    assert "%p1%" not in query
+    assert "'p1'" not in query
     assert "BETWEEN" in query
     assert "WITH per_ad AS" in query
 
@@ -357,7 +381,7 @@ def test_get_performance_with_date_range(client: TestClient) -> None:
         assert response.status_code == 200
         call_args = mock_bq.query.call_args
         query = call_args[0][0]
-        assert "%p1%" not in query
+        assert "'p1'" not in query
         assert "BETWEEN" in query
     finally:
         app.dependency_overrides.clear()
@@ -383,3 +407,1407 @@ def test_get_performance_returns_503_when_not_configured(client: TestClient) ->
         for k, v in orig.items():
             if v is not None:
                 os.environ[k] = v
+
+
+# --- Batch summary endpoint (one grouped query for many acronyms) ---
+
+
+def test_build_performance_summary_batch_query_groups_by_acronym() -> None:
+    """Batch query unnests each row's tokens once and groups them by acronym."""
+    query = _build_performance_summary_batch_query("`p`.`d`.`t`")
+    assert query.count("SPLIT(") == 1
+    assert "token IN UNNEST(@acronyms)" in query
+    assert "CROSS JOIN UNNEST(@acronyms)" not in query
+    assert "GROUP BY acronym, ad_name" in query
+    assert "GROUP BY acronym\n" in query
+    assert "total_spend" in query and "blended_croas" in query
+    assert "row_count" in query
+    assert "'p1' IN UNNEST(name_tokens)" in query
+    assert "BETWEEN" not in query
+
+
+def test_get_performance_summary_batch_uses_single_query(
+    client: TestClient,
+) -> None:
+    """Batch summary answers every acronym from one BigQuery job."""
+    mock_rows = [
+        {"acronym": "hm", "total_spend": 150.0, "blended_croas": 2.1, "row_count": 5},
+        {"acronym": "abc", "total_spend": 30.0, "blended_croas": 1.5, "row_count": 2},
+    ]
+    mock_job = MagicMock()
+    mock_job.result.return_value = mock_rows
+    mock_bq = MagicMock()
+    mock_bq.query.return_value = mock_job
+
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    os.environ["GCP_PROJECT"] = "p"
+    os.environ["BIGQUERY_DATASET"] = "d"
+    os.environ["BIGQUERY_TABLE"] = "t"
+    try:
+        with client:
+            response = client.post(
+                "/api/bigquery/performance/summary/batch",
+                json={"employee_acronyms": ["HM", "ABC", "XYZ"]},
+            )
+        job_config = mock_bq.query.call_args[1]["job_config"]
+    finally:
+        app.dependency_overrides.clear()
+        for key in ("GCP_PROJECT", "BIGQUERY_DATASET", "BIGQUERY_TABLE"):
+            os.environ.pop(key, None)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert mock_bq.query.call_count == 1
+    assert data["HM"] == {"total_spend": 150.0, "blended_croas": 2.1, "row_count": 5}
+    assert data["ABC"]["total_spend"] == 30.0
+    assert data["XYZ"] == {"total_spend": 0, "blended_croas": None, "row_count": 0}
+    params = {p.name: p.values for p in job_config.query_parameters}
+    assert params["acronyms"] == ["hm", "abc", "xyz"]
+
+
+def test_get_performance_summary_batch_shares_summary_cache(
+    client: TestClient,
+) -> None:
+    """Batch results fill the summary cache; cached acronyms are not re-queried."""
+    summary_job = MagicMock()
+    summary_job.result.return_value = [
+        {"total_spend": 10.0, "blended_croas": 1.0, "row_count": 1}
+    ]
+    batch_job = MagicMock()
+    batch_job.result.return_value = [
+        {"acronym": "abc", "total_spend": 30.0, "blended_croas": 1.5, "row_count": 2}
+    ]
+    mock_bq = MagicMock()
+    mock_bq.query.side_effect = [summary_job, batch_job]
+
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    os.environ["GCP_PROJECT"] = "p"
+    os.environ["BIGQUERY_DATASET"] = "d"
+    os.environ["BIGQUERY_TABLE"] = "t"
+    try:
+        with client:
+            client.get("/api/bigquery/performance/summary?employee_acronym=HM")
+            batch = client.post(
+                "/api/bigquery/performance/summary/batch",
+                json={"employee_acronyms": ["HM", "ABC"]},
+            )
+            single = client.get(
+                "/api/bigquery/performance/summary?employee_acronym=ABC"
+            )
+        batch_params = mock_bq.query.call_args_list[1][1]["job_config"]
+    finally:
+        app.dependency_overrides.clear()
+        for key in ("GCP_PROJECT", "BIGQUERY_DATASET", "BIGQUERY_TABLE"):
+            os.environ.pop(key, None)
+
+    assert mock_bq.query.call_count == 2
+    assert batch.json()["HM"]["total_spend"] == 10.0
+    assert single.json()["total_spend"] == 30.0
+    params = {p.name: p.values for p in batch_params.query_parameters}
+    assert params["acronyms"] == ["abc"]
+
+
+def test_get_performance_summary_batch_rejects_blank_acronyms(
+    client: TestClient,
+) -> None:
+    """Batch summary returns 422 for an empty list or blank acronyms."""
+    mock_bq = MagicMock()
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    try:
+        with client:
+            empty = client.post(
+                "/api/bigquery/performance/summary/batch",
+                json={"employee_acronyms": []},
+            )
+            blank = client.post(
+                "/api/bigquery/performance/summary/batch",
+                json={"employee_acronyms": ["HM", "  "]},
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert empty.status_code == 422
+    assert blank.status_code == 422
+    mock_bq.query.assert_not_called()
+
+
+def test_get_performance_summary_batch_rejects_bad_dates(client: TestClient) -> None:
+    """Batch summary returns 422 for malformed dates, like the GET summary."""
+    mock_bq = MagicMock()
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    body = {"employee_acronyms": ["HM"], "p1_only": False}
+    try:
+        with client:
+            malformed = client.post(
+                "/api/bigquery/performance/summary/batch",
+                json={**body, "start_date": "2026-13-01", "end_date": "2026-01-31"},
+            )
+            too_long = client.post(
+                "/api/bigquery/performance/summary/batch",
+                json={**body, "start_date": "2000-01-01", "end_date": "2026-01-31"},
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert malformed.status_code == 422
+    assert too_long.status_code == 422
+    mock_bq.query.assert_not_called()
+    mock_bq.query.assert_not_called()
+
+
+# --- Single-flight coalescing of concurrent cache misses ---
+
+
+def test_concurrent_performance_misses_share_one_query(client: TestClient) -> None:
+    """Concurrent identical requests on a cold cache start one BigQuery job."""
+    baseline = _performance_flight.stats()["coalesced"]
+
+    def slow_result(**_: object) -> list[dict[str, object]]:
+        deadline = time.monotonic() + 2
+        while _performance_flight.stats()["coalesced"] < baseline + 3:
+            if time.monotonic() > deadline:
+                break
+            time.sleep(0.005)
+        return [{"ad_name": "Ad A", "spend": 100.0, "croas": 2.5}]
+
+    mock_job = MagicMock()
+    mock_job.result.side_effect = slow_result
+    mock_bq = MagicMock()
+    mock_bq.query.return_value = mock_job
+
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    os.environ["GCP_PROJECT"] = "p"
+    os.environ["BIGQUERY_DATASET"] = "d"
+    os.environ["BIGQUERY_TABLE"] = "t"
+    responses = []
+    try:
+        with client:
+            threads = [
+                threading.Thread(
+                    target=lambda: responses.append(
+                        client.get("/api/bigquery/performance?employee_acronym=HM")
+                    )
+                )
+                for _ in range(4)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            stats = client.get("/api/bigquery/cache/stats").json()
+    finally:
+        app.dependency_overrides.clear()
+        for key in ("GCP_PROJECT", "BIGQUERY_DATASET", "BIGQUERY_TABLE"):
+            os.environ.pop(key, None)
+
+    assert mock_bq.query.call_count == 1
+    assert [r.status_code for r in responses] == [200] * 4
+    assert all(r.json()[0]["ad_name"] == "Ad A" for r in responses)
+    assert stats["performance"]["single_flight"]["coalesced"] == baseline + 3
+
+
+def test_cache_stats_reports_size_and_hits(client: TestClient) -> None:
+    """Cache stats expose entry counts, byte size and hit/miss counters."""
+    mock_job = MagicMock()
+    mock_job.result.return_value = [{"ad_name": "Ad A", "spend": 1.0, "croas": 2.0}]
+    mock_bq = MagicMock()
+    mock_bq.query.return_value = mock_job
+
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    os.environ["GCP_PROJECT"] = "p"
+    os.environ["BIGQUERY_DATASET"] = "d"
+    os.environ["BIGQUERY_TABLE"] = "t"
+    try:
+        with client:
+            client.get("/api/bigquery/performance?employee_acronym=HM")
+            client.get("/api/bigquery/performance?employee_acronym=HM")
+            stats = client.get("/api/bigquery/cache/stats").json()
+    finally:
+        app.dependency_overrides.clear()
+        for key in ("GCP_PROJECT", "BIGQUERY_DATASET", "BIGQUERY_TABLE"):
+            os.environ.pop(key, None)
+
+    perf = stats["performance"]
+    assert perf["entries"] == 1
+    assert perf["bytes"] > 0
+    assert perf["hits"] == 1
+    assert perf["evictions"] == 0
+    assert perf["max_entries"] > 0 and perf["max_bytes"] > 0
+    assert stats["summary"]["entries"] == 0
+
+
+# --- Stale-while-revalidate ---
+
+
+def test_stale_summary_is_served_while_refreshing(
+    client: TestClient, monkeypatch
+) -> None:
+    """A stale entry is returned immediately and refreshed in the background."""
+    monkeypatch.setattr(_summary_cache, "ttl_seconds", 0)
+    monkeypatch.setattr(_summary_cache, "stale_seconds", 3600)
+    first_job = MagicMock()
+    first_job.result.return_value = [
+        {"total_spend": 10.0, "blended_croas": 1.0, "row_count": 1}
+    ]
+    second_job = MagicMock()
+    second_job.result.return_value = [
+        {"total_spend": 20.0, "blended_croas": 2.0, "row_count": 2}
+    ]
+    mock_bq = MagicMock()
+    mock_bq.query.side_effect = [first_job, second_job]
+
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    os.environ["GCP_PROJECT"] = "p"
+    os.environ["BIGQUERY_DATASET"] = "d"
+    os.environ["BIGQUERY_TABLE"] = "t"
+    url = "/api/bigquery/performance/summary?employee_acronym=HM"
+    try:
+        with client:
+            miss = client.get(url)
+            stale = client.get(url)
+            deadline = time.monotonic() + 2
+            while time.monotonic() < deadline:
+                hit = _summary_cache.lookup("hm|p1")
+                if hit is not None and hit.value.value["total_spend"] == 20.0:
+                    break
+                time.sleep(0.01)
+    finally:
+        app.dependency_overrides.clear()
+        for key in ("GCP_PROJECT", "BIGQUERY_DATASET", "BIGQUERY_TABLE"):
+            os.environ.pop(key, None)
+
+    assert miss.headers["Age"] == "0"
+    assert miss.json()["total_spend"] == 10.0
+    assert stale.json()["total_spend"] == 10.0
+    assert "Age" in stale.headers
+    assert mock_bq.query.call_count == 2
+    hit = _summary_cache.lookup("hm|p1")
+    assert hit is not None and hit.value.value["total_spend"] == 20.0
+
+
+# --- Summary from per-ad rows and the combined ROLLUP query ---
+
+
+def test_build_performance_query_with_total_uses_rollup() -> None:
+    """with_total groups by ROLLUP(ad_name) and flags the grand-total row."""
+    query = _build_performance_query("`p`.`d`.`t`", with_total=True)
+    assert "GROUP BY ROLLUP(ad_name)" in query
+    assert "GROUPING(ad_name) AS is_total" in query
+    assert "ORDER BY is_total DESC, spend DESC" in query
+    assert "SUM(placed_order_total_revenue_sum_direct_session) AS revenue" in query
+
+
+def test_summarize_performance_rows_matches_summary_query() -> None:
+    """In-process summary sums spend/revenue and blends cROAS from the sums."""
+    rows = [
+        {"ad_name": "A", "spend": 100.0, "revenue": 300.0, "croas": 3.0},
+        {"ad_name": "B", "spend": 50.0, "revenue": 0.0, "croas": 0.0},
+        {"ad_name": "C", "spend": 0.0, "revenue": 30.0, "croas": None},
+    ]
+    assert _summarize_performance_rows(rows) == {
+        "total_spend": 150.0,
+        "blended_croas": 2.2,
+        "row_count": 3,
+    }
+    assert _summarize_performance_rows([])["row_count"] == 0
+
+
+def test_empty_summary_is_the_same_from_every_path(client: TestClient) -> None:
+    """No matching ads: per-ad rows and the summary query agree (null cROAS)."""
+    summary_job = MagicMock()
+    summary_job.result.return_value = [
+        {"total_spend": 0, "blended_croas": None, "row_count": 0}
+    ]
+    per_ad_job = MagicMock()
+    per_ad_job.result.return_value = []
+    mock_bq = MagicMock()
+    mock_bq.query.side_effect = [summary_job, per_ad_job]
+
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    os.environ["GCP_PROJECT"] = "p"
+    os.environ["BIGQUERY_DATASET"] = "d"
+    os.environ["BIGQUERY_TABLE"] = "t"
+    try:
+        with client:
+            from_query = client.get(
+                "/api/bigquery/performance/summary?employee_acronym=ZZZ"
+            ).json()
+            _summary_cache.clear()
+            client.get("/api/bigquery/performance?employee_acronym=ZZZ")
+            from_rows = client.get(
+                "/api/bigquery/performance/summary?employee_acronym=ZZZ"
+            ).json()
+    finally:
+        app.dependency_overrides.clear()
+        for key in ("GCP_PROJECT", "BIGQUERY_DATASET", "BIGQUERY_TABLE"):
+            os.environ.pop(key, None)
+
+    assert from_rows == from_query == _summarize_performance_rows([])
+    assert mock_bq.query.call_count == 2
+
+
+def test_performance_request_fills_summary_cache(client: TestClient) -> None:
+    """One /performance job serves the following summary request too."""
+    mock_job = MagicMock()
+    mock_job.result.return_value = [
+        {
+            "ad_name": None,
+            "spend": 150.0,
+            "revenue": 300.0,
+            "croas": 2.0,
+            "is_total": 1,
+        },
+        {
+            "ad_name": "Ad A",
+            "spend": 100.0,
+            "revenue": 250.0,
+            "croas": 2.5,
+            "is_total": 0,
+        },
+        {
+            "ad_name": "Ad B",
+            "spend": 50.0,
+            "revenue": 50.0,
+            "croas": 1.0,
+            "is_total": 0,
+        },
+    ]
+    mock_bq = MagicMock()
+    mock_bq.query.return_value = mock_job
+
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    os.environ["GCP_PROJECT"] = "p"
+    os.environ["BIGQUERY_DATASET"] = "d"
+    os.environ["BIGQUERY_TABLE"] = "t"
+    try:
+        with client:
+            rows = client.get("/api/bigquery/performance?employee_acronym=HM")
+            summary = client.get(
+                "/api/bigquery/performance/summary?employee_acronym=HM"
+            )
+        query = mock_bq.query.call_args[0][0]
+    finally:
+        app.dependency_overrides.clear()
+        for key in ("GCP_PROJECT", "BIGQUERY_DATASET", "BIGQUERY_TABLE"):
+            os.environ.pop(key, None)
+
+    assert mock_bq.query.call_count == 1
+    assert "ROLLUP" in query
+    assert [r["ad_name"] for r in rows.json()] == ["Ad A", "Ad B"]
+    assert all("is_total" not in r for r in rows.json())
+    assert summary.json() == {
+        "total_spend": 150.0,
+        "blended_croas": 2.0,
+        "row_count": 2,
+    }
+
+
+def test_summary_is_computed_from_cached_performance_rows(
+    client: TestClient,
+) -> None:
+    """A cached per-ad result answers the summary without a BigQuery job."""
+    _performance_cache.set(
+        "hm|p1",
+        Encoded.of(
+            [
+                {"ad_name": "Ad A", "spend": 100.0, "revenue": 250.0, "croas": 2.5},
+                {"ad_name": "Ad B", "spend": 100.0, "revenue": 50.0, "croas": 0.5},
+            ]
+        ),
+    )
+    mock_bq = MagicMock()
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    try:
+        with client:
+            response = client.get(
+                "/api/bigquery/performance/summary?employee_acronym=HM"
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    mock_bq.query.assert_not_called()
+    assert response.status_code == 200
+    assert response.json() == {
+        "total_spend": 200.0,
+        "blended_croas": 1.5,
+        "row_count": 2,
+    }
+    cached = _summary_cache.get("hm|p1")
+    assert cached is not None and cached.value == response.json()
+
+
+# --- Local rollup store (PERFORMANCE_QUERY_MODE=local) ---
+
+
+def test_rollup_sync_is_incremental_from_last_day(
+    client: TestClient, monkeypatch, tmp_path
+) -> None:
+    """Sync fills the store, then re-reads only the lookback window."""
+    monkeypatch.setenv("LOCAL_ROLLUP_PATH", str(tmp_path / "rollups.db"))
+    full_job = MagicMock()
+    full_job.result.return_value = [
+        {
+            "ad_name": "A__HM__P1__X",
+            "day": date(2026, 1, 10),
+            "spend": 1.0,
+            "revenue": 2.0,
+        }
+    ]
+    incremental_job = MagicMock()
+    incremental_job.result.return_value = []
+    mock_bq = MagicMock()
+    mock_bq.query.side_effect = [full_job, incremental_job]
+
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    os.environ["GCP_PROJECT"] = "p"
+    os.environ["BIGQUERY_DATASET"] = "d"
+    os.environ["BIGQUERY_TABLE"] = "t"
+    try:
+        with client:
+            first = client.post("/api/bigquery/rollups/sync")
+            second = client.post("/api/bigquery/rollups/sync")
+        full_query = mock_bq.query.call_args_list[0][0][0]
+        incremental_call = mock_bq.query.call_args_list[1]
+    finally:
+        app.dependency_overrides.clear()
+        for key in ("GCP_PROJECT", "BIGQUERY_DATASET", "BIGQUERY_TABLE"):
+            os.environ.pop(key, None)
+
+    assert first.json()["since"] is None
+    assert first.json()["rows_written"] == 1
+    assert first.json()["store"]["last_day"] == "2026-01-10"
+    assert "@since" not in full_query
+    assert "GROUP BY ad_name, day" in full_query
+    assert "WHERE DATE(date) >= @since" in incremental_call[0][0]
+    params = {
+        p.name: p.value for p in incremental_call[1]["job_config"].query_parameters
+    }
+    assert params["since"] == date(2026, 1, 7)
+    assert second.json()["since"] == "2026-01-07"
+
+
+def test_local_mode_answers_from_rollup_store(
+    client: TestClient, monkeypatch, tmp_path
+) -> None:
+    """In local mode, performance and summary come from the synced store."""
+    from routers.bigquery import _get_rollup_store
+
+    monkeypatch.setenv("LOCAL_ROLLUP_PATH", str(tmp_path / "rollups.db"))
+    monkeypatch.setenv("PERFORMANCE_QUERY_MODE", "local")
+    _get_rollup_store().replace_days(
+        None,
+        [
+            {
+                "ad_name": "A__HM__P1__X",
+                "day": "2026-01-01",
+                "spend": 100.0,
+                "revenue": 300.0,
+            },
+            {
+                "ad_name": "B__HM__P1__X",
+                "day": "2026-01-01",
+                "spend": 100.0,
+                "revenue": 100.0,
+            },
+        ],
+    )
+    mock_bq = MagicMock()
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    try:
+        rows = client.get("/api/bigquery/performance?employee_acronym=HM")
+        summary = client.get("/api/bigquery/performance/summary?employee_acronym=HM")
+        status = client.get("/api/bigquery/rollups/status")
+    finally:
+        app.dependency_overrides.clear()
+
+    mock_bq.query.assert_not_called()
+    assert [r["ad_name"] for r in rows.json()] == ["A__HM__P1__X", "B__HM__P1__X"]
+    assert rows.json()[0]["croas"] == 3.0
+    assert summary.json() == {
+        "total_spend": 200.0,
+        "blended_croas": 2.0,
+        "row_count": 2,
+    }
+    assert status.json()["mode"] == "local"
+    assert status.json()["store"]["ad_count"] == 2
+
+
+def test_local_mode_falls_back_to_bigquery_before_first_sync(
+    client: TestClient, monkeypatch, tmp_path
+) -> None:
+    """An unsynced local store does not block requests; BigQuery answers."""
+    monkeypatch.setenv("LOCAL_ROLLUP_PATH", str(tmp_path / "rollups.db"))
+    monkeypatch.setenv("PERFORMANCE_QUERY_MODE", "local")
+    mock_job = MagicMock()
+    mock_job.result.return_value = [
+        {"total_spend": 5.0, "blended_croas": 1.0, "row_count": 1}
+    ]
+    mock_bq = MagicMock()
+    mock_bq.query.return_value = mock_job
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    os.environ["GCP_PROJECT"] = "p"
+    os.environ["BIGQUERY_DATASET"] = "d"
+    os.environ["BIGQUERY_TABLE"] = "t"
+    try:
+        response = client.get("/api/bigquery/performance/summary?employee_acronym=HM")
+    finally:
+        app.dependency_overrides.clear()
+        for key in ("GCP_PROJECT", "BIGQUERY_DATASET", "BIGQUERY_TABLE"):
+            os.environ.pop(key, None)
+
+    assert mock_bq.query.call_count >= 1
+    assert response.json()["total_spend"] == 5.0
+
+
+# --- Daily buckets for date-range requests ---
+
+
+def test_extended_date_range_only_queries_missing_days(client: TestClient) -> None:
+    """Cached days are reused; extending the range reads just the new day."""
+    first_job = MagicMock()
+    first_job.result.return_value = [
+        {
+            "ad_name": "A__NE__X",
+            "day": date(2026, 1, 1),
+            "spend": 10.0,
+            "revenue": 20.0,
+        },
+        {
+            "ad_name": "A__NE__X",
+            "day": date(2026, 1, 2),
+            "spend": 30.0,
+            "revenue": 40.0,
+        },
+        {"ad_name": "B__NE__X", "day": date(2026, 1, 2), "spend": 5.0, "revenue": 0.0},
+    ]
+    second_job = MagicMock()
+    second_job.result.return_value = [
+        {
+            "ad_name": "B__NE__X",
+            "day": date(2026, 1, 4),
+            "spend": 100.0,
+            "revenue": 50.0,
+        },
+    ]
+    mock_bq = MagicMock()
+    mock_bq.query.side_effect = [first_job, second_job]
+
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    os.environ["GCP_PROJECT"] = "p"
+    os.environ["BIGQUERY_DATASET"] = "d"
+    os.environ["BIGQUERY_TABLE"] = "t"
+    base = "/api/bigquery/performance?employee_acronym=NE&p1_only=false"
+    try:
+        with client:
+            first = client.get(f"{base}&start_date=2026-01-01&end_date=2026-01-03")
+            extended = client.get(f"{base}&start_date=2026-01-01&end_date=2026-01-04")
+            summary = client.get(
+                "/api/bigquery/performance/summary?employee_acronym=NE"
+                "&p1_only=false&start_date=2026-01-02&end_date=2026-01-02"
+            )
+        calls = mock_bq.query.call_args_list
+    finally:
+        app.dependency_overrides.clear()
+        for key in ("GCP_PROJECT", "BIGQUERY_DATASET", "BIGQUERY_TABLE"):
+            os.environ.pop(key, None)
+
+    assert mock_bq.query.call_count == 2
+    assert "IN UNNEST(@days)" in calls[0][0][0]
+    params = {
+        p.name: getattr(p, "value", None) or getattr(p, "values", None)
+        for p in calls[1][1]["job_config"].query_parameters
+    }
+    assert params["days"] == [date(2026, 1, 4)]
+    assert params["start_date"] == params["end_date"] == date(2026, 1, 4)
+
+    assert first.json() == [
+        {"ad_name": "A__NE__X", "spend": 40.0, "revenue": 60.0, "croas": 1.5},
+        {"ad_name": "B__NE__X", "spend": 5.0, "revenue": 0.0, "croas": 0.0},
+    ]
+    assert extended.json() == [
+        {"ad_name": "B__NE__X", "spend": 105.0, "revenue": 50.0, "croas": 50 / 105},
+        {"ad_name": "A__NE__X", "spend": 40.0, "revenue": 60.0, "croas": 1.5},
+    ]
+    assert summary.json() == {
+        "total_spend": 35.0,
+        "blended_croas": 40 / 35,
+        "row_count": 2,
+    }
+
+
+def test_date_range_rejects_malformed_dates(client: TestClient) -> None:
+    """Unparseable dates are a 422, not a failed BigQuery job."""
+    mock_bq = MagicMock()
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    os.environ["GCP_PROJECT"] = "p"
+    os.environ["BIGQUERY_DATASET"] = "d"
+    os.environ["BIGQUERY_TABLE"] = "t"
+    try:
+        with client:
+            response = client.get(
+                "/api/bigquery/performance?employee_acronym=NE&p1_only=false"
+                "&start_date=2026-13-01&end_date=2026-01-04"
+            )
+    finally:
+        app.dependency_overrides.clear()
+        for key in ("GCP_PROJECT", "BIGQUERY_DATASET", "BIGQUERY_TABLE"):
+            os.environ.pop(key, None)
+
+    assert response.status_code == 422
+    mock_bq.query.assert_not_called()
+
+
+# --- Cost governor ---
+
+
+def test_spent_byte_budget_serves_last_good_batch_summaries(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """A 429 falls back to cached summaries within the hard TTL, flagged stale."""
+    from routers.bigquery import _query_runner
+    from services.cost_governor import CostGovernor
+
+    monkeypatch.setattr(
+        _query_runner, "governor", CostGovernor(window_budget_bytes=1000)
+    )
+    dry_job = MagicMock(total_bytes_processed=600)
+    job = MagicMock(total_bytes_billed=600)
+    job.result.return_value = [
+        {"acronym": "hm", "total_spend": 10.0, "blended_croas": 1.0, "row_count": 1}
+    ]
+    mock_bq = MagicMock()
+    mock_bq.query.side_effect = lambda _q, job_config: (
+        dry_job if job_config.dry_run else job
+    )
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    monkeypatch.setenv("GCP_PROJECT", "p")
+    monkeypatch.setenv("BIGQUERY_DATASET", "d")
+    monkeypatch.setenv("BIGQUERY_TABLE", "t")
+    url = "/api/bigquery/performance/summary/batch"
+    try:
+        with client:
+            good = client.post(url, json={"employee_acronyms": ["HM"]})
+            monkeypatch.setattr(_summary_cache, "ttl_seconds", 0)
+            fallback = client.post(url, json={"employee_acronyms": ["HM"]})
+            refused = client.post(url, json={"employee_acronyms": ["XX"]})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert good.status_code == 200
+    assert fallback.status_code == 200
+    assert fallback.json() == good.json()
+    assert fallback.headers["X-Stale"] == "1"
+    assert refused.status_code == 429
+    assert int(refused.headers["Retry-After"]) > 0
+
+
+def test_performance_returns_429_when_byte_budget_used_up(
+    client: TestClient, monkeypatch
+) -> None:
+    """A cache miss over the hourly byte budget is refused with Retry-After."""
+    from routers.bigquery import _query_runner
+    from services.cost_governor import CostGovernor
+
+    monkeypatch.setattr(
+        _query_runner, "governor", CostGovernor(window_budget_bytes=1000)
+    )
+    dry_job = MagicMock(total_bytes_processed=600)
+    job = MagicMock(total_bytes_billed=600)
+    job.result.return_value = []
+    mock_bq = MagicMock()
+    mock_bq.query.side_effect = lambda _q, job_config: (
+        dry_job if job_config.dry_run else job
+    )
+
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    os.environ["GCP_PROJECT"] = "p"
+    os.environ["BIGQUERY_DATASET"] = "d"
+    os.environ["BIGQUERY_TABLE"] = "t"
+    try:
+        with client:
+            first = client.get("/api/bigquery/performance?employee_acronym=HM")
+            second = client.get("/api/bigquery/performance?employee_acronym=AB")
+            cached = client.get("/api/bigquery/performance?employee_acronym=HM")
+    finally:
+        app.dependency_overrides.clear()
+        for key in ("GCP_PROJECT", "BIGQUERY_DATASET", "BIGQUERY_TABLE"):
+            os.environ.pop(key, None)
+
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert int(second.headers["Retry-After"]) > 0
+    assert cached.status_code == 200
+
+
+# --- Arrow / Storage Read API ingestion ---
+
+
+def test_large_performance_result_is_read_as_arrow(
+    client: TestClient, monkeypatch
+) -> None:
+    """Results over the row threshold go through to_arrow(bqstorage_client)."""
+    pa = pytest.importorskip("pyarrow")
+    from routers import bigquery as bigquery_router
+
+    table = pa.table(
+        {
+            "ad_name": ["A__HM__P1__x", "B__HM__P1__x", None],
+            "spend": pa.array(
+                [Decimal("10.50"), Decimal("2"), Decimal("12.50")],
+                type=pa.decimal128(10, 2),
+            ),
+            "revenue": [21.0, 0.0, 21.0],
+            "croas": [2.0, 0.0, 1.68],
+            "is_total": [0, 0, 1],
+        }
+    )
+    storage_client = object()
+    monkeypatch.setattr(bigquery_router, "PERFORMANCE_ARROW_MIN_ROWS", 2)
+    monkeypatch.setattr(
+        bigquery_router, "_get_bqstorage_client", lambda: storage_client
+    )
+    result = MagicMock(total_rows=3)
+    result.to_arrow.return_value = table
+    mock_job = MagicMock()
+    mock_job.result.return_value = result
+    mock_bq = MagicMock()
+    mock_bq.query.return_value = mock_job
+
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    os.environ["GCP_PROJECT"] = "p"
+    os.environ["BIGQUERY_DATASET"] = "d"
+    os.environ["BIGQUERY_TABLE"] = "t"
+    try:
+        with client:
+            response = client.get("/api/bigquery/performance?employee_acronym=HM")
+            summary = client.get(
+                "/api/bigquery/performance/summary?employee_acronym=HM"
+            )
+    finally:
+        app.dependency_overrides.clear()
+        for key in ("GCP_PROJECT", "BIGQUERY_DATASET", "BIGQUERY_TABLE"):
+            os.environ.pop(key, None)
+
+    result.to_arrow.assert_called_once_with(bqstorage_client=storage_client)
+    assert response.json() == [
+        {"ad_name": "A__HM__P1__x", "spend": 10.5, "revenue": 21.0, "croas": 2.0},
+        {"ad_name": "B__HM__P1__x", "spend": 2.0, "revenue": 0.0, "croas": 0.0},
+    ]
+    assert summary.json() == {
+        "total_spend": 12.5,
+        "blended_croas": 1.68,
+        "row_count": 2,
+    }
+
+
+def test_arrow_rows_serialize_dates_per_column() -> None:
+    pa = pytest.importorskip("pyarrow")
+    from routers.bigquery import _arrow_table_to_rows
+
+    table = pa.table({"ad_name": ["a"], "day": [date(2026, 1, 2)]})
+    assert _arrow_table_to_rows(table) == [{"ad_name": "a", "day": "2026-01-02"}]
+
+
+# --- Serialization ---
+
+
+class _RowIterator(list):
+    """Rows of a finished query plus the schema and pages, like ``RowIterator``."""
+
+    def __init__(self, schema: list, rows: list, page_size: int = 1) -> None:
+        super().__init__(rows)
+        self.schema = schema
+        self.total_rows = len(rows)
+        self.page_size = page_size
+
+    @property
+    def pages(self):
+        for start in range(0, len(self), self.page_size):
+            yield self[start : start + self.page_size]
+
+
+def _performance_result(rows: list[tuple]) -> _RowIterator:
+    """Build a performance query result from ``(ad_name, spend, ...)`` tuples."""
+    from google.cloud.bigquery import Row, SchemaField
+
+    schema = [
+        SchemaField("ad_name", "STRING"),
+        SchemaField("spend", "NUMERIC"),
+        SchemaField("revenue", "FLOAT"),
+        SchemaField("croas", "FLOAT"),
+        SchemaField("is_total", "INTEGER"),
+    ]
+    index = {field.name: i for i, field in enumerate(schema)}
+    return _RowIterator(schema, [Row(values, index) for values in rows])
+
+
+def test_performance_rows_are_converted_by_schema_and_served_pre_encoded(
+    client: TestClient,
+) -> None:
+    """REST rows are converted per column; a cache hit sends the stored bytes."""
+    mock_job = MagicMock()
+    mock_job.result.return_value = _performance_result(
+        [
+            ("A__HM__P1__x", Decimal("10.50"), 21.0, 2.0, 0),
+            (None, Decimal("10.50"), 21.0, 2.0, 1),
+        ]
+    )
+    mock_bq = MagicMock()
+    mock_bq.query.return_value = mock_job
+
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    os.environ["GCP_PROJECT"] = "p"
+    os.environ["BIGQUERY_DATASET"] = "d"
+    os.environ["BIGQUERY_TABLE"] = "t"
+    try:
+        with client:
+            miss = client.get("/api/bigquery/performance?employee_acronym=HM")
+            hit = client.get("/api/bigquery/performance?employee_acronym=HM")
+    finally:
+        app.dependency_overrides.clear()
+        for key in ("GCP_PROJECT", "BIGQUERY_DATASET", "BIGQUERY_TABLE"):
+            os.environ.pop(key, None)
+
+    assert mock_bq.query.call_count == 1
+    assert miss.json() == [
+        {"ad_name": "A__HM__P1__x", "spend": 10.5, "revenue": 21.0, "croas": 2.0}
+    ]
+    cached = _performance_cache.get("hm|p1")
+    assert cached is not None
+    assert miss.content == hit.content == cached.body
+    assert hit.headers["content-type"] == "application/json"
+    assert "Age" in hit.headers
+    assert hit.headers["X-Total-Count"] == "1"
+
+
+# --- NDJSON streaming ---
+
+
+def test_performance_streams_ndjson_pages(client: TestClient) -> None:
+    """Accept: application/x-ndjson streams one line per ad as pages arrive."""
+    mock_job = MagicMock()
+    mock_job.result.return_value = _performance_result(
+        [
+            (None, Decimal("30"), 45.0, 1.5, 1),
+            ("A__HM__P1__x", Decimal("20"), 40.0, 2.0, 0),
+            ("B__HM__P1__x", Decimal("10"), 5.0, 0.5, 0),
+        ]
+    )
+    mock_bq = MagicMock()
+    mock_bq.query.return_value = mock_job
+
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    os.environ["GCP_PROJECT"] = "p"
+    os.environ["BIGQUERY_DATASET"] = "d"
+    os.environ["BIGQUERY_TABLE"] = "t"
+    try:
+        with client:
+            response = client.get(
+                "/api/bigquery/performance?employee_acronym=HM",
+                headers={"Accept": "application/x-ndjson"},
+            )
+    finally:
+        app.dependency_overrides.clear()
+        for key in ("GCP_PROJECT", "BIGQUERY_DATASET", "BIGQUERY_TABLE"):
+            os.environ.pop(key, None)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.headers["Age"] == "0"
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"ad_name": "A__HM__P1__x", "spend": 20.0, "revenue": 40.0, "croas": 2.0},
+        {"ad_name": "B__HM__P1__x", "spend": 10.0, "revenue": 5.0, "croas": 0.5},
+    ]
+    assert mock_job.result.call_args.kwargs["page_size"] > 0
+    cached = _summary_cache.get("hm|p1")
+    assert cached is not None
+    assert cached.value == {"total_spend": 30.0, "blended_croas": 1.5, "row_count": 2}
+    assert _performance_cache.get("hm|p1") is None
+
+
+def test_performance_streams_cached_rows_without_query(client: TestClient) -> None:
+    """?stream=true sends a cached result as NDJSON without a BigQuery job."""
+    rows = [{"ad_name": "Ad A", "spend": 1.0, "revenue": 2.0, "croas": 2.0}]
+    _performance_cache.set("hm|p1", Encoded.of(rows))
+    mock_bq = MagicMock()
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    try:
+        with client:
+            response = client.get(
+                "/api/bigquery/performance?employee_acronym=HM&stream=true"
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    mock_bq.query.assert_not_called()
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in response.text.splitlines()] == rows
+
+
+def test_performance_rejects_streaming_a_page(client: TestClient) -> None:
+    """A stream is the full result: page parameters with it are a 422."""
+    mock_bq = MagicMock()
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    url = "/api/bigquery/performance?employee_acronym=HM"
+    try:
+        with client:
+            streamed = client.get(url + "&stream=true&limit=10")
+            accepted = client.get(
+                url + "&offset=5", headers={"Accept": "application/x-ndjson"}
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert streamed.status_code == 422
+    assert accepted.status_code == 422
+    mock_bq.query.assert_not_called()
+
+
+# --- Pagination, sorting and projection ---
+
+
+def test_performance_page_is_cut_from_cached_result(client: TestClient) -> None:
+    """With the full result cached, a page is sorted and sliced without a query."""
+    _performance_cache.set(
+        "hm|p1",
+        Encoded.of(
+            [
+                {"ad_name": "Ad A", "spend": 30.0, "revenue": 30.0, "croas": 1.0},
+                {"ad_name": "Ad B", "spend": 20.0, "revenue": 60.0, "croas": 3.0},
+                {"ad_name": "Ad C", "spend": 10.0, "revenue": 20.0, "croas": 2.0},
+                {"ad_name": "Ad D", "spend": 0.0, "revenue": 0.0, "croas": None},
+                {"ad_name": "Ad E", "spend": 5.0, "revenue": 10.0, "croas": 2.0},
+            ]
+        ),
+    )
+    mock_bq = MagicMock()
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    try:
+        with client:
+            response = client.get(
+                "/api/bigquery/performance?employee_acronym=HM&sort=croas"
+                "&limit=2&offset=1&min_spend=1&fields=ad_name,croas"
+            )
+            by_name = client.get(
+                "/api/bigquery/performance?employee_acronym=HM&sort=ad_name&limit=2"
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    mock_bq.query.assert_not_called()
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == "4"
+    assert response.json() == [
+        {"ad_name": "Ad C", "croas": 2.0},
+        {"ad_name": "Ad E", "croas": 2.0},
+    ]
+    assert [row["ad_name"] for row in by_name.json()] == ["Ad A", "Ad B"]
+    assert by_name.headers["X-Total-Count"] == "5"
+
+
+def test_page_bodies_are_encoded_off_the_event_loop(client: TestClient) -> None:
+    """Uncached page bodies are serialized and compressed in a worker thread."""
+    _performance_cache.set(
+        "hm|p1", Encoded.of([{"ad_name": "Ad A", "spend": 1.0, "croas": 1.0}])
+    )
+    on_loop: list[bool] = []
+    encode = Encoded.of
+
+    def spy(value: object, **kwargs: int) -> Encoded[object]:
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return encode(value, **kwargs)
+
+    app.dependency_overrides[get_bigquery_client] = lambda: MagicMock()
+    try:
+        with client, patch.object(Encoded, "of", side_effect=spy):
+            response = client.get(
+                "/api/bigquery/performance?employee_acronym=HM&limit=1"
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert on_loop == [False]
+
+
+def test_performance_page_is_pushed_down_to_bigquery(client: TestClient) -> None:
+    """On a cache miss the page is filtered, sorted and windowed in SQL."""
+    page_job = MagicMock()
+    page_job.result.return_value = [
+        {"ad_name": "Ad B", "spend": 20.0, "in_page": True, "total_count": 7},
+    ]
+    # Past the end: only the count row, with the page columns NULL.
+    empty_job = MagicMock()
+    empty_job.result.return_value = [
+        {
+            "ad_name": None,
+            "spend": None,
+            "revenue": None,
+            "croas": None,
+            "in_page": None,
+            "total_count": 7,
+        }
+    ]
+    mock_bq = MagicMock()
+    mock_bq.query.side_effect = [page_job, empty_job]
+
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    os.environ["GCP_PROJECT"] = "p"
+    os.environ["BIGQUERY_DATASET"] = "d"
+    os.environ["BIGQUERY_TABLE"] = "t"
+    try:
+        with client:
+            response = client.get(
+                "/api/bigquery/performance?employee_acronym=HM&limit=1&offset=3"
+                "&min_spend=5&fields=ad_name,spend"
+            )
+            past_end = client.get(
+                "/api/bigquery/performance?employee_acronym=HM&offset=50"
+            )
+    finally:
+        app.dependency_overrides.clear()
+        for key in ("GCP_PROJECT", "BIGQUERY_DATASET", "BIGQUERY_TABLE"):
+            os.environ.pop(key, None)
+
+    assert response.json() == [{"ad_name": "Ad B", "spend": 20.0}]
+    assert response.headers["X-Total-Count"] == "7"
+    query = mock_bq.query.call_args_list[0][0][0]
+    assert "HAVING SUM(spend_sum) >= @min_spend" in query
+    assert "ORDER BY spend DESC, ad_name" in query
+    assert "LIMIT @limit OFFSET @offset" in query
+    assert "SELECT page.ad_name, page.spend, page.in_page" in query
+    job_config = mock_bq.query.call_args_list[0][1]["job_config"]
+    params = {p.name: p.value for p in job_config.query_parameters}
+    assert params["limit"] == 1 and params["offset"] == 3
+    assert params["min_spend"] == 5.0
+    assert _performance_cache.get("hm|p1") is None
+    assert past_end.json() == []
+    assert past_end.headers["X-Total-Count"] == "7"
+
+
+def test_performance_rejects_unknown_fields(client: TestClient) -> None:
+    mock_bq = MagicMock()
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    try:
+        with client:
+            response = client.get(
+                "/api/bigquery/performance?employee_acronym=HM&fields=ad_name,cost"
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 422
+    mock_bq.query.assert_not_called()
+
+
+# --- Conditional requests and compression ---
+
+
+def test_summary_revalidation_returns_304(client: TestClient) -> None:
+    """A matching If-None-Match is answered with 304 and no body."""
+    mock_job = MagicMock()
+    mock_job.result.return_value = [
+        {"total_spend": 10.0, "blended_croas": 2.0, "row_count": 1}
+    ]
+    mock_bq = MagicMock()
+    mock_bq.query.return_value = mock_job
+
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    os.environ["GCP_PROJECT"] = "p"
+    os.environ["BIGQUERY_DATASET"] = "d"
+    os.environ["BIGQUERY_TABLE"] = "t"
+    url = "/api/bigquery/performance/summary?employee_acronym=HM"
+    try:
+        with client:
+            first = client.get(url)
+            revalidated = client.get(
+                url, headers={"If-None-Match": first.headers["ETag"]}
+            )
+            changed = client.get(url, headers={"If-None-Match": '"stale"'})
+    finally:
+        app.dependency_overrides.clear()
+        for key in ("GCP_PROJECT", "BIGQUERY_DATASET", "BIGQUERY_TABLE"):
+            os.environ.pop(key, None)
+
+    assert first.status_code == 200 and first.headers["ETag"]
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["ETag"] == first.headers["ETag"]
+    assert "Age" in revalidated.headers
+    assert changed.status_code == 200 and changed.json() == first.json()
+    assert mock_bq.query.call_count == 1
+
+
+def test_large_performance_response_is_sent_compressed(client: TestClient) -> None:
+    """Bodies over the threshold are sent from the cached gzip copy."""
+    rows = [
+        {"ad_name": f"Ad {i}", "spend": 1.0, "revenue": 1.0, "croas": 1.0}
+        for i in range(100)
+    ]
+    entry = Encoded.of(rows, compress_min_bytes=1024)
+    _performance_cache.set("hm|p1", entry)
+    mock_bq = MagicMock()
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    try:
+        with client:
+            response = client.get(
+                "/api/bigquery/performance?employee_acronym=HM",
+                headers={"Accept-Encoding": "gzip"},
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert int(response.headers["Content-Length"]) == len(entry.compressed["gzip"])
+    assert response.json() == rows
+
+
+def test_cache_warming_prefills_summaries_from_settings(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch, tmp_path
+) -> None:
+    """POST /cache/warm fills P1 and review-period summaries from the settings."""
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "settings.db"))
+    employees = [
+        {"acronym": "HM", "status": "tenured"},
+        {"acronym": "ABC", "status": "tenured"},
+        {
+            "acronym": "PR",
+            "status": "probationary",
+            "startDate": "2026-01-01",
+            "reviewDate": "2026-03-31",
+        },
+        {"acronym": "NEW", "status": "probationary", "startDate": None},
+    ]
+
+    def submit(_query: str, job_config, **_kwargs) -> MagicMock:
+        params = {p.name: getattr(p, "values", []) for p in job_config.query_parameters}
+        job = MagicMock()
+        job.result.return_value = [
+            {"acronym": a, "total_spend": 10.0, "blended_croas": 2.0, "row_count": 1}
+            for a in params["acronyms"]
+        ]
+        return job
+
+    mock_bq = MagicMock()
+    mock_bq.query.side_effect = submit
+    monkeypatch.setattr("routers.bigquery.get_bigquery_client", lambda: mock_bq)
+    monkeypatch.setenv("GCP_PROJECT", "p")
+    monkeypatch.setenv("BIGQUERY_DATASET", "d")
+    monkeypatch.setenv("BIGQUERY_TABLE", "t")
+
+    with client:
+        assert client.put("/api/settings", json={"employees": employees}).is_success
+        started = client.post("/api/bigquery/cache/warm")
+        status: dict[str, Any] = {}
+        for _ in range(200):
+            status = client.get("/api/bigquery/cache/warm").json()
+            if status["state"] not in ("planning", "running"):
+                break
+            time.sleep(0.01)
+
+    assert started.status_code == 202
+    assert status["state"] == "idle" and status["errors"] == []
+    assert status["steps_total"] == status["steps_done"] == 2
+    assert status["entries_warmed"] == 3
+    assert mock_bq.query.call_count == 2
+    assert _summary_cache.get("hm|p1") is not None
+    assert _summary_cache.get("abc|p1") is not None
+    assert _summary_cache.get("pr|all|2026-01-01_2026-03-31") is not None
+    assert _summary_cache.get("new|p1") is None
+
+
+# --- Short-query mode (query_and_wait) ---
+
+
+class _FirstPage(list):
+    """Stands in for the RowIterator returned by ``query_and_wait``."""
+
+    schema = None
+    job_id = None
+
+
+@pytest.fixture
+def short_queries(monkeypatch: pytest.MonkeyPatch) -> Iterator[MagicMock]:
+    """Enable short queries against a mocked client."""
+    monkeypatch.setattr("routers.bigquery.BIGQUERY_SHORT_QUERY_MODE", "optional")
+    monkeypatch.setenv("GCP_PROJECT", "p")
+    monkeypatch.setenv("BIGQUERY_DATASET", "d")
+    monkeypatch.setenv("BIGQUERY_TABLE", "t")
+    mock_bq = MagicMock()
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    yield mock_bq
+    app.dependency_overrides.clear()
+
+
+def test_summary_and_sample_use_query_and_wait(
+    client: TestClient, short_queries: MagicMock
+) -> None:
+    """Short endpoints skip job polling; results are cached as before."""
+    summary = {"total_spend": 150.0, "blended_croas": 2.1, "row_count": 5}
+    short_queries.query_and_wait.side_effect = [
+        _FirstPage([summary]),
+        _FirstPage([{"id": 1}]),
+    ]
+    url = "/api/bigquery/performance/summary?employee_acronym=HM"
+    with client:
+        first = client.get(url)
+        again = client.get(url)
+        sample = client.get("/api/bigquery/sample")
+
+    assert first.json() == again.json() == summary
+    assert sample.json() == [{"id": 1}]
+    short_queries.query.assert_not_called()
+    calls = short_queries.query_and_wait.call_args_list
+    assert [c.kwargs["max_results"] for c in calls] == [1, 5]
+    assert calls[0].kwargs["job_config"].query_parameters
+
+
+def test_short_query_failures_map_to_502(
+    client: TestClient, short_queries: MagicMock
+) -> None:
+    short_queries.query_and_wait.side_effect = RuntimeError("quota exceeded")
+    with client:
+        response = client.get("/api/bigquery/sample")
+
+    assert response.status_code == 502
+    assert "quota exceeded" in response.json()["detail"]
+
+
+def test_batch_summaries_still_run_as_jobs(
+    client: TestClient, short_queries: MagicMock
+) -> None:
+    job = MagicMock()
+    job.result.return_value = []
+    short_queries.query.return_value = job
+    with client:
+        response = client.post(
+            "/api/bigquery/performance/summary/batch",
+            json={"employee_acronyms": ["HM"]},
+        )
+
+    assert response.status_code == 200
+    short_queries.query_and_wait.assert_not_called()
+    assert short_queries.query.call_count == 1
+
+
+@pytest.mark.parametrize(
+    ("mode", "job_creation"),
+    [("optional", "JOB_CREATION_OPTIONAL"), ("required", None)],
+)
+def test_client_job_creation_mode_follows_short_query_mode(
+    monkeypatch: pytest.MonkeyPatch, mode: str, job_creation: str | None
+) -> None:
+    monkeypatch.setattr("routers.bigquery.BIGQUERY_SHORT_QUERY_MODE", mode)
+    monkeypatch.setattr("routers.bigquery._bq_client", None)
+    monkeypatch.setattr("routers.bigquery._get_bigquery_credentials", lambda: None)
+    client_class = MagicMock()
+    monkeypatch.setattr("routers.bigquery.bigquery.Client", client_class)
+    monkeypatch.setenv("GCP_PROJECT", "p")
+
+    assert get_bigquery_client() is client_class.return_value
+    kwargs = client_class.call_args.kwargs
+    assert kwargs.get("default_job_creation_mode") == job_creation
+    assert kwargs["project"] == "p"
+
+
+# --- Deadlines and disconnects ---
+
+
+def test_query_past_deadline_is_cancelled_and_504(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(_query_runner, "timeout_seconds", 0.01)
+    monkeypatch.setattr("services.query_runner.POLL_INITIAL_SECONDS", 0.001)
+    mock_job = MagicMock()
+    mock_job.done.return_value = False
+    mock_bq = MagicMock()
+    mock_bq.query.return_value = mock_job
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    monkeypatch.setenv("GCP_PROJECT", "p")
+    monkeypatch.setenv("BIGQUERY_DATASET", "d")
+    monkeypatch.setenv("BIGQUERY_TABLE", "t")
+    try:
+        with client:
+            response = client.get("/api/bigquery/performance?employee_acronym=HM")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 504
+    assert "did not finish" in response.json()["detail"]
+    for _ in range(100):
+        if mock_job.cancel.called:
+            break
+        time.sleep(0.01)
+    mock_job.cancel.assert_called_once_with()
+
+
+def test_while_connected_cancels_work_when_client_disconnects(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr("routers.bigquery.DISCONNECT_POLL_SECONDS", 0.001)
+    stopped = False
+
+    request = MagicMock(spec=Request)
+    request.is_disconnected = AsyncMock(return_value=True)
+
+    async def work() -> int:
+        nonlocal stopped
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            stopped = True
+            raise
+        return 1
+
+    async def main() -> None:
+        with pytest.raises(HTTPException) as raised:
+            await _while_connected(request, work())
+        assert raised.value.status_code == 499
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert stopped
+
+
+def test_open_circuit_serves_last_good_summary_or_503(
+    client: TestClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(_circuit_breaker, "failure_threshold", 1)
+    good_job = MagicMock()
+    good_job.result.return_value = [
+        {"total_spend": 10.0, "blended_croas": 1.0, "row_count": 1}
+    ]
+    mock_bq = MagicMock()
+    mock_bq.query.side_effect = [good_job, ServiceUnavailable("backend error")]
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    monkeypatch.setenv("GCP_PROJECT", "p")
+    monkeypatch.setenv("BIGQUERY_DATASET", "d")
+    monkeypatch.setenv("BIGQUERY_TABLE", "t")
+    url = "/api/bigquery/performance/summary?employee_acronym="
+    try:
+        with client:
+            good = client.get(url + "HM")
+            failed = client.get(url + "XX")
+            # Past the hard TTL too: kept only because the circuit is open.
+            monkeypatch.setattr(_summary_cache, "ttl_seconds", 0)
+            monkeypatch.setattr(_summary_cache, "stale_seconds", 0)
+            fallback = client.get(url + "HM")
+            refused = client.get(url + "XX")
+            stats = client.get("/api/bigquery/cache/stats").json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert good.status_code == 200
+    assert failed.status_code == 502
+    assert fallback.status_code == 200
+    assert fallback.json() == good.json()
+    assert fallback.headers["X-Stale"] == "1"
+    assert refused.status_code == 503
+    assert int(refused.headers["Retry-After"]) > 0
+    assert mock_bq.query.call_count == 2
+    assert stats["circuit"]["state"] == "open"
+    assert stats["circuit"]["rejected"] == 2
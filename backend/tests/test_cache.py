@@ -0,0 +1,102 @@
+"""Tests for the bounded LRU + TTL cache."""
+
+import time
+
+import pytest
+
+from services import cache as cache_module
+from services.cache import CacheSweeper, TTLCache, estimate_size
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable monotonic clock for TTL tests."""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_get_returns_stored_value_and_counts_hits() -> None:
+    cache: TTLCache[int] = TTLCache(ttl_seconds=60, max_entries=10, max_bytes=10_000)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert cache.get("missing") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["entries"] == 1 and stats["bytes"] > 0
+
+
+def test_evicts_least_recently_used_when_entry_limit_reached() -> None:
+    cache: TTLCache[int] = TTLCache(ttl_seconds=60, max_entries=2, max_bytes=10_000)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_evicts_to_stay_within_byte_budget() -> None:
+    cache: TTLCache[str] = TTLCache(
+        ttl_seconds=60, max_entries=100, max_bytes=250, sizeof=len
+    )
+    cache.set("a", "x" * 100)
+    cache.set("b", "y" * 100)
+    cache.set("c", "z" * 100)
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 200
+    cache.set("huge", "h" * 1000)
+    assert cache.get("huge") is None
+    assert len(cache) == 2
+
+
+def test_expired_entries_are_dropped_on_read_and_sweep(clock) -> None:
+    cache: TTLCache[int] = TTLCache(ttl_seconds=10, max_entries=10, max_bytes=10_000)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    clock[0] += 11
+    assert cache.get("a") is None
+    assert cache.sweep() == 1
+    assert len(cache) == 0
+    assert cache.stats()["expirations"] == 2
+    assert cache.stats()["bytes"] == 0
+
+
+def test_lookup_serves_stale_entries_until_hard_expiry(clock) -> None:
+    cache: TTLCache[int] = TTLCache(
+        ttl_seconds=10, stale_seconds=50, max_entries=10, max_bytes=10_000
+    )
+    cache.set("a", 1)
+    clock[0] += 5
+    hit = cache.lookup("a")
+    assert hit is not None and hit.value == 1 and not hit.stale and hit.age == 5
+    clock[0] += 20
+    assert cache.get("a") is None
+    hit = cache.lookup("a")
+    assert hit is not None and hit.stale and hit.age == 25
+    assert cache.sweep() == 0
+    clock[0] += 40
+    assert cache.lookup("a") is None
+    assert cache.stats()["stale_hits"] == 1
+    assert cache.stats()["expirations"] == 1
+
+
+def test_estimate_size_grows_with_content() -> None:
+    small = [{"ad_name": "a", "spend": 1.0}]
+    large = [{"ad_name": f"ad {i}", "spend": float(i)} for i in range(100)]
+    assert estimate_size(large) > estimate_size(small) > 0
+
+
+def test_sweeper_removes_expired_entries_in_background() -> None:
+    cache: TTLCache[int] = TTLCache(ttl_seconds=0, max_entries=10, max_bytes=10_000)
+    cache.set("a", 1)
+    sweeper = CacheSweeper([cache], interval_seconds=0.01)
+    sweeper.start()
+    try:
+        deadline = time.monotonic() + 2
+        while len(cache) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        sweeper.stop()
+    assert len(cache) == 0
@@ -0,0 +1,184 @@
+"""Tests for the shared cache backends and the two-tier SharedTTLCache."""
+
+import asyncio
+import time
+from pathlib import Path
+
+import fakeredis
+import pytest
+
+from services.cache import SharedTTLCache
+from services.cache_backends import (
+    CacheBackend,
+    RedisCacheBackend,
+    SQLiteCacheBackend,
+    StoredValue,
+    create_backend,
+)
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def backends(
+    request: pytest.FixtureRequest, tmp_path: Path
+) -> tuple[CacheBackend, CacheBackend]:
+    """Two backends on the same storage, standing in for two workers."""
+    if request.param == "sqlite":
+        path = tmp_path / "cache.db"
+        return SQLiteCacheBackend(path), SQLiteCacheBackend(path)
+    server = fakeredis.FakeServer()
+    return (
+        RedisCacheBackend(fakeredis.FakeRedis(server=server)),
+        RedisCacheBackend(fakeredis.FakeRedis(server=server)),
+    )
+
+
+def test_backend_round_trip_expiry_and_clear(
+    backends: tuple[CacheBackend, CacheBackend],
+) -> None:
+    first, second = backends
+    now = time.time()
+    first.set("performance:hm|p1", b"[1]", stored_at=now, ttl_seconds=60)
+    first.set("summary:hm|p1", b"{}", stored_at=now, ttl_seconds=60)
+    first.set("performance:old", b"[]", stored_at=now - 120, ttl_seconds=60)
+
+    stored = second.get("performance:hm|p1")
+    assert stored is not None and stored.payload == b"[1]"
+    assert stored.stored_at == pytest.approx(now)
+    assert second.get("performance:old") is None
+
+    second.clear("performance:")
+    assert first.get("performance:hm|p1") is None
+    assert first.get("summary:hm|p1") is not None
+    first.delete("summary:hm|p1")
+    assert second.get("summary:hm|p1") is None
+
+
+def test_backend_lock_is_held_by_one_worker_until_released(
+    backends: tuple[CacheBackend, CacheBackend],
+) -> None:
+    first, second = backends
+    assert first.acquire("performance:hm|p1", ttl_seconds=60)
+    assert not second.acquire("performance:hm|p1", ttl_seconds=60)
+    second.release("performance:hm|p1")  # not the owner: no effect
+    assert not second.acquire("performance:hm|p1", ttl_seconds=60)
+    first.release("performance:hm|p1")
+    assert second.acquire("performance:hm|p1", ttl_seconds=60)
+
+
+def test_backend_clear_keeps_other_workers_locks(
+    backends: tuple[CacheBackend, CacheBackend],
+) -> None:
+    first, second = backends
+    first.set("performance:hm|p1", b"[1]", stored_at=time.time(), ttl_seconds=60)
+    assert first.acquire("performance:hm|p1", ttl_seconds=60)
+    second.clear("performance:")
+    assert second.get("performance:hm|p1") is None
+    assert not second.acquire("performance:hm|p1", ttl_seconds=60)
+
+
+def _shared_cache(backend: CacheBackend) -> SharedTTLCache[list[int]]:
+    return SharedTTLCache(
+        backend,
+        namespace="performance",
+        encode=lambda value: bytes(value),
+        decode=list,
+        ttl_seconds=60,
+        stale_seconds=60,
+        max_entries=10,
+        max_bytes=10_000,
+    )
+
+
+def test_shared_cache_serves_other_workers_with_original_age(tmp_path: Path) -> None:
+    path = tmp_path / "cache.db"
+    worker_a = _shared_cache(SQLiteCacheBackend(path))
+    worker_b = _shared_cache(SQLiteCacheBackend(path))
+
+    worker_a.set("hm|p1", [1, 2], age=30)
+    hit = worker_b.lookup("hm|p1")
+    assert hit is not None and hit.value == [1, 2]
+    assert 29 <= hit.age < 40 and not hit.stale
+    assert worker_b.stats()["shared_hits"] == 1
+    # Now also cached locally in worker B.
+    assert worker_b.get("hm|p1") == [1, 2]
+    assert worker_b.stats()["shared_hits"] == 1
+
+    worker_a.invalidate()
+    assert _shared_cache(SQLiteCacheBackend(path)).get("hm|p1") is None
+
+
+def test_try_lock_can_outlast_the_load_lock(tmp_path: Path) -> None:
+    path = tmp_path / "cache.db"
+    worker_a = _shared_cache(SQLiteCacheBackend(path))
+    worker_b = _shared_cache(SQLiteCacheBackend(path))
+    worker_a.lock_seconds = worker_b.lock_seconds = 0.05
+    assert worker_a.try_lock("hm|p1")
+    assert worker_a.try_lock("warm", ttl_seconds=60)
+    time.sleep(0.1)
+    assert worker_b.try_lock("hm|p1")
+    assert not worker_b.try_lock("warm")
+
+
+def test_shared_cache_degrades_to_local_when_backend_fails() -> None:
+    backend = RedisCacheBackend.from_url("redis://127.0.0.1:1/0", timeout_seconds=0.2)
+    cache = _shared_cache(backend)
+    cache.set("hm|p1", [1])
+    assert cache.get("hm|p1") == [1]
+    assert cache.get("other") is None
+    assert cache.try_lock("other")
+    assert cache.stats()["shared_errors"] >= 3
+
+
+class _ThreadRecordingBackend(SQLiteCacheBackend):
+    """SQLite backend that records whether it was called on an event loop."""
+
+    def __init__(self, path: Path) -> None:
+        super().__init__(path)
+        self.on_loop: list[bool] = []
+
+    def _record(self) -> None:
+        try:
+            asyncio.get_running_loop()
+            self.on_loop.append(True)
+        except RuntimeError:
+            self.on_loop.append(False)
+
+    def get(self, key: str) -> StoredValue | None:
+        self._record()
+        return super().get(key)
+
+    def set(
+        self, key: str, payload: bytes, *, stored_at: float, ttl_seconds: float
+    ) -> None:
+        self._record()
+        super().set(key, payload, stored_at=stored_at, ttl_seconds=ttl_seconds)
+
+    def acquire(self, key: str, ttl_seconds: float) -> bool:
+        self._record()
+        return super().acquire(key, ttl_seconds)
+
+
+def test_async_methods_call_the_backend_off_the_event_loop(tmp_path: Path) -> None:
+    backend = _ThreadRecordingBackend(tmp_path / "cache.db")
+    cache = _shared_cache(backend)
+    other_worker = _shared_cache(SQLiteCacheBackend(tmp_path / "cache.db"))
+
+    async def main() -> None:
+        await cache.aset("hm|p1", [1])
+        assert await cache.aget("hm|p1") == [1]  # local hit: no backend call
+        other_worker.set("hm|p2", [2])
+        hit = await cache.alookup("hm|p2")
+        assert hit is not None and hit.value == [2]
+        assert await cache.atry_lock("hm|p3")
+
+    asyncio.run(main())
+    assert backend.on_loop == [False, False, False]
+
+
+def test_create_backend_by_kind(tmp_path: Path) -> None:
+    options = {"sqlite_path": tmp_path / "c.db", "redis_url": "redis://h:1/0"}
+    assert create_backend("memory", **options) is None
+    assert isinstance(create_backend("sqlite", **options), SQLiteCacheBackend)
+    assert isinstance(create_backend("redis", **options), RedisCacheBackend)
+    with pytest.raises(ValueError):
+        create_backend("memcached", **options)
@@ -0,0 +1,110 @@
+"""Tests for scheduled cache warming."""
+
+import asyncio
+from datetime import datetime, time, timezone
+
+import pytest
+
+from services.cache_warmer import CacheWarmer, WarmStep, next_run_at, parse_times
+
+UTC = timezone.utc
+
+
+def test_parse_times_sorts_utc_times_of_day() -> None:
+    assert parse_times(" 18:30, 06:15 ,") == [
+        time(6, 15, tzinfo=UTC),
+        time(18, 30, tzinfo=UTC),
+    ]
+    assert parse_times("") == []
+    with pytest.raises(ValueError):
+        parse_times("6pm")
+
+
+def test_next_run_is_earliest_of_daily_times_and_interval() -> None:
+    now = datetime(2026, 3, 2, 12, 0, tzinfo=UTC)
+    times = parse_times("06:15,18:30")
+    assert next_run_at(now, times, 0, None) == datetime(2026, 3, 2, 18, 30, tzinfo=UTC)
+    late = datetime(2026, 3, 2, 20, 0, tzinfo=UTC)
+    assert next_run_at(late, times, 0, None) == datetime(2026, 3, 3, 6, 15, tzinfo=UTC)
+    started = datetime(2026, 3, 2, 11, 0, tzinfo=UTC)
+    assert next_run_at(now, times, 3600, started) == now
+    assert next_run_at(now, [], 0, None) is None
+
+
+def test_warm_runs_every_step_and_reports_failures() -> None:
+    ran: list[str] = []
+
+    async def ok() -> int:
+        ran.append("ok")
+        return 3
+
+    async def broken() -> int:
+        raise RuntimeError("quota exceeded")
+
+    async def plan() -> list[WarmStep]:
+        return [WarmStep("P1", ok), WarmStep("range", broken), WarmStep("P1b", ok)]
+
+    warmer = CacheWarmer(plan, on_startup=False)
+    status = asyncio.run(warmer.warm())
+
+    assert ran == ["ok", "ok"]
+    assert status["state"] == "idle"
+    assert status["steps_total"] == status["steps_done"] == 3
+    assert status["entries_warmed"] == 6
+    assert status["errors"] == ["range: quota exceeded"]
+    assert status["finished_at"] is not None
+
+
+def test_concurrent_triggers_share_one_pass_and_skips_are_reported() -> None:
+    plans = 0
+    release = asyncio.Event()
+
+    async def slow() -> int:
+        await release.wait()
+        return 1
+
+    async def plan() -> list[WarmStep] | None:
+        nonlocal plans
+        plans += 1
+        return [WarmStep("P1", slow)] if plans == 1 else None
+
+    warmer = CacheWarmer(plan, on_startup=False)
+
+    async def main() -> None:
+        first = asyncio.create_task(warmer.warm())
+        await asyncio.sleep(0)
+        warmer.trigger()
+        await asyncio.sleep(0)
+        assert warmer.status()["state"] == "running"
+        assert warmer.status()["current_step"] == "P1"
+        release.set()
+        await first
+        assert (await warmer.warm())["state"] == "skipped"
+
+    asyncio.run(main())
+    assert plans == 2
+    assert warmer.status()["runs"] == 2
+
+
+def test_finish_runs_after_every_pass_that_was_not_skipped() -> None:
+    finished = 0
+    plans: list[list[WarmStep] | None] = [[], None]
+
+    async def plan() -> list[WarmStep] | None:
+        if not plans:
+            raise RuntimeError("settings unreadable")
+        return plans.pop(0)
+
+    async def finish() -> None:
+        nonlocal finished
+        finished += 1
+
+    warmer = CacheWarmer(plan, finish=finish, on_startup=False)
+    assert asyncio.run(warmer.warm())["state"] == "idle"
+    assert finished == 1
+    assert asyncio.run(warmer.warm())["state"] == "skipped"
+    assert finished == 1
+    with pytest.raises(RuntimeError):
+        asyncio.run(warmer.warm())
+    assert warmer.status()["state"] == "failed"
+    assert finished == 2
@@ -0,0 +1,102 @@
+"""Tests for the BigQuery circuit breaker."""
+
+import pytest
+
+from services import circuit_breaker
+from services.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpen,
+)
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> _Clock:
+    fake = _Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", fake)
+    return fake
+
+
+def test_consecutive_failures_open_the_circuit(clock: _Clock) -> None:
+    changes: list[str] = []
+    breaker = CircuitBreaker(
+        failure_threshold=2, open_seconds=30, on_state_change=changes.append
+    )
+
+    breaker.before_call()
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_success(0.1)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    clock.now += 10
+    with pytest.raises(CircuitOpen) as raised:
+        breaker.before_call()
+    assert raised.value.retry_after == 20
+    assert changes == [OPEN]
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_slow_calls_count_as_failures(clock: _Clock) -> None:
+    breaker = CircuitBreaker(failure_threshold=1, slow_call_seconds=5)
+
+    breaker.before_call()
+    breaker.record_success(4.0)
+    assert breaker.state == CLOSED
+    breaker.before_call()
+    breaker.record_success(6.0)
+
+    assert breaker.state == OPEN
+    assert breaker.stats()["slow_calls"] == 1
+
+
+def test_half_open_lets_one_probe_through(clock: _Clock) -> None:
+    changes: list[str] = []
+    breaker = CircuitBreaker(
+        failure_threshold=1, open_seconds=30, on_state_change=changes.append
+    )
+    breaker.before_call()
+    breaker.record_failure()
+
+    clock.now += 31
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now += 31
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+    assert changes == [OPEN, HALF_OPEN, OPEN, HALF_OPEN, CLOSED]
+    assert breaker.stats()["opened"] == 2
+
+
+def test_zero_threshold_disables_the_breaker() -> None:
+    breaker = CircuitBreaker(failure_threshold=0)
+
+    for _ in range(10):
+        breaker.before_call()
+        breaker.record_failure()
+
+    assert breaker.state == CLOSED
+    assert breaker.stats()["state"] == "disabled"
@@ -0,0 +1,119 @@
+"""Tests for the BigQuery cost governor."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+from google.cloud import bigquery
+
+from services import cost_governor as cost_governor_module
+from services import query_runner
+from services.cost_governor import (
+    CostGovernor,
+    QueryBudgetExhausted,
+    QueryTooExpensive,
+    query_fingerprint,
+)
+from services.query_runner import QueryRunner
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cost_governor_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture(autouse=True)
+def _fast_polling(monkeypatch):
+    monkeypatch.setattr(query_runner, "POLL_INITIAL_SECONDS", 0.001)
+    monkeypatch.setattr(query_runner, "POLL_MAX_SECONDS", 0.001)
+
+
+def test_reserve_rejects_query_over_per_query_limit() -> None:
+    governor = CostGovernor(max_bytes_billed=100)
+    with pytest.raises(QueryTooExpensive):
+        governor.reserve(101)
+    governor.reserve(100)
+    assert governor.stats()["rejected_too_expensive"] == 1
+
+
+def test_window_budget_counts_reservations_and_billed_bytes(clock) -> None:
+    governor = CostGovernor(window_budget_bytes=100, window_seconds=3600)
+    first = governor.reserve(60)
+    # A concurrent job cannot slip in while the first one holds its estimate.
+    with pytest.raises(QueryBudgetExhausted):
+        governor.reserve(50)
+
+    governor.settle(first, 30)
+    clock[0] += 600
+    second = governor.reserve(50)
+    governor.settle(second, 50)
+    with pytest.raises(QueryBudgetExhausted) as exc_info:
+        governor.reserve(30)
+    # The first job's 30 bytes leave the window an hour after it finished.
+    assert exc_info.value.retry_after == 3000
+
+    clock[0] += 3000
+    governor.reserve(30)
+    assert governor.stats()["window_billed_bytes"] == 50
+    assert governor.stats()["rejected_budget"] == 2
+
+
+def test_fingerprint_includes_parameter_values() -> None:
+    def config(value: str) -> bigquery.QueryJobConfig:
+        return bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("a", "STRING", value)]
+        )
+
+    assert query_fingerprint("SELECT 1", config("x")) == query_fingerprint(
+        "SELECT 1", config("x")
+    )
+    assert query_fingerprint("SELECT 1", config("x")) != query_fingerprint(
+        "SELECT 1", config("y")
+    )
+
+
+def _client(estimated: int, billed: int) -> MagicMock:
+    dry_job = MagicMock(total_bytes_processed=estimated)
+    job = MagicMock(total_bytes_billed=billed)
+    job.result.return_value = [1]
+
+    def submit(_query: str, job_config: bigquery.QueryJobConfig) -> MagicMock:
+        return dry_job if job_config.dry_run else job
+
+    client = MagicMock()
+    client.query.side_effect = submit
+    return client
+
+
+def test_runner_dry_runs_each_fingerprint_once_and_caps_jobs() -> None:
+    governor = CostGovernor(max_bytes_billed=1000, window_budget_bytes=10_000)
+    runner = QueryRunner(max_concurrency=2, governor=governor)
+    client = _client(estimated=500, billed=400)
+
+    async def run_twice() -> None:
+        await runner.run(client, "SELECT 1")
+        await runner.run(client, "SELECT 1")
+
+    asyncio.run(run_twice())
+
+    configs = [call.kwargs["job_config"] for call in client.query.call_args_list]
+    assert [bool(c.dry_run) for c in configs] == [True, False, False]
+    assert configs[1].maximum_bytes_billed == 1000
+    stats = governor.stats()
+    assert stats["dry_runs"] == 1
+    assert stats["window_billed_bytes"] == 800
+    assert stats["reserved_bytes"] == 0
+
+
+def test_runner_refuses_before_submitting_the_job() -> None:
+    governor = CostGovernor(max_bytes_billed=100)
+    runner = QueryRunner(max_concurrency=2, governor=governor)
+    client = _client(estimated=500, billed=500)
+
+    with pytest.raises(QueryTooExpensive):
+        asyncio.run(runner.run(client, "SELECT 1"))
+
+    assert client.query.call_count == 1
+    assert runner.stats()["completed"] == 0
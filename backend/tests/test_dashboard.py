@@ -0,0 +1,248 @@
+"""Tests for the dashboard snapshot endpoint."""
+
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from routers.bigquery import _build_cache_key, _summary_cache, get_bigquery_client
+from routers.dashboard import _snapshot_cache
+
+SETTINGS = {
+    "employees": [
+        {"acronym": "HM", "name": "Heather", "status": "tenured"},
+        {"acronym": "LO", "name": "Low", "status": "tenured"},
+        {
+            "acronym": "PR",
+            "name": "Probie",
+            "status": "probationary",
+            "startDate": "2026-01-01",
+            "reviewDate": "2026-03-31",
+        },
+        {"acronym": "NEW", "name": "New", "status": "probationary"},
+    ],
+    "spendEvaluationKey": [
+        {"min": 20000, "max": None, "color": "green"},
+        {"min": 10000, "max": 20000, "color": "yellow"},
+        {"min": 0, "max": 10000, "color": "red"},
+    ],
+    "croasEvaluationKey": [
+        {"min": 3, "max": None, "color": "green"},
+        {"min": 1, "max": 3, "color": "yellow"},
+        {"min": 0, "max": 1, "color": "red"},
+    ],
+    "periods": ["P1"],
+    "bonusEligibilityThreshold": 50000,
+}
+SUMMARIES = {
+    "hm": {"total_spend": 60000.0, "blended_croas": 3.5, "row_count": 4},
+    "lo": {"total_spend": 500.0, "blended_croas": None, "row_count": 1},
+    "pr": {"total_spend": 15000.0, "blended_croas": 2.0, "row_count": 2},
+}
+
+
+@pytest.fixture
+def mock_bq(monkeypatch: pytest.MonkeyPatch):
+    """A BigQuery client answering batch summary queries from SUMMARIES."""
+
+    def submit(_query: str, job_config, **_kwargs) -> MagicMock:
+        params = {p.name: getattr(p, "values", []) for p in job_config.query_parameters}
+        job = MagicMock()
+        job.result.return_value = [
+            {"acronym": a, **SUMMARIES[a]} for a in params["acronyms"] if a in SUMMARIES
+        ]
+        return job
+
+    mock = MagicMock()
+    mock.query.side_effect = submit
+    monkeypatch.setenv("GCP_PROJECT", "p")
+    monkeypatch.setenv("BIGQUERY_DATASET", "d")
+    monkeypatch.setenv("BIGQUERY_TABLE", "t")
+    app.dependency_overrides[get_bigquery_client] = lambda: mock
+    yield mock
+    app.dependency_overrides.clear()
+
+
+def test_dashboard_joins_settings_with_evaluated_summaries(
+    client: TestClient, mock_bq: MagicMock
+) -> None:
+    with client:
+        etag = client.put("/api/settings", json=SETTINGS).headers["etag"]
+        response = client.get("/api/dashboard")
+
+    assert response.status_code == 200
+    assert response.headers["age"] == "0"
+    data = response.json()
+    assert data["settingsVersion"] == etag
+    assert data["periods"] == ["P1"]
+    assert data["spendEvaluationKey"] == SETTINGS["spendEvaluationKey"]
+    by_acronym = {e["acronym"]: e for e in data["employees"]}
+    assert list(by_acronym) == ["HM", "LO", "PR", "NEW"]
+    assert by_acronym["HM"] == {
+        **SETTINGS["employees"][0],
+        "summary": SUMMARIES["hm"],
+        "error": None,
+        "stale": False,
+        "spendColor": "green",
+        "croasColor": "green",
+    }
+    assert by_acronym["LO"]["spendColor"] == "red"
+    assert by_acronym["LO"]["croasColor"] == "red"
+    assert by_acronym["PR"]["spendColor"] == "yellow"
+    assert by_acronym["PR"]["croasColor"] == "yellow"
+    assert by_acronym["NEW"]["summary"] is None
+    assert by_acronym["NEW"]["spendColor"] == "gray"
+    # One batch job for the tenured employees, one for the review period.
+    assert mock_bq.query.call_count == 2
+
+
+def test_dashboard_keeps_employees_sharing_an_acronym_apart(
+    client: TestClient, mock_bq: MagicMock
+) -> None:
+    ok = mock_bq.query.side_effect
+
+    def review_period(query: str, job_config, **kwargs) -> MagicMock:
+        job = ok(query, job_config, **kwargs)
+        if any(p.name == "start_date" for p in job_config.query_parameters):
+            job.result.return_value = [
+                {**row, "total_spend": 1.0} for row in job.result.return_value
+            ]
+        return job
+
+    mock_bq.query.side_effect = review_period
+    probationary = {"status": "probationary", "startDate": "2026-01-01"}
+    settings = {
+        "employees": [
+            {"acronym": "PR", "status": "tenured"},
+            {**probationary, "acronym": "PR", "reviewDate": "2026-03-31"},
+            {**probationary, "acronym": "PR"},
+        ],
+    }
+    with client:
+        client.put("/api/settings", json=settings)
+        employees = client.get("/api/dashboard").json()["employees"]
+
+    summaries = [e["summary"] for e in employees]
+    assert summaries[0] == SUMMARIES["pr"]
+    assert summaries[1] == {**SUMMARIES["pr"], "total_spend": 1.0}
+    # Without both dates there is no summary, not the tenured one.
+    assert summaries[2] is None
+
+
+def test_dashboard_is_cached_until_the_settings_change(
+    client: TestClient, mock_bq: MagicMock
+) -> None:
+    with client:
+        client.put("/api/settings", json=SETTINGS)
+        first = client.get("/api/dashboard")
+        again = client.get(
+            "/api/dashboard", headers={"If-None-Match": first.headers["etag"]}
+        )
+        etag = client.get("/api/settings").headers["etag"]
+        client.patch(
+            "/api/settings",
+            json={
+                "spendEvaluationKey": [
+                    {"min": 100000, "max": None, "color": "green"},
+                    {"min": 50000, "max": 100000, "color": "yellow"},
+                ]
+            },
+            headers={"If-Match": etag},
+        )
+        changed = client.get("/api/dashboard")
+
+    assert again.status_code == 304
+    assert changed.json()["employees"][0]["spendColor"] == "yellow"
+    assert changed.json()["settingsVersion"] != first.json()["settingsVersion"]
+    # The new snapshot reuses the cached summaries.
+    assert mock_bq.query.call_count == 2
+
+
+def test_dashboard_is_as_old_as_its_oldest_summary(
+    client: TestClient, mock_bq: MagicMock
+) -> None:
+    with client:
+        client.put("/api/settings", json=SETTINGS)
+        client.get("/api/dashboard")
+        _snapshot_cache.clear()
+        oldest = _build_cache_key("HM", True, None, None)
+        summary = _summary_cache.get(oldest)
+        assert summary is not None
+        _summary_cache.set(oldest, summary, age=250)
+        response = client.get("/api/dashboard")
+        again = client.get("/api/dashboard")
+
+    assert response.headers["age"] == "250"
+    # The cached snapshot keeps that age, so it expires with the summary.
+    assert int(again.headers["age"]) >= 250
+    assert mock_bq.query.call_count == 2
+
+
+def test_dashboard_reports_failed_queries_per_employee(
+    client: TestClient, mock_bq: MagicMock
+) -> None:
+    ok = mock_bq.query.side_effect
+
+    def fail_date_range(query: str, job_config, **kwargs) -> MagicMock:
+        if any(p.name == "start_date" for p in job_config.query_parameters):
+            raise RuntimeError("quota exceeded")
+        return ok(query, job_config, **kwargs)
+
+    mock_bq.query.side_effect = fail_date_range
+    with client:
+        client.put("/api/settings", json=SETTINGS)
+        failed = client.get("/api/dashboard").json()
+        mock_bq.query.side_effect = ok
+        retried = client.get("/api/dashboard").json()
+
+    assert failed["employees"][0]["spendColor"] == "green"
+    assert failed["employees"][2]["summary"] is None
+    assert "quota exceeded" in failed["employees"][2]["error"]
+    assert retried["employees"][2]["error"] is None
+    assert retried["employees"][2]["summary"] == SUMMARIES["pr"]
+
+
+def test_dashboard_serves_last_good_summaries_when_bigquery_fails(
+    client: TestClient, mock_bq: MagicMock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    with client:
+        client.put("/api/settings", json=SETTINGS)
+        fresh = client.get("/api/dashboard").json()
+        _snapshot_cache.clear()
+        monkeypatch.setattr(_summary_cache, "ttl_seconds", 0)
+        mock_bq.query.side_effect = RuntimeError("backend error")
+        response = client.get("/api/dashboard")
+        again = client.get("/api/dashboard")
+
+    assert response.headers["X-Stale"] == "1"
+    employees = response.json()["employees"]
+    assert [e["stale"] for e in employees] == [True, True, True, False]
+    assert [e["summary"] for e in employees] == [
+        e["summary"] for e in fresh["employees"]
+    ]
+    assert employees[0]["spendColor"] == "green"
+    # Stale snapshots are not cached: the next request tries BigQuery again.
+    assert again.headers["X-Stale"] == "1"
+    assert mock_bq.query.call_count == 6
+
+
+def test_dashboard_uses_the_settings_page_defaults(
+    client: TestClient, mock_bq: MagicMock
+) -> None:
+    settings = {
+        "employees": [
+            {"acronym": "HM", "status": "contractor"},
+            {"acronym": "PR", "status": "tenured"},
+        ],
+    }
+    with client:
+        client.put("/api/settings", json=settings)
+        employees = client.get("/api/dashboard").json()["employees"]
+
+    # An unknown status counts as tenured: P1 summaries, one batch job.
+    assert [e["summary"] for e in employees] == [SUMMARIES["hm"], SUMMARIES["pr"]]
+    assert mock_bq.query.call_count == 1
+    # Default bands: spend 20k+ green, 10k-20k yellow; cROAS 3+ green, 1-3 yellow.
+    assert [e["spendColor"] for e in employees] == ["green", "yellow"]
+    assert [e["croasColor"] for e in employees] == ["green", "yellow"]
@@ -0,0 +1,64 @@
+"""Tests for threshold band lookups."""
+
+from services.evaluation import (
+    SPEND_DEFAULT_BANDS,
+    EvaluationKey,
+    normalize_bands,
+)
+
+SPEND_KEY = [
+    {"min": 20000, "max": None, "color": "green"},
+    {"min": 10000, "max": 20000, "color": "yellow"},
+    {"min": 0, "max": 10000, "color": "red"},
+]
+
+
+def test_color_finds_band_with_inclusive_min_and_exclusive_max() -> None:
+    key = EvaluationKey(SPEND_KEY)
+    assert key.color(0) == "red"
+    assert key.color(9999.99) == "red"
+    assert key.color(10000) == "yellow"
+    assert key.color(20000) == "green"
+    assert key.color(1e12) == "green"
+    assert key.color(-1) == "gray"
+
+
+def test_gaps_and_malformed_bands_are_unrated() -> None:
+    key = EvaluationKey(
+        [
+            {"min": 3, "max": None, "color": "green"},
+            {"min": 0, "max": 1, "color": "red"},
+            {"max": 3, "color": "yellow"},
+            {"min": "x", "max": 5, "color": "yellow"},
+        ]
+    )
+    assert key.color(0.5) == "red"
+    assert key.color(2) == "gray"
+    assert key.color(3) == "green"
+    assert EvaluationKey([]).color(1) == "gray"
+
+
+def test_overlapping_bands_match_the_first_in_stored_order() -> None:
+    key = EvaluationKey(
+        [
+            {"min": 100000, "max": None, "color": "green"},
+            {"min": 10000, "max": 20000, "color": "yellow"},
+            {"min": 0, "max": 100000, "color": "red"},
+        ]
+    )
+    assert key.color(15000) == "yellow"
+    assert key.color(60000) == "red"
+    assert key.color(100000) == "green"
+
+
+def test_normalize_bands_fills_in_the_settings_page_defaults() -> None:
+    assert normalize_bands(None, SPEND_DEFAULT_BANDS) == list(SPEND_DEFAULT_BANDS)
+    assert normalize_bands(
+        [{"max": 5, "color": "red"}, {"min": 9, "color": "blue"}, None],
+        SPEND_DEFAULT_BANDS,
+    ) == [
+        {"min": 9, "max": None, "color": "green"},
+        SPEND_DEFAULT_BANDS[1],
+        {"min": 0, "max": 5, "color": "red"},
+    ]
+    assert normalize_bands([], SPEND_DEFAULT_BANDS) == list(SPEND_DEFAULT_BANDS)
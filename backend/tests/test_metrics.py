@@ -0,0 +1,79 @@
+"""Tests for the Prometheus metrics and the /metrics endpoint."""
+
+import os
+from unittest.mock import MagicMock
+
+from fastapi.testclient import TestClient
+
+from main import app
+from routers.bigquery import _performance_cache, get_bigquery_client
+from services.metrics import render
+from services.serialization import Encoded
+
+
+def _metric_value(text: str, sample: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(sample + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_cache_and_circuit_state_are_read_at_scrape() -> None:
+    _performance_cache.set("hm|p1", Encoded.of([]))
+    _performance_cache.get("hm|p1")
+
+    text = render().decode()
+
+    assert "# TYPE performance_cache_hits_total counter" in text
+    assert _metric_value(text, 'performance_cache_hits_total{cache="performance"}')
+    assert _metric_value(text, 'performance_cache_entries{cache="performance"}') == 1
+    assert "bigquery_circuit_state 0.0" in text
+    assert "_created" not in text
+
+
+def test_metrics_endpoint_reports_jobs_caches_and_latency(client: TestClient) -> None:
+    """A performance request shows up in job, cache and latency metrics."""
+    before = render().decode()
+    mock_job = MagicMock()
+    mock_job.result.return_value = []
+    mock_job.total_bytes_processed = 1000
+    mock_job.total_bytes_billed = 10485760
+    mock_job.slot_millis = 42
+    mock_job.cache_hit = False
+    mock_bq = MagicMock()
+    mock_bq.query.return_value = mock_job
+
+    app.dependency_overrides[get_bigquery_client] = lambda: mock_bq
+    os.environ["GCP_PROJECT"] = "p"
+    os.environ["BIGQUERY_DATASET"] = "d"
+    os.environ["BIGQUERY_TABLE"] = "t"
+    try:
+        with client:
+            client.get("/api/bigquery/performance?employee_acronym=HM")
+            client.get("/api/bigquery/performance?employee_acronym=HM")
+            response = client.get("/metrics")
+    finally:
+        app.dependency_overrides.clear()
+        for key in ("GCP_PROJECT", "BIGQUERY_DATASET", "BIGQUERY_TABLE"):
+            os.environ.pop(key, None)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=")
+    after = response.text
+
+    def delta(sample: str) -> float:
+        return _metric_value(after, sample) - _metric_value(before, sample)
+
+    assert delta('bigquery_jobs_total{outcome="success",query="performance"}') == 1
+    assert delta('bigquery_bytes_processed_total{query="performance"}') == 1000
+    assert delta('bigquery_bytes_billed_total{query="performance"}') == 10485760
+    assert delta('bigquery_slot_milliseconds_total{query="performance"}') == 42
+    assert delta('bigquery_job_duration_seconds_count{query="performance"}') == 1
+    assert _metric_value(after, 'performance_cache_hits_total{cache="performance"}')
+    assert (
+        delta(
+            "http_request_duration_seconds_count"
+            '{endpoint="get_performance",method="GET",status="200"}'
+        )
+        == 2
+    )
@@ -0,0 +1,252 @@
+"""Tests for the async BigQuery query runner."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+import requests
+from google.api_core.exceptions import (
+    BadRequest,
+    Forbidden,
+    InternalServerError,
+    RetryError,
+    ServiceUnavailable,
+)
+
+from services import query_runner
+from services.circuit_breaker import OPEN, CircuitBreaker, CircuitOpen
+from services.metrics import render
+from services.query_runner import QueryRunner
+
+
+@pytest.fixture(autouse=True)
+def _fast_polling(monkeypatch):
+    monkeypatch.setattr(query_runner, "POLL_INITIAL_SECONDS", 0.001)
+    monkeypatch.setattr(query_runner, "POLL_MAX_SECONDS", 0.001)
+
+
+def test_run_polls_until_job_done_then_returns_rows() -> None:
+    job = MagicMock()
+    job.done.side_effect = [False, False, True]
+    job.result.return_value = [{"a": 1}]
+    client = MagicMock()
+    client.query.return_value = job
+    runner = QueryRunner(max_concurrency=2)
+
+    rows = asyncio.run(runner.run(client, "SELECT 1", max_results=5))
+
+    assert rows == [{"a": 1}]
+    assert job.done.call_count == 3
+    job.result.assert_called_once_with(max_results=5)
+    assert runner.stats()["completed"] == 1
+    assert runner.stats()["running"] == 0
+
+
+def test_run_limits_concurrent_jobs() -> None:
+    """No more than max_concurrency jobs are submitted at the same time."""
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def submit(*_args, **_kwargs) -> MagicMock:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        job = MagicMock()
+
+        def result(**_: object) -> list[int]:
+            nonlocal active
+            time.sleep(0.01)
+            with lock:
+                active -= 1
+            return [1]
+
+        job.result.side_effect = result
+        return job
+
+    client = MagicMock()
+    client.query.side_effect = submit
+    runner = QueryRunner(max_concurrency=2)
+
+    async def main() -> None:
+        await asyncio.gather(*(runner.run(client, "SELECT 1") for _ in range(6)))
+
+    asyncio.run(main())
+    assert peak == 2
+    assert runner.stats()["completed"] == 6
+
+
+def test_run_propagates_errors_and_counts_failures() -> None:
+    client = MagicMock()
+    client.query.side_effect = RuntimeError("quota exceeded")
+    runner = QueryRunner(max_concurrency=1)
+
+    with pytest.raises(RuntimeError, match="quota exceeded"):
+        asyncio.run(runner.run(client, "SELECT 1"))
+    assert runner.stats()["failed"] == 1
+    assert runner.stats()["running"] == 0
+
+
+def test_open_circuit_fails_fast_without_calling_bigquery() -> None:
+    client = MagicMock()
+    client.query.side_effect = ServiceUnavailable("backend error")
+    breaker = CircuitBreaker(failure_threshold=2, open_seconds=60)
+    runner = QueryRunner(max_concurrency=1, breaker=breaker)
+
+    for _ in range(2):
+        with pytest.raises(ServiceUnavailable):
+            asyncio.run(runner.run(client, "SELECT 1"))
+    with pytest.raises(CircuitOpen):
+        asyncio.run(runner.run(client, "SELECT 1"))
+
+    assert breaker.state == OPEN
+    assert client.query.call_count == 2
+    assert runner.stats()["failed"] == 2
+
+
+@pytest.mark.parametrize(
+    "error",
+    [BadRequest("invalid query"), Forbidden("access denied"), KeyError("bug")],
+)
+def test_rejected_requests_do_not_count_against_the_circuit(
+    error: Exception,
+) -> None:
+    client = MagicMock()
+    client.query.side_effect = error
+    breaker = CircuitBreaker(failure_threshold=1, open_seconds=60)
+    runner = QueryRunner(max_concurrency=1, breaker=breaker)
+
+    for _ in range(3):
+        with pytest.raises(type(error)):
+            asyncio.run(runner.run(client, "SELECT 1"))
+
+    assert breaker.state != OPEN
+    assert client.query.call_count == 3
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        InternalServerError("backend error"),
+        RetryError("gave up", cause=None),
+        requests.exceptions.ConnectionError("reset"),
+        TimeoutError(),
+    ],
+)
+def test_outages_count_against_the_circuit(error: Exception) -> None:
+    client = MagicMock()
+    client.query.side_effect = error
+    breaker = CircuitBreaker(failure_threshold=1, open_seconds=60)
+    runner = QueryRunner(max_concurrency=1, breaker=breaker)
+
+    with pytest.raises(type(error)):
+        asyncio.run(runner.run(client, "SELECT 1"))
+
+    assert breaker.state == OPEN
+
+
+def test_background_jobs_wait_for_queued_user_queries() -> None:
+    """A background job queued first still starts after later user queries."""
+    started: list[str] = []
+    unblock = threading.Event()
+
+    def submit(query: str, **_kwargs: object) -> MagicMock:
+        started.append(query)
+        job = MagicMock()
+        job.result.side_effect = lambda **_: unblock.wait(5) and [query]
+        return job
+
+    client = MagicMock()
+    client.query.side_effect = submit
+    runner = QueryRunner(max_concurrency=1)
+
+    async def main() -> None:
+        first = asyncio.create_task(runner.run(client, "user-1"))
+        while not started:
+            await asyncio.sleep(0.001)
+        warm = asyncio.create_task(runner.run(client, "warm", background=True))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(runner.run(client, "user-2"))
+        await asyncio.sleep(0.01)
+        assert runner.stats()["waiting"] == 2
+        unblock.set()
+        await asyncio.gather(first, warm, second)
+
+    asyncio.run(main())
+    assert started == ["user-1", "user-2", "warm"]
+    assert runner.stats()["running"] == 0
+
+
+class _FirstPage(list):
+    """Stands in for the RowIterator returned by ``query_and_wait``."""
+
+    schema = None
+    job_id = None
+    total_bytes_processed = 2048
+    slot_millis = 7
+
+
+def test_run_and_wait_answers_from_one_call_without_a_job() -> None:
+    client = MagicMock()
+    client.query_and_wait.return_value = _FirstPage([{"a": 1}])
+    runner = QueryRunner(max_concurrency=1)
+
+    rows = asyncio.run(
+        runner.run_and_wait(
+            client, "SELECT 1", max_results=1, label="short", fetch=list
+        )
+    )
+
+    assert rows == [{"a": 1}]
+    client.query.assert_not_called()
+    assert client.query_and_wait.call_args.kwargs["max_results"] == 1
+    assert runner.stats()["completed"] == 1
+    assert runner.stats()["running"] == 0
+    rendered = render().decode()
+    assert 'bigquery_short_queries_total{job="none",query="short"}' in rendered
+    assert 'bigquery_bytes_processed_total{query="short"} 2048' in rendered
+
+
+def test_job_past_its_deadline_is_cancelled() -> None:
+    job = MagicMock()
+    job.done.return_value = False
+    client = MagicMock()
+    client.query.return_value = job
+    runner = QueryRunner(max_concurrency=1, timeout_seconds=0.01)
+
+    with pytest.raises(query_runner.QueryTimeout):
+        asyncio.run(runner.run(client, "SELECT 1", label="slow"))
+
+    runner._executor.shutdown(wait=True)
+    job.cancel.assert_called_once_with()
+    assert runner.stats()["cancelled"] == 1
+    assert runner.stats()["failed"] == 0
+    assert runner.stats()["running"] == 0
+    counted = 'bigquery_job_cancellations_total{query="slow",reason="deadline"}'
+    assert counted in render().decode()
+
+
+def test_abandoned_job_is_cancelled() -> None:
+    job = MagicMock()
+    job.done.return_value = False
+    client = MagicMock()
+    client.query.return_value = job
+    runner = QueryRunner(max_concurrency=1)
+
+    async def main() -> None:
+        task = asyncio.create_task(runner.run(client, "SELECT 1", label="left"))
+        while not job.done.called:
+            await asyncio.sleep(0.001)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    runner._executor.shutdown(wait=True)
+    job.cancel.assert_called_once_with()
+    assert runner.stats()["cancelled"] == 1
+    counted = 'bigquery_job_cancellations_total{query="left",reason="abandoned"}'
+    assert counted in render().decode()
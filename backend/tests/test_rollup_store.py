@@ -0,0 +1,112 @@
+"""Tests for the local per-(ad_name, day) rollup store."""
+
+from datetime import date
+
+from services.rollup_store import RollupStore
+
+ROWS = [
+    {
+        "ad_name": "Spring__HM__P1__a",
+        "day": date(2026, 1, 1),
+        "spend": 100.0,
+        "revenue": 300.0,
+    },
+    {
+        "ad_name": "Spring__HM__P1__a",
+        "day": date(2026, 1, 2),
+        "spend": 50.0,
+        "revenue": 50.0,
+    },
+    {
+        "ad_name": "Summer__HM__P2__b",
+        "day": date(2026, 1, 2),
+        "spend": 40.0,
+        "revenue": 20.0,
+    },
+    {
+        "ad_name": "Other__ABC__P1__c",
+        "day": date(2026, 1, 2),
+        "spend": 10.0,
+        "revenue": 0.0,
+    },
+]
+
+
+def test_query_performance_groups_by_ad_and_filters_p1(tmp_path) -> None:
+    store = RollupStore(tmp_path / "rollups.db")
+    assert store.last_synced_day() is None
+    assert store.replace_days(None, ROWS) == 4
+
+    rows = store.query_performance("HM")
+
+    assert rows == [
+        {
+            "ad_name": "Spring__HM__P1__a",
+            "spend": 150.0,
+            "revenue": 350.0,
+            "croas": 350.0 / 150.0,
+        },
+    ]
+    assert store.last_synced_day() == date(2026, 1, 2)
+
+
+def test_query_performance_date_range_without_p1(tmp_path) -> None:
+    store = RollupStore(tmp_path / "rollups.db")
+    store.replace_days(None, ROWS)
+
+    rows = store.query_performance(
+        "hm", p1_only=False, start_date="2026-01-02", end_date="2026-01-31"
+    )
+
+    assert [(r["ad_name"], r["spend"]) for r in rows] == [
+        ("Spring__HM__P1__a", 50.0),
+        ("Summer__HM__P2__b", 40.0),
+    ]
+
+
+def test_replace_days_replaces_only_days_since(tmp_path) -> None:
+    store = RollupStore(tmp_path / "rollups.db")
+    store.replace_days(None, ROWS)
+
+    store.replace_days(
+        date(2026, 1, 2),
+        [
+            {
+                "ad_name": "Spring__HM__P1__a",
+                "day": "2026-01-02",
+                "spend": 70.0,
+                "revenue": 70.0,
+            }
+        ],
+    )
+
+    status = store.status()
+    assert status["row_count"] == 2
+    assert status["first_day"] == "2026-01-01"
+    assert status["last_day"] == "2026-01-02"
+    assert status["last_sync_at"] is not None
+    assert store.query_performance("HM")[0]["spend"] == 170.0
+
+
+def test_query_performance_matches_tokens_exactly(tmp_path) -> None:
+    store = RollupStore(tmp_path / "rollups.db")
+    store.replace_days(
+        None,
+        [
+            {
+                "ad_name": "x__HM_a__P1__y",
+                "day": "2026-01-01",
+                "spend": 1.0,
+                "revenue": 1.0,
+            },
+            {
+                "ad_name": "x__AHM__P1__y",
+                "day": "2026-01-01",
+                "spend": 1.0,
+                "revenue": 1.0,
+            },
+            {"ad_name": "HM__P1__y", "day": "2026-01-01", "spend": 1.0, "revenue": 1.0},
+        ],
+    )
+
+    assert store.query_performance("HM") == []
@@ -0,0 +1,108 @@
+"""Tests for column-wise row conversion and pre-encoded JSON."""
+
+import gzip
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from services.serialization import (
+    Encoded,
+    JSONBytesResponse,
+    choose_encoding,
+    column_converter,
+    encoded_response,
+    encoded_size,
+    etag_matches,
+    rows_to_records,
+)
+
+
+def test_rows_are_converted_column_by_column_from_schema_types() -> None:
+    names = ["ad_name", "spend", "day", "seen_at", "blob", "tags"]
+    converters = [
+        column_converter("STRING"),
+        column_converter("NUMERIC"),
+        column_converter("DATE"),
+        column_converter("TIMESTAMP"),
+        column_converter("BYTES"),
+        column_converter("DATE", "REPEATED"),
+    ]
+    rows = [
+        (
+            "a",
+            Decimal("1.50"),
+            date(2026, 1, 2),
+            datetime(2026, 1, 2, 3, 4, tzinfo=timezone.utc),
+            b"\x01\xff",
+            [date(2026, 1, 3)],
+        ),
+        ("b", None, None, None, None, []),
+    ]
+    assert converters[0] is None
+    assert rows_to_records(names, converters, rows) == [
+        {
+            "ad_name": "a",
+            "spend": 1.5,
+            "day": "2026-01-02",
+            "seen_at": "2026-01-02T03:04:00+00:00",
+            "blob": "01ff",
+            "tags": ["2026-01-03"],
+        },
+        {
+            "ad_name": "b",
+            "spend": None,
+            "day": None,
+            "seen_at": None,
+            "blob": None,
+            "tags": [],
+        },
+    ]
+
+
+def test_encoded_keeps_value_and_compact_json_body() -> None:
+    entry = Encoded.of({"day": date(2026, 1, 2), "spend": Decimal("2.5")})
+    assert entry.body == b'{"day":"2026-01-02","spend":2.5}'
+    assert encoded_size(entry) > len(entry.body)
+    response = JSONBytesResponse(entry.body)
+    assert response.body == entry.body
+    assert response.media_type == "application/json"
+
+
+def test_etag_matches_weakly_and_across_compressed_variants() -> None:
+    entry = Encoded.of([1, 2, 3])
+    tag = entry.etag
+    assert tag.startswith('"') and tag.endswith('"')
+    assert etag_matches(tag, tag)
+    assert etag_matches(f'"other", W/{tag}', tag)
+    assert etag_matches(tag[:-1] + '-gzip"', tag)
+    assert etag_matches("*", tag)
+    assert not etag_matches('"other"', tag)
+    assert not etag_matches(None, tag)
+
+
+def test_choose_encoding_respects_preference_and_q_values() -> None:
+    assert choose_encoding("gzip, deflate, br", ["br", "gzip"]) == "br"
+    assert choose_encoding("br;q=0, gzip", ["br", "gzip"]) == "gzip"
+    assert choose_encoding("identity", ["br", "gzip"]) is None
+    assert choose_encoding("*", ["gzip"]) == "gzip"
+    assert choose_encoding(None, ["gzip"]) is None
+
+
+def test_encoded_response_is_304_or_compressed_copy() -> None:
+    entry = Encoded.of(["x" * 100] * 50, compress_min_bytes=1024)
+    assert set(entry.compressed) >= {"gzip"}
+
+    not_modified = encoded_response(entry, {"if-none-match": entry.etag})
+    assert not_modified.status_code == 304
+    assert not_modified.body == b""
+    assert not_modified.headers["etag"] == entry.etag
+
+    zipped = encoded_response(entry, {"accept-encoding": "gzip"}, {"Age": "3"})
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert zipped.headers["vary"] == "Accept-Encoding"
+    assert zipped.headers["age"] == "3"
+    assert zipped.headers["etag"] != entry.etag
+    assert gzip.decompress(zipped.body) == entry.body
+
+    plain = encoded_response(entry, {})
+    assert plain.body == entry.body and "content-encoding" not in plain.headers
+    assert Encoded.of([1]).compressed == {}
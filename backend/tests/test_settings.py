@@ -1,11 +1,13 @@
 """Tests for settings API."""
 
 import os
+import sqlite3
 import tempfile
 
 import pytest
 from fastapi.testclient import TestClient
 
+import routers.settings as settings_module
 from main import app
 
 
@@ -95,3 +97,219 @@ def test_put_and_get_probationary_employee(client):
     emp2 = resp2.json()["employees"][0]
     assert emp2["status"] == "probationary"
     assert emp2["startDate"] == "2026-01-15"
+
+
+def test_get_settings_is_served_from_memory_while_unchanged(client, monkeypatch):
+    client.put("/api/settings", json={"employees": [], "periods": ["P1"]})
+
+    def fail() -> None:
+        raise AssertionError("settings were re-read from the database")
+
+    monkeypatch.setattr(settings_module, "_read_settings", fail)
+    monkeypatch.setattr(settings_module, "SETTINGS_VERSION_CHECK_SECONDS", 0)
+    resp = client.get("/api/settings")
+    assert resp.status_code == 200
+    assert resp.json() == {"employees": [], "periods": ["P1"]}
+
+
+def test_get_settings_picks_up_changes_saved_by_another_worker(
+    client, temp_db, monkeypatch
+):
+    monkeypatch.setattr(settings_module, "SETTINGS_VERSION_CHECK_SECONDS", 0)
+    client.put("/api/settings", json={"periods": ["P1"]})
+    assert client.get("/api/settings").json() == {"periods": ["P1"]}
+
+    conn = sqlite3.connect(temp_db)
+    with conn:
+        conn.execute(
+            "UPDATE settings SET value = ?, version = version + 1 WHERE key = 'app'",
+            ('{"periods": ["P2"]}',),
+        )
+    conn.close()
+    assert client.get("/api/settings").json() == {"periods": ["P2"]}
+
+
+def test_put_settings_increments_stored_version(client, temp_db):
+    client.put("/api/settings", json={"periods": ["P1"]})
+    client.put("/api/settings", json={"periods": ["P2"]})
+    conn = sqlite3.connect(temp_db)
+    try:
+        row = conn.execute("SELECT version FROM settings WHERE key = 'app'")
+        assert row.fetchone()[0] == 2
+    finally:
+        conn.close()
+
+
+def test_settings_schema_is_set_up_once_per_database(client, monkeypatch):
+    calls = 0
+    ensure = settings_module._ensure_sqlite_schema
+
+    def counting(conn: sqlite3.Connection) -> None:
+        nonlocal calls
+        calls += 1
+        ensure(conn)
+
+    monkeypatch.setattr(settings_module, "_ensure_sqlite_schema", counting)
+    monkeypatch.setattr(settings_module, "SETTINGS_VERSION_CHECK_SECONDS", 0)
+    settings_module.close_settings_db()
+    for i in range(3):
+        client.put("/api/settings", json={"periods": [f"P{i}"]})
+        assert client.get("/api/settings").json() == {"periods": [f"P{i}"]}
+    assert calls == 1
+
+
+def test_settings_migrates_old_tables_and_embedded_employees(client, temp_db):
+    settings_module.close_settings_db()
+    conn = sqlite3.connect(temp_db)
+    with conn:
+        conn.execute(
+            "CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " updated_at TEXT DEFAULT (datetime('now')))"
+        )
+        conn.execute(
+            "INSERT INTO settings (key, value) VALUES ('app', ?)",
+            ('{"employees": [{"acronym": "HM"}, {"acronym": "AB"}], "periods": []}',),
+        )
+    conn.close()
+    expected = {"employees": [{"acronym": "HM"}, {"acronym": "AB"}], "periods": []}
+    assert client.get("/api/settings").json() == expected
+    conn = sqlite3.connect(temp_db)
+    try:
+        keys = conn.execute("SELECT key FROM settings_employees ORDER BY sort_order")
+        assert [row[0] for row in keys] == ["hm", "ab"]
+    finally:
+        conn.close()
+    assert client.put("/api/settings", json={"periods": ["P1"]}).status_code == 200
+
+
+def _roster() -> dict:
+    return {
+        "employees": [
+            {"acronym": "HM", "name": "Heather", "status": "tenured"},
+            {
+                "acronym": "NE",
+                "name": "New",
+                "status": "probationary",
+                "startDate": "2026-01-15",
+                "reviewDate": "2026-07-15",
+            },
+        ],
+        "periods": ["P1"],
+        "bonusEligibilityThreshold": 50000,
+    }
+
+
+def test_patch_settings_updates_only_the_named_employees(client):
+    put = client.put("/api/settings", json=_roster())
+    etag = put.headers["etag"]
+    assert client.get("/api/settings").headers["etag"] == etag
+
+    resp = client.patch(
+        "/api/settings",
+        json={
+            "employees": {
+                "ne": {"reviewDate": "2026-08-01"},
+                "ZZ": {"name": "Zed", "status": "tenured"},
+                "HM": None,
+            },
+            "periods": ["P1", "P2"],
+            "bonusEligibilityThreshold": None,
+        },
+        headers={"If-Match": etag},
+    )
+
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != etag
+    data = resp.json()
+    assert data == {
+        "employees": [
+            {
+                "acronym": "NE",
+                "name": "New",
+                "status": "probationary",
+                "startDate": "2026-01-15",
+                "reviewDate": "2026-08-01",
+            },
+            {"acronym": "ZZ", "name": "Zed", "status": "tenured"},
+        ],
+        "periods": ["P1", "P2"],
+    }
+    assert client.get("/api/settings").json() == data
+
+
+def test_patch_settings_requires_current_version(client):
+    etag = client.put("/api/settings", json=_roster()).headers["etag"]
+    change = {"employees": {"HM": {"name": "H"}}}
+
+    missing = client.patch("/api/settings", json=change)
+    assert missing.status_code == 428
+
+    assert client.patch(
+        "/api/settings", json=change, headers={"If-Match": etag}
+    ).is_success
+    stale = client.patch("/api/settings", json=change, headers={"If-Match": etag})
+    assert stale.status_code == 412
+    assert stale.headers["etag"] != etag
+
+    put = client.put("/api/settings", json=_roster(), headers={"If-Match": etag})
+    assert put.status_code == 412
+    forced = client.patch("/api/settings", json=change, headers={"If-Match": "*"})
+    assert forced.status_code == 200
+
+
+def test_patch_settings_starts_from_defaults_and_rejects_renames(client):
+    etag = client.get("/api/settings").headers["etag"]
+    resp = client.patch(
+        "/api/settings",
+        json={"employees": {"HM": {"name": "Heather"}}},
+        headers={"If-Match": etag},
+    )
+    assert resp.status_code == 200
+    assert [e["acronym"] for e in resp.json()["employees"]] == ["HM", "ABC", "XYZ"]
+    assert resp.json()["employees"][0]["name"] == "Heather"
+    assert resp.json()["periods"] == ["P1"]
+
+    rename = client.patch(
+        "/api/settings",
+        json={"employees": {"HM": {"acronym": "HX"}}},
+        headers={"If-Match": "*"},
+    )
+    assert rename.status_code == 400
+
+
+def test_put_settings_keeps_blank_and_duplicate_acronyms(client):
+    employees = [{"acronym": "HM"}, {"acronym": ""}, {"acronym": "hm"}, {}]
+    etag = client.put("/api/settings", json={"employees": employees}).headers["etag"]
+    assert client.get("/api/settings").json()["employees"] == employees
+
+    resp = client.patch(
+        "/api/settings",
+        json={"employees": {"HM": {"name": "Heather"}}},
+        headers={"If-Match": etag},
+    )
+    assert resp.json()["employees"] == [
+        {"acronym": "HM", "name": "Heather"},
+        {"acronym": ""},
+        {"acronym": "hm"},
+        {},
+    ]
+
+
+def test_settings_migration_drops_malformed_employees(client, temp_db, caplog):
+    settings_module.close_settings_db()
+    conn = sqlite3.connect(temp_db)
+    with conn:
+        conn.execute(
+            "CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " updated_at TEXT DEFAULT (datetime('now')))"
+        )
+        conn.execute(
+            "INSERT INTO settings (key, value) VALUES ('app', ?)",
+            ('{"employees": [{"acronym": "HM"}, "AB", {"acronym": ""}]}',),
+        )
+    conn.close()
+
+    resp = client.get("/api/settings")
+    assert resp.status_code == 200
+    assert resp.json()["employees"] == [{"acronym": "HM"}, {"acronym": ""}]
+    assert "Dropping malformed employee 'AB'" in caplog.text
@@ -0,0 +1,45 @@
+"""Tests for the settings database connection managers."""
+
+import sqlite3
+import threading
+
+import pytest
+
+from services.settings_db import SQLiteConnections
+
+
+def test_sqlite_connection_is_reused_per_thread_in_wal_mode(tmp_path) -> None:
+    db = SQLiteConnections(tmp_path / "nested" / "settings.db")
+    with db.connection() as first:
+        first.execute("CREATE TABLE t (x INTEGER)")
+    with db.connection() as second:
+        assert second is first
+        assert second.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    other: list[sqlite3.Connection] = []
+
+    def use() -> None:
+        with db.connection() as conn:
+            other.append(conn)
+
+    thread = threading.Thread(target=use)
+    thread.start()
+    thread.join()
+    assert other[0] is not first
+    db.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        first.execute("SELECT 1")
+
+
+def test_sqlite_connection_commits_or_rolls_back_each_use(tmp_path) -> None:
+    db = SQLiteConnections(tmp_path / "settings.db")
+    with db.connection() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.execute("INSERT INTO t VALUES (1)")
+    with pytest.raises(RuntimeError):
+        with db.connection() as conn:
+            conn.execute("INSERT INTO t VALUES (2)")
+            raise RuntimeError("boom")
+    with db.connection() as conn:
+        assert [tuple(row) for row in conn.execute("SELECT x FROM t")] == [(1,)]
+    db.close()
@@ -0,0 +1,116 @@
+"""Tests for single-flight request coalescing."""
+
+import asyncio
+
+import pytest
+
+from services.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_execution() -> None:
+    """Callers arriving while a call is in flight get its result."""
+    flight: SingleFlight[int] = SingleFlight()
+    calls = 0
+
+    async def work() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    async def main() -> list[int]:
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+    assert asyncio.run(main()) == [42] * 5
+    assert calls == 1
+    assert flight.stats() == {
+        "executed": 1,
+        "coalesced": 4,
+        "abandoned": 0,
+        "in_flight": 0,
+    }
+
+
+def test_waiters_receive_leader_error() -> None:
+    """An exception from the shared call is raised in every waiting caller."""
+    flight: SingleFlight[int] = SingleFlight()
+
+    async def fail() -> int:
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def main() -> tuple[int | BaseException, int | BaseException]:
+        return await asyncio.gather(
+            flight.do("k", fail), flight.do("k", fail), return_exceptions=True
+        )
+
+    errors = asyncio.run(main())
+    assert len(errors) == 2
+    assert all(isinstance(e, ValueError) and str(e) == "boom" for e in errors)
+
+
+def test_cancelled_caller_does_not_cancel_shared_call() -> None:
+    """A waiter going away leaves the call running for the others."""
+    flight: SingleFlight[int] = SingleFlight()
+
+    async def work() -> int:
+        await asyncio.sleep(0.02)
+        return 7
+
+    async def main() -> int:
+        first = asyncio.create_task(flight.do("k", work))
+        second = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == 7
+
+
+def test_call_is_cancelled_once_every_caller_has_gone() -> None:
+    """Nobody is left to use the result, so the work stops."""
+    flight: SingleFlight[int] = SingleFlight()
+    stopped = asyncio.Event()
+
+    async def work() -> int:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            stopped.set()
+            raise
+        return 7
+
+    async def main() -> None:
+        callers = [asyncio.create_task(flight.do("k", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        callers[0].cancel()
+        await asyncio.sleep(0)
+        assert not stopped.is_set()
+        callers[1].cancel()
+        await asyncio.wait_for(stopped.wait(), 1)
+
+    asyncio.run(main())
+    assert flight.stats()["abandoned"] == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_key_is_released_after_completion() -> None:
+    """Sequential calls for the same key each execute."""
+    flight: SingleFlight[int] = SingleFlight()
+
+    async def value(n: int) -> int:
+        return n
+
+    async def fail() -> int:
+        raise RuntimeError("x")
+
+    async def main() -> None:
+        assert await flight.do("k", lambda: value(1)) == 1
+        assert await flight.do("k", lambda: value(2)) == 2
+        with pytest.raises(RuntimeError):
+            await flight.do("k", fail)
+        assert await flight.do("k", lambda: value(3)) == 3
+
+    asyncio.run(main())
+    assert flight.stats()["executed"] == 4
+    assert flight.stats()["in_flight"] == 0